@@ -0,0 +1,42 @@
+"""Measures get_option calls per second with and without the parsed-value cache.
+
+Run from repository root:
+
+    python misc/option_benchmark.py [call_count]
+"""
+import os.path
+import sys
+import tempfile
+import time
+
+from thonny.config import ConfigurationManager
+
+
+def measure(name, func, call_count, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for _ in range(call_count):
+            func()
+        duration = time.perf_counter() - start_time
+        best = duration if best is None else min(best, duration)
+    print("%-30s %12.0f calls/s" % (name, call_count / best))
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        conf = ConfigurationManager(os.path.join(temp_dir, "configuration.ini"))
+        conf.set_default("shell.squeeze_threshold", 1000)
+        conf.set_option("shell.squeeze_threshold", 2000)
+
+        measure(
+            "get_option (uncached)",
+            lambda: conf._compute_option("shell.squeeze_threshold"),
+            call_count,
+        )
+        measure("get_option", lambda: conf.get_option("shell.squeeze_threshold"), call_count)
+
+
+if __name__ == "__main__":
+    main()
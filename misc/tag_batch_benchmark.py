@@ -0,0 +1,89 @@
+"""Compares full-file syntax coloring with per-range tag calls and with TagBatch.
+
+Needs a display. Run from repository root:
+
+    python misc/tag_batch_benchmark.py [line_count]
+"""
+import re
+import sys
+import time
+import tkinter as tk
+from bisect import bisect_right
+
+from thonny.tktextext import TweakableText
+from thonny.token_utils import COMMENT, KEYWORD, NUMBER, STRING_CLOSED
+
+SAMPLE = """class Foo(object):
+    def bar(self, x, y=3):
+        # compute something
+        return x * 2 + y - 1.5 + len("abc")
+
+"""
+
+
+def create_source(line_count):
+    lines = SAMPLE.splitlines(keepends=True)
+    return "".join(lines[i % len(lines)] for i in range(line_count))
+
+
+def find_tokens(source):
+    regex = re.compile(KEYWORD + "|" + NUMBER + "|" + COMMENT + "|" + STRING_CLOSED, re.S)
+    result = []
+    for match in regex.finditer(source):
+        for token_type, token_text in match.groupdict().items():
+            if token_text:
+                result.append((token_type,) + match.span(token_type))
+    return result
+
+
+def color_with_relative_indices(text, tokens):
+    for tag in ["keyword", "number", "comment", "string"]:
+        text.tag_remove(tag, "1.0", "end")
+    for token_type, start, end in tokens:
+        text.tag_add(token_type, "1.0+%dc" % start, "1.0+%dc" % end)
+
+
+def color_with_batch(text, source, tokens):
+    line_starts = [0]
+    pos = source.find("\n")
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = source.find("\n", pos + 1)
+
+    def to_index(offset):
+        line_no = bisect_right(line_starts, offset) - 1
+        return "%d.%d" % (line_no + 1, offset - line_starts[line_no])
+
+    with text.tag_batch() as batch:
+        for tag in ["keyword", "number", "comment", "string"]:
+            batch.remove(tag)
+        for token_type, start, end in tokens:
+            batch.add(token_type, to_index(start), to_index(end))
+
+
+def measure(name, func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start_time
+        best = duration if best is None else min(best, duration)
+    print("%-30s %8.3f s" % (name, best))
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    root = tk.Tk()
+    text = TweakableText(root)
+    source = create_source(line_count)
+    text.insert("1.0", source)
+    tokens = find_tokens(source)
+    print("%d lines, %d tokens" % (line_count, len(tokens)))
+
+    measure("tag_add per range", lambda: color_with_relative_indices(text, tokens))
+    measure("TagBatch", lambda: color_with_batch(text, source, tokens))
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
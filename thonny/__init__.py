@@ -178,7 +178,8 @@ def launch():
     if not _check_welcome():
         return 0
 
-    if _should_delegate():
+    # profiling needs a fresh instance
+    if "--profile-startup" not in sys.argv and _should_delegate():
         try:
             _delegate_to_existing_instance(sys.argv[1:])
             print("Delegated to an existing Thonny instance. Exiting now.")
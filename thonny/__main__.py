@@ -1,3 +1,5 @@
 from thonny import launch
 
-launch()
+if __name__ == "__main__":
+    # worker processes (eg. of Find in files) may import this module in order to start
+    launch()
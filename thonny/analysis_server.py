@@ -0,0 +1,218 @@
+"""
+Long-lived process, which runs a program analyzer (Pylint or MyPy) for Assistant.
+
+Started by thonny.assistance with the name of the tool as argument. Reads requests
+(JSON objects, one per line) from stdin and writes responses to stdout:
+
+    request:   {"id": 3, "args": ["--disable=all", ...], "paths": ["/home/me/prog.py"]}
+    responses: {"id": 3, "path": "/home/me/prog.py", "lines": [...]}  (for each path)
+               {"id": 3, "done": true}
+
+Lines are the output lines of the tool concerning given file. Pylint keeps its astroid
+cache (parsed library modules) between requests, for MyPy the server uses mypy daemon
+(dmypy). Results are cached by the content hashes of the file and the user files it
+imports (see thonny.import_graph), so that only the changed files and the files
+depending on these get analyzed again. When a new request arrives,
+the remaining files of the current request are abandoned.
+"""
+import contextlib
+import io
+import json
+import os.path
+import queue
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple  # @UnusedImport
+
+from thonny.import_graph import ImportGraph
+
+MAX_CACHED_RESULTS = 1000
+
+
+def compute_cache_keys(
+    args: List[str], paths: List[str], import_graph: ImportGraph
+) -> Dict[str, Optional[Tuple]]:
+    """Key of a file consists of the hashes of the file and the user files it imports
+    directly or indirectly (None for files which can't be read).
+
+    First path is the main file, the imports are looked up in its directory."""
+    search_dir = os.path.dirname(paths[0])
+    keys = {}  # type: Dict[str, Optional[Tuple]]
+    for path in paths:
+        digest = import_graph.get_digest(path)
+        if digest is None:
+            keys[path] = None
+            continue
+        dependencies = sorted(
+            (dependency, import_graph.get_digest(dependency))
+            for dependency in import_graph.get_dependencies(path, search_dir)
+        )
+        keys[path] = (tuple(args), path, digest, tuple(dependencies))
+
+    return keys
+
+
+class PylintRunner:
+    def analyze(self, args: List[str], paths: List[str]) -> Iterator[Tuple[str, List[str]]]:
+        self._forget_modules(paths)
+        for path in paths:
+            yield path, self._run(args + [path])
+
+    def _run(self, args):
+        from pylint.lint import Run
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                Run(args, exit=False)
+            except TypeError:
+                # Pylint < 2.5
+                Run(args, do_exit=False)
+        return out.getvalue().splitlines()
+
+    def _forget_modules(self, paths):
+        """Makes astroid parse the (possibly changed) user files again"""
+        from astroid import MANAGER
+
+        norm_paths = {os.path.normcase(os.path.abspath(path)) for path in paths}
+        for name, module in list(MANAGER.astroid_cache.items()):
+            module_file = getattr(module, "file", None)
+            if module_file and os.path.normcase(os.path.abspath(module_file)) in norm_paths:
+                del MANAGER.astroid_cache[name]
+
+    def close(self):
+        pass
+
+
+class MyPyRunner:
+    def __init__(self):
+        self._use_daemon = True
+        self._status_file = os.path.join(
+            tempfile.gettempdir(), "thonny-dmypy-%d.json" % os.getpid()
+        )
+
+    def analyze(self, args: List[str], paths: List[str]) -> Iterator[Tuple[str, List[str]]]:
+        from mypy import api
+
+        result = None
+        if self._use_daemon:
+            try:
+                result = api.run_dmypy(
+                    ["--status-file", self._status_file, "run", "--timeout", "3600", "--"]
+                    + args
+                    + paths
+                )
+            except Exception as e:
+                print("Could not use mypy daemon:", e, file=sys.stderr)
+
+            if result is None or result[2] == 2:
+                # eg. unsupported platform or broken daemon
+                if result is not None:
+                    print("Mypy daemon failed:", result[0], result[1], file=sys.stderr)
+                self._use_daemon = False
+                result = None
+
+        if result is None:
+            result = api.run(args + paths)
+
+        out, err, _ = result
+        if err.strip():
+            print(err, file=sys.stderr)
+
+        # files under working directory are reported with relative paths
+        prefixes = [(path + ":", path) for path in paths] + [
+            (os.path.relpath(path) + ":", path) for path in paths
+        ]
+        lines_by_path = {path: [] for path in paths}  # type: Dict[str, List[str]]
+        for line in out.splitlines():
+            for prefix, path in prefixes:
+                if line.startswith(prefix):
+                    lines_by_path[path].append(path + line[len(prefix) - 1 :])
+                    break
+
+        yield from lines_by_path.items()
+
+    def close(self):
+        if self._use_daemon and os.path.exists(self._status_file):
+            from mypy import api
+
+            api.run_dmypy(["--status-file", self._status_file, "stop"])
+
+
+RUNNERS = {"pylint": PylintRunner, "mypy": MyPyRunner}
+
+
+class AnalysisServer:
+    def __init__(self, runner, out):
+        self._runner = runner
+        self._out = out
+        self._requests = queue.Queue()  # type: queue.Queue
+        self._cache = OrderedDict()  # type: OrderedDict[Tuple, List[str]]
+        self._import_graph = ImportGraph()
+
+    def serve(self, inp) -> None:
+        threading.Thread(target=self._read_requests, args=(inp,), daemon=True).start()
+        try:
+            while True:
+                request = self._requests.get()
+                # only the latest request matters
+                while request is not None and not self._requests.empty():
+                    request = self._requests.get()
+                if request is None:
+                    break
+                self._handle_request(request)
+        finally:
+            self._runner.close()
+
+    def _read_requests(self, inp):
+        for line in inp:
+            if line.strip():
+                self._requests.put(json.loads(line))
+        self._requests.put(None)
+
+    def _handle_request(self, request):
+        request_id = request["id"]
+        keys = compute_cache_keys(request["args"], request["paths"], self._import_graph)
+        changed_paths = []
+        for path, key in keys.items():
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._send(id=request_id, path=path, lines=self._cache[key])
+            else:
+                changed_paths.append(path)
+
+        try:
+            if changed_paths:
+                for path, lines in self._runner.analyze(request["args"], changed_paths):
+                    if keys[path] is not None:
+                        self._cache[keys[path]] = lines
+                        if len(self._cache) > MAX_CACHED_RESULTS:
+                            self._cache.popitem(last=False)
+                    self._send(id=request_id, path=path, lines=lines)
+                    if not self._requests.empty():
+                        # superseded by newer request
+                        return
+        except Exception as e:
+            import traceback
+
+            traceback.print_exc()
+            self._send(id=request_id, error=str(e))
+
+        self._send(id=request_id, done=True)
+
+    def _send(self, **response):
+        self._out.write(json.dumps(response) + "\n")
+        self._out.flush()
+
+
+def main():
+    # the tools may print, keep the protocol stream clean
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    AnalysisServer(RUNNERS[sys.argv[1]](), out).serve(sys.stdin)
+
+
+if __name__ == "__main__":
+    main()
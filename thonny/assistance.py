@@ -1,10 +1,13 @@
 import ast
 import datetime
+import json
 import logging
 import os.path
+import queue
 import subprocess
 import sys
 import textwrap
+import threading
 import tkinter as tk
 from collections import namedtuple
 from tkinter import messagebox, ttk
@@ -14,18 +17,26 @@ from typing import Optional  # pylint disable=unused-import
 from typing import Tuple  # pylint disable=unused-import
 from typing import Type  # pylint disable=unused-import
 from typing import Union  # pylint disable=unused-import
-from typing import Iterable
+from typing import Callable, Iterable
 
 import thonny
 from thonny import get_runner, get_workbench, rst_utils, tktextext, ui_utils
 from thonny.common import ToplevelResponse, read_source
+from thonny.import_graph import ImportGraph
 from thonny.languages import tr
 from thonny.misc_utils import levenshtein_damerau_distance, running_on_mac_os
 from thonny.ui_utils import CommonDialog, scrollbar_style
 
 Suggestion = namedtuple("Suggestion", ["symbol", "title", "body", "relevance"])
 
+logger = logging.getLogger(__name__)
+
+# how often (ms) the responses of analysis servers are checked
+ANALYSIS_POLL_INTERVAL = 50
+
 _program_analyzer_classes = []  # type: List[Type[ProgramAnalyzer]]
+_analysis_servers = {}  # type: Dict[str, AnalysisServer]
+_import_graph = ImportGraph()
 _last_feedback_timestamps = {}  # type: Dict[str, str]
 _error_helper_classes = {}  # type: Dict[str, List[Type[ErrorHelper]]]
 
@@ -54,6 +65,8 @@ class AssistantView(tktextext.TextFrame):
         self._current_snapshot = None
 
         self._accepted_warning_sets = []
+        # warnings reported by analyzers which haven't completed yet
+        self._partial_warnings = {}  # type: Dict[ProgramAnalyzer, List[Dict]]
 
         self.text.tag_configure(
             "section_title",
@@ -133,7 +146,7 @@ class AssistantView(tktextext.TextFrame):
             self.main_file_path = msg["filename"]
             source = read_source(msg["filename"])
             self._start_program_analyses(
-                msg["filename"], source, _get_imported_user_files(msg["filename"], source)
+                msg["filename"], source, _get_imported_user_files(msg["filename"])
             )
         else:
             self.main_file_path = None
@@ -236,6 +249,7 @@ class AssistantView(tktextext.TextFrame):
 
     def _clear(self):
         self._accepted_warning_sets.clear()
+        self._partial_warnings.clear()
         for wp in self._analyzer_instances:
             wp.cancel_analysis()
         self._analyzer_instances = []
@@ -245,12 +259,15 @@ class AssistantView(tktextext.TextFrame):
 
         for cls in _program_analyzer_classes:
             analyzer = cls(self._accept_warnings)
+            analyzer.progress_handler = self._accept_partial_warnings
             if analyzer.is_enabled():
                 self._analyzer_instances.append(analyzer)
 
         if not self._analyzer_instances:
             return
 
+        self.text.mark_set("analysis_start", "end-1c")
+        self.text.mark_gravity("analysis_start", "left")
         self._append_text("\nAnalyzing your code ...", ("em",))
 
         # save snapshot of current source
@@ -264,14 +281,36 @@ class AssistantView(tktextext.TextFrame):
         for analyzer in self._analyzer_instances:
             analyzer.start_analysis(main_file_path, imported_file_paths)
 
+    def _accept_partial_warnings(self, analyzer, warnings):
+        """Shows the warnings found so far while some analyzers are still working"""
+        if analyzer.cancelled:
+            return
+
+        self._partial_warnings.setdefault(analyzer, []).extend(warnings)
+        self._present_intermediate_warnings()
+
     def _accept_warnings(self, analyzer, warnings):
         if analyzer.cancelled:
             return
 
         self._accepted_warning_sets.append(warnings)
+        self._partial_warnings.pop(analyzer, None)
         if len(self._accepted_warning_sets) == len(self._analyzer_instances):
             self._present_warnings()
             self._present_conclusion()
+        elif self._partial_warnings:
+            self._present_intermediate_warnings()
+
+    def _present_intermediate_warnings(self):
+        warnings = [w for ws in self._accepted_warning_sets for w in ws] + [
+            w for ws in self._partial_warnings.values() for w in ws
+        ]
+        if not warnings:
+            return
+
+        self.text.direct_delete("analysis_start", "end-1c")
+        self.text.append_rst(self._create_warnings_rst(warnings))
+        self._append_text("\nAnalyzing your code ...", ("em",))
 
     def _present_conclusion(self):
 
@@ -302,11 +341,22 @@ class AssistantView(tktextext.TextFrame):
 
     def _present_warnings(self):
         warnings = [w for ws in self._accepted_warning_sets for w in ws]
-        self.text.direct_delete("end-2l linestart", "end-1c lineend")
+        self.text.direct_delete("analysis_start", "end-1c")
 
         if not warnings:
             return
 
+        rst = self._create_warnings_rst(warnings)
+        self.text.append_rst(rst)
+
+        # save snapshot
+        self._current_snapshot["warnings_rst"] = rst
+        self._current_snapshot["warnings"] = warnings
+
+        if get_workbench().get_option("assistance.open_assistant_on_warnings"):
+            get_workbench().show_view("AssistantView")
+
+    def _create_warnings_rst(self, warnings):
         if self._exception_info is None:
             intro = "May be ignored if you are happy with your program."
         else:
@@ -340,14 +390,7 @@ class AssistantView(tktextext.TextFrame):
 
             rst += "\n"
 
-        self.text.append_rst(rst)
-
-        # save snapshot
-        self._current_snapshot["warnings_rst"] = rst
-        self._current_snapshot["warnings"] = warnings
-
-        if get_workbench().get_option("assistance.open_assistant_on_warnings"):
-            get_workbench().show_view("AssistantView")
+        return rst
 
     def _format_warning(self, warning, last):
         title = rst_utils.escape(warning["msg"].splitlines()[0])
@@ -495,6 +538,8 @@ class GenericErrorHelper(ErrorHelper):
 class ProgramAnalyzer:
     def __init__(self, on_completion):
         self.completion_handler = on_completion
+        # may be used for reporting warnings before completion
+        self.progress_handler = None
         self.cancelled = False
 
     def is_enabled(self):
@@ -518,6 +563,149 @@ class SubprocessProgramAnalyzer(ProgramAnalyzer):
             self._proc.kill()
 
 
+class ServerProgramAnalyzer(ProgramAnalyzer):
+    """Runs the tool in a long-lived process (see thonny.analysis_server), which keeps
+    the state of the tool and reports the output of the tool file by file"""
+
+    def __init__(self, on_completion):
+        super().__init__(on_completion)
+        self._warnings = []
+
+    def get_tool_name(self) -> str:
+        raise NotImplementedError()
+
+    def get_tool_args(self, main_file_path, imported_file_paths) -> List[str]:
+        raise NotImplementedError()
+
+    def get_server_env(self) -> Dict[str, str]:
+        return os.environ.copy()
+
+    def get_server_cwd(self) -> Optional[str]:
+        return None
+
+    def parse_output_lines(self, lines: List[str]) -> List[Dict]:
+        raise NotImplementedError()
+
+    def start_analysis(self, main_file_path, imported_file_paths):
+        self._warnings = []
+        args = self.get_tool_args(main_file_path, imported_file_paths)
+        paths = [main_file_path] + list(imported_file_paths)
+        try:
+            server = get_analysis_server(
+                self.get_tool_name(), self.get_server_env(), self.get_server_cwd()
+            )
+            server.send_request(args, paths, self._handle_response)
+        except OSError:
+            logger.exception("Could not start %s analysis", self.get_tool_name())
+            self.completion_handler(self, [])
+
+    def _handle_response(self, response):
+        if self.cancelled:
+            return
+
+        if "error" in response:
+            logger.error("%s analysis failed: %s", self.get_tool_name(), response["error"])
+
+        if "lines" in response:
+            warnings = self.parse_output_lines(response["lines"])
+            self._warnings.extend(warnings)
+            if warnings and self.progress_handler is not None:
+                self.progress_handler(self, warnings)
+
+        if response.get("done"):
+            self.completion_handler(self, self._warnings)
+
+    def cancel_analysis(self):
+        # server abandons the request when it gets next one
+        self.cancelled = True
+
+
+class AnalysisServer:
+    """Front-end side of an analysis server process"""
+
+    def __init__(self, tool_name, env, cwd):
+        from thonny.running import get_interpreter_for_subprocess
+
+        self.launch_key = (tuple(sorted(env.items())), cwd)
+        env = dict(env)
+        # make thonny importable regardless of the working directory
+        thonny_parent = os.path.dirname(os.path.dirname(thonny.__file__))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [thonny_parent, env.get("PYTHONPATH")]))
+        env["PYTHONIOENCODING"] = "utf-8"
+
+        self._proc = subprocess.Popen(
+            [get_interpreter_for_subprocess(), "-m", "thonny.analysis_server", tool_name],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            encoding="utf-8",
+            env=env,
+            cwd=cwd,
+        )
+        self._tool_name = tool_name
+        self._responses = queue.Queue()  # type: queue.Queue
+        self._handlers = {}  # type: Dict[int, Callable]
+        self._last_request_id = 0
+        self._polling = False
+
+        threading.Thread(target=self._listen_stdout, daemon=True).start()
+        threading.Thread(target=self._listen_stderr, daemon=True).start()
+
+    def is_alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def send_request(self, args: List[str], paths: List[str], handler: Callable) -> None:
+        self._last_request_id += 1
+        # responses to older requests are not needed anymore
+        self._handlers = {self._last_request_id: handler}
+        self._proc.stdin.write(
+            json.dumps({"id": self._last_request_id, "args": args, "paths": paths}) + "\n"
+        )
+        self._proc.stdin.flush()
+
+        if not self._polling:
+            self._polling = True
+            get_workbench().after(ANALYSIS_POLL_INTERVAL, self._poll)
+
+    def close(self) -> None:
+        # the server stops after reaching the end of its input
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+
+    def _listen_stdout(self):
+        for line in self._proc.stdout:
+            self._responses.put(json.loads(line))
+
+    def _listen_stderr(self):
+        for line in self._proc.stderr:
+            logger.info("%s analysis server: %s", self._tool_name, line.rstrip())
+
+    def _poll(self):
+        while not self._responses.empty():
+            response = self._responses.get()
+            handler = self._handlers.get(response["id"])
+            if handler is not None:
+                if response.get("done"):
+                    del self._handlers[response["id"]]
+                try:
+                    handler(response)
+                except Exception:
+                    logger.exception("Could not handle %s analysis response", self._tool_name)
+
+        if self._handlers and not self.is_alive() and self._responses.empty():
+            for request_id, handler in self._handlers.items():
+                handler({"id": request_id, "error": "Server exited", "done": True})
+            self._handlers = {}
+
+        if self._handlers:
+            get_workbench().after(ANALYSIS_POLL_INTERVAL, self._poll)
+        else:
+            self._polling = False
+
+
 class LibraryErrorHelper(ErrorHelper):
     """Explains exceptions, which doesn't happen in user code"""
 
@@ -910,40 +1098,35 @@ def name_similarity(a, b):
         return max(10 - distance * 2, 0)
 
 
-def _get_imported_user_files(main_file, source=None):
+def _get_imported_user_files(main_file):
     assert os.path.isabs(main_file)
+    return _import_graph.get_dependencies(main_file)
 
-    if source is None:
-        source = read_source(main_file)
 
-    try:
-        root = ast.parse(source, main_file)
-    except SyntaxError:
-        return set()
+def add_program_analyzer(cls):
+    _program_analyzer_classes.append(cls)
 
-    main_dir = os.path.dirname(main_file)
-    module_names = set()
-    # TODO: at the moment only considers non-package modules
-    for node in ast.walk(root):
-        if isinstance(node, ast.Import):
-            for item in node.names:
-                module_names.add(item.name)
-        elif isinstance(node, ast.ImportFrom):
-            module_names.add(node.module)
 
-    imported_files = set()
+def get_analysis_server(tool_name, env, cwd) -> AnalysisServer:
+    """Returns running server for given tool, starts one if needed"""
+    server = _analysis_servers.get(tool_name)
+    if server is not None and (
+        not server.is_alive() or server.launch_key != (tuple(sorted(env.items())), cwd)
+    ):
+        server.close()
+        server = None
 
-    for file in {name + ext for ext in [".py", ".pyw"] for name in module_names}:
-        possible_path = os.path.join(main_dir, file)
-        if os.path.exists(possible_path):
-            imported_files.add(possible_path)
+    if server is None:
+        server = AnalysisServer(tool_name, env, cwd)
+        _analysis_servers[tool_name] = server
 
-    return imported_files
-    # TODO: add recursion
+    return server
 
 
-def add_program_analyzer(cls):
-    _program_analyzer_classes.append(cls)
+def shutdown_analysis_servers(event=None):
+    for server in _analysis_servers.values():
+        server.close()
+    _analysis_servers.clear()
 
 
 def add_error_helper(error_type_name, helper_class):
@@ -966,3 +1149,4 @@ def init():
     get_workbench().set_default("assistance.open_assistant_on_warnings", False)
     get_workbench().set_default("assistance.disabled_checks", [])
     get_workbench().add_view(AssistantView, tr("Assistant"), "se", visible_by_default=False)
+    get_workbench().bind("WorkbenchClose", shutdown_analysis_servers, True)
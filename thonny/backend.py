@@ -13,7 +13,7 @@ import threading
 import time
 import traceback
 from abc import abstractmethod, ABC
-from typing import BinaryIO, Callable, List, Dict, Optional, Iterable, Union, Any
+from typing import BinaryIO, Callable, List, Dict, Optional, Iterable, Union, Any, Tuple
 
 from thonny.common import (
     BackendEvent,
@@ -28,6 +28,7 @@ from thonny.common import (
     ImmediateCommand,
     MessageFromBackend,
     CommandToBackend,
+    apply_text_edit,
     universal_dirname,
 )
 from thonny.common import IGNORED_FILES_AND_DIRS  # TODO: try to get rid of this
@@ -206,8 +207,55 @@ class MainBackend(BaseBackend, ABC):
     """Backend which does not forward to another backend"""
 
     def __init__(self):
+        # Editor commands may send only the edit since the previous version of the document
+        self._editor_sources = {}  # type: Dict[str, Tuple[int, str]]
         BaseBackend.__init__(self)
 
+    def _prepare_editor_command(self, cmd) -> Optional[Dict[str, Any]]:
+        """Brings cmd.source up to date with the editor.
+
+        Returns None if the command should be executed, otherwise the response
+        (the document is out of sync or a newer command for it is already waiting)."""
+        if "doc_id" not in cmd or cmd.get("source_prepared"):
+            return None
+
+        template = dict(
+            doc_id=cmd.doc_id,
+            version=cmd.version,
+            row=cmd.get("row"),
+            column=cmd.get("column"),
+            filename=cmd.get("filename"),
+        )
+
+        if "edit" in cmd:
+            known_version, known_source = self._editor_sources.get(cmd.doc_id, (None, None))
+            if known_version != cmd.base_version:
+                # eg. backend has been restarted or a command got discarded
+                self._editor_sources.pop(cmd.doc_id, None)
+                return dict(template, out_of_sync=True)
+            cmd["source"] = apply_text_edit(known_source, cmd.edit)
+
+        self._editor_sources[cmd.doc_id] = (cmd.version, cmd.source)
+        cmd["source_prepared"] = True
+
+        if self._has_newer_command_for_document(cmd):
+            return dict(template, cancelled=True)
+
+        return None
+
+    def _cmd_warm_up_editor_analysis(self, cmd):
+        """Back-ends providing code analysis may prepare for given modules in idle time"""
+        return {}
+
+    def _has_newer_command_for_document(self, cmd) -> bool:
+        with self._incoming_message_queue.mutex:
+            return any(
+                isinstance(msg, InlineCommand)
+                and msg.name == cmd.name
+                and msg.get("doc_id") == cmd.doc_id
+                for msg in self._incoming_message_queue.queue
+            )
+
     def _cmd_get_dirs_children_info(self, cmd):
         """Provides information about immediate children of paths opened in a file browser"""
         data = {
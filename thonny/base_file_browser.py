@@ -1,6 +1,8 @@
 import datetime
+import logging
 import os.path
 import subprocess
+import threading
 import time
 import tkinter as tk
 from tkinter import messagebox, ttk
@@ -26,11 +28,26 @@ ROOT_NODE_ID = ""
 
 HIDDEN_FILES_OPTION = "file.show_hidden_files"
 
+# how often (ms) the browsers check for changes in the shown directories
+LOCAL_REFRESH_INTERVAL = 2000
+REMOTE_REFRESH_INTERVAL = 10000
+# listings made this soon (s) after the modification of the directory are not trusted
+# (another change may have happened during the same mtime tick)
+MTIME_GRANULARITY = 2.0
+
+logger = logging.getLogger(__name__)
+
 
 class BaseFileBrowser(ttk.Frame):
+    # ms between checks for changed directories (None means no automatic refresh)
+    auto_refresh_interval = None
+
     def __init__(self, master, show_expand_buttons=True):
         self.show_expand_buttons = show_expand_buttons
         self._cached_child_data = {}
+        # directory path -> children data last rendered for it
+        # (allows updating only the nodes which have changed)
+        self._rendered_child_data = {}
         self.path_to_highlight = None
 
         ttk.Frame.__init__(self, master, borderwidth=0, relief="flat")
@@ -95,6 +112,9 @@ class BaseFileBrowser(ttk.Frame):
         self.menu = tk.Menu(self.tree, tearoff=False)
         self.current_focus = None
 
+        self._auto_refresh_after_id = None
+        self._schedule_auto_refresh()
+
     def init_header(self, row, column):
         header_frame = ttk.Frame(self, style="ViewToolbar.TFrame")
         header_frame.grid(row=row, column=column, sticky="nsew")
@@ -170,6 +190,7 @@ class BaseFileBrowser(ttk.Frame):
     def clear(self):
         self.clear_error()
         self.invalidate_cache()
+        self._rendered_child_data.clear()
         self.path_bar.direct_delete("1.0", "end")
         self.tree.set_children("")
         self.current_focus = None
@@ -180,6 +201,7 @@ class BaseFileBrowser(ttk.Frame):
     def focus_into(self, path):
         self.clear_error()
         self.invalidate_cache()
+        self._rendered_child_data.clear()
 
         # clear
         self.tree.set_children(ROOT_NODE_ID)
@@ -227,10 +249,12 @@ class BaseFileBrowser(ttk.Frame):
     def on_open_node(self, event):
         node_id = self.get_selected_node()
         path = self.tree.set(node_id, "path")
-        if path:  # and path not in self._cached_child_data:
+        if path:
+            was_cached = path in self._cached_child_data
             self.render_children_from_cache(node_id)
-            # self.request_dirs_child_data(node_id, [path])
-        # else:
+            if was_cached:
+                # listing may be outdated, if the directory has been closed for a while
+                self.refresh_changed([path])
 
     def resize_path_bar(self, event=None):
         if self.building_breadcrumbs:
@@ -336,15 +360,12 @@ class BaseFileBrowser(ttk.Frame):
         messagebox.showinfo(tr("Storage info"), text, master=self)
 
     def cache_dirs_child_data(self, data):
-        from copy import deepcopy
-
-        data = deepcopy(data)
-
-        for parent_path in data:
-            children_data = data[parent_path]
+        # Completes the data in place (without copying). Same data may be given to
+        # several browsers (eg. remote responses), which is OK as completing it again
+        # doesn't change it.
+        for parent_path, children_data in data.items():
             if isinstance(children_data, dict):
-                for child_name in children_data:
-                    child_data = children_data[child_name]
+                for child_name, child_data in children_data.items():
                     assert isinstance(child_data, dict)
                     if "label" not in child_data:
                         child_data["label"] = child_name
@@ -356,17 +377,20 @@ class BaseFileBrowser(ttk.Frame):
 
         self._cached_child_data.update(data)
 
-    def file_exists_in_cache(self, path):
-        for parent_path in self._cached_child_data:
-            # hard to split because it may not be in this system format
-            name = path[len(parent_path) :]
-            if name[0:1] in ["/", "\\"]:
-                name = name[1:]
+    def get_parent_and_name(self, path):
+        sep = self.get_dir_separator()
+        if sep not in path:
+            return "", path
 
-            if name in self._cached_child_data[parent_path]:
-                return True
+        parent, name = path.rsplit(sep, 1)
+        if not parent and sep == "/":
+            parent = "/"
+        return parent, name
 
-        return False
+    def file_exists_in_cache(self, path):
+        parent, name = self.get_parent_and_name(path)
+        children_data = self._cached_child_data.get(parent)
+        return isinstance(children_data, dict) and name in children_data
 
     def select_path_if_visible(self, path, node_id=""):
         for child_id in self.tree.get_children(node_id):
@@ -404,7 +428,8 @@ class BaseFileBrowser(ttk.Frame):
         path = self.tree.set(node_id, "path")
 
         if path not in self._cached_child_data:
-            self.request_dirs_child_data(node_id, self.get_open_paths() | {path})
+            missing_paths = {p for p in self.get_open_paths() if p not in self._cached_child_data}
+            self.request_dirs_child_data(node_id, missing_paths | {path})
             # leave it as is for now, it will be updated later
             return
 
@@ -428,6 +453,7 @@ class BaseFileBrowser(ttk.Frame):
         else:
             fs_children_names = children_data.keys()
             tree_children_ids = self.tree.get_children(node_id)
+            rendered_data = self._rendered_child_data.get(path, {})
 
             # recollect children
             children = {}
@@ -437,7 +463,8 @@ class BaseFileBrowser(ttk.Frame):
                 name = self.tree.set(child_id, "name")
                 if name in fs_children_names:
                     children[name] = child_id
-                    self.update_node_data(child_id, name, children_data[name])
+                    if rendered_data.get(name) != children_data[name]:
+                        self.update_node_data(child_id, name, children_data[name])
 
             # add missing children
             for name in fs_children_names:
@@ -461,7 +488,9 @@ class BaseFileBrowser(ttk.Frame):
             ids_sorted_by_name = list(
                 map(lambda key: children[key], sorted(children.keys(), key=file_order))
             )
-            self.tree.set_children(node_id, *ids_sorted_by_name)
+            if tuple(ids_sorted_by_name) != tree_children_ids:
+                self.tree.set_children(node_id, *ids_sorted_by_name)
+            self._rendered_child_data[path] = children_data
 
             # recursively update open children
             for child_id in ids_sorted_by_name:
@@ -652,6 +681,8 @@ class BaseFileBrowser(ttk.Frame):
         get_workbench().set_option(
             HIDDEN_FILES_OPTION, not get_workbench().get_option(HIDDEN_FILES_OPTION)
         )
+        # all listings are wrong now
+        self.invalidate_cache()
         self.refresh_tree()
 
     def cmd_refresh_tree(self):
@@ -737,6 +768,12 @@ class BaseFileBrowser(ttk.Frame):
         messagebox.showinfo(title, text.strip(), master=self)
 
     def refresh_tree(self, paths_to_invalidate=None):
+        """Lists given directories (by default the open ones) again.
+
+        Tree keeps showing old listings until new ones arrive and then gets updated
+        only where the data has changed."""
+        if paths_to_invalidate is None:
+            paths_to_invalidate = self.get_open_paths()
         self.invalidate_cache(paths_to_invalidate)
         if self.winfo_ismapped():
             self.render_children_from_cache("")
@@ -745,6 +782,38 @@ class BaseFileBrowser(ttk.Frame):
             self.select_path_if_visible(self.path_to_highlight)
             self.path_to_highlight = None
 
+    def refresh_changed(self, paths=None):
+        """Lists again the directories among given (by default the open ones),
+        which may have changed"""
+        if paths is None:
+            paths = self.get_open_paths()
+        changed_paths = self.get_changed_paths(paths)
+        if changed_paths:
+            self.refresh_tree(changed_paths)
+
+    def get_changed_paths(self, paths):
+        # without cheaper ways, the directories need to be listed again for checking
+        return set(paths)
+
+    def _schedule_auto_refresh(self):
+        if self.auto_refresh_interval:
+            self._auto_refresh_after_id = self.after(self.auto_refresh_interval, self._auto_refresh)
+
+    def _auto_refresh(self):
+        try:
+            if self.current_focus is not None and self.winfo_ismapped():
+                self.refresh_changed()
+        except Exception:
+            logger.exception("Could not refresh file browser")
+        finally:
+            self._schedule_auto_refresh()
+
+    def destroy(self):
+        if self._auto_refresh_after_id is not None:
+            self.after_cancel(self._auto_refresh_after_id)
+            self._auto_refresh_after_id = None
+        super().destroy()
+
     def create_new_file(self):
         selected_node_id = self.get_selected_node()
 
@@ -863,21 +932,123 @@ class BaseFileBrowser(ttk.Frame):
         return get_workbench().get_option(get_file_handler_conf_key(ext), "system") == "thonny"
 
 
+class DirectoryWatcher:
+    """Collects the directories where something has changed (with watchdog, if available,
+    which uses inotify, FSEvents or ReadDirectoryChangesW)"""
+
+    def __init__(self):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self._lock = threading.Lock()
+        self._changed_paths = set()
+        self._watches = {}
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                watcher._register_event(event)
+
+        self._handler = Handler()
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.start()
+
+    @classmethod
+    def create(cls):
+        try:
+            return cls()
+        except Exception:
+            # ImportError or missing OS support
+            return None
+
+    def _register_event(self, event):
+        with self._lock:
+            for path in [event.src_path, getattr(event, "dest_path", None)]:
+                if not path:
+                    continue
+                # event may concern the watched directory itself or its child
+                for candidate in [path, os.path.dirname(path)]:
+                    if candidate in self._watches:
+                        self._changed_paths.add(candidate)
+
+    def watch(self, paths):
+        """Watches (non-recursively) given directories and only these"""
+        for path in set(self._watches) - set(paths):
+            self._observer.unschedule(self._watches.pop(path))
+
+        for path in paths:
+            if path not in self._watches and os.path.isdir(path):
+                try:
+                    self._watches[path] = self._observer.schedule(
+                        self._handler, path, recursive=False
+                    )
+                except OSError:
+                    logger.exception("Could not watch %s", path)
+
+    def pop_changed(self, paths):
+        """Returns the directories among given which have changed since last asked"""
+        with self._lock:
+            result = {path for path in paths if path in self._changed_paths}
+            self._changed_paths -= result
+        return result
+
+    def close(self):
+        self._observer.stop()
+
+
 class BaseLocalFileBrowser(BaseFileBrowser):
+    auto_refresh_interval = LOCAL_REFRESH_INTERVAL
+
     def __init__(self, master, show_expand_buttons=True):
+        # path -> (mtime of the directory, time of listing)
+        self._listing_times = {}
+        self._watcher = DirectoryWatcher.create()
         super().__init__(master, show_expand_buttons=show_expand_buttons)
         get_workbench().bind("WindowFocusIn", self.on_window_focus_in, True)
         get_workbench().bind("LocalFileOperation", self.on_local_file_operation, True)
 
     def destroy(self):
         super().destroy()
+        if self._watcher is not None:
+            self._watcher.close()
         get_workbench().unbind("WindowFocusIn", self.on_window_focus_in)
         get_workbench().unbind("LocalFileOperation", self.on_local_file_operation)
 
     def request_dirs_child_data(self, node_id, paths):
+        for path in paths:
+            # before listing, so that concurrent changes make the listing stale
+            self._listing_times[path] = (_get_dir_mtime(path), time.time())
         self.cache_dirs_child_data(get_dirs_children_info(paths, show_hidden_files()))
         self.render_children_from_cache(node_id)
 
+    def get_parent_and_name(self, path):
+        return os.path.split(path)
+
+    def get_changed_paths(self, paths):
+        if self._watcher is not None:
+            self._watcher.watch(self.get_open_paths())
+            changed_paths = self._watcher.pop_changed(paths)
+        else:
+            changed_paths = set()
+
+        for path in paths:
+            if path == "" or path in changed_paths:
+                # list of drives gets refreshed only on request
+                continue
+
+            listing_time = self._listing_times.get(path)
+            if (
+                listing_time is None
+                or listing_time[0] is None
+                or listing_time[0] != _get_dir_mtime(path)
+                or listing_time[1] - listing_time[0] < MTIME_GRANULARITY
+            ):
+                changed_paths.add(path)
+
+        return changed_paths
+
     def split_path(self, path):
         parts = super().split_path(path)
         if running_on_windows() and path.startswith("\\\\"):
@@ -900,11 +1071,12 @@ class BaseLocalFileBrowser(BaseFileBrowser):
         open_with_default_app(path)
 
     def on_window_focus_in(self, event=None):
-        self.refresh_tree()
+        self.refresh_changed()
 
     def on_local_file_operation(self, event):
         if event["operation"] in ["save", "delete"]:
-            self.refresh_tree()
+            # saving may change only the size of the file, which doesn't change dir mtime
+            self.refresh_tree([os.path.dirname(event["path"])])
             self.select_path_if_visible(event["path"])
 
     def request_fs_info(self, path):
@@ -942,6 +1114,8 @@ class BaseLocalFileBrowser(BaseFileBrowser):
 
 
 class BaseRemoteFileBrowser(BaseFileBrowser):
+    auto_refresh_interval = REMOTE_REFRESH_INTERVAL
+
     def __init__(self, master, show_expand_buttons=True):
         super().__init__(master, show_expand_buttons=show_expand_buttons)
         self.dir_separator = "/"
@@ -978,6 +1152,12 @@ class BaseRemoteFileBrowser(BaseFileBrowser):
         if get_runner():
             get_runner().send_command(InlineCommand("get_fs_info", path=path))
 
+    def refresh_changed(self, paths=None):
+        # new listings get compared to the cached ones when they arrive
+        runner = get_runner()
+        if runner is not None and runner.ready_for_remote_file_operations():
+            super().refresh_changed(paths)
+
     def get_dir_separator(self):
         return self.dir_separator
 
@@ -1025,13 +1205,7 @@ class BaseRemoteFileBrowser(BaseFileBrowser):
             # No need to refresh
             return
 
-        if "/" in path:
-            parent = path[: path.rfind("/")]
-            if not parent:
-                parent = "/"
-        else:
-            parent = ""
-
+        parent, _ = self.get_parent_and_name(path)
         self.refresh_tree([parent])
         self.path_to_highlight = path
 
@@ -1331,6 +1505,13 @@ def open_with_default_app(path):
         subprocess.run(["xdg-open", path])
 
 
+def _get_dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
 def get_file_handler_conf_key(extension):
     return "file_default_handlers.%s" % extension
 
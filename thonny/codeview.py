@@ -5,8 +5,9 @@ import os
 import re
 import sys
 import tkinter as tk
+from bisect import bisect_left
 from tkinter import messagebox
-from typing import Dict, Union  # @UnusedImport
+from typing import Dict, List, Union  # @UnusedImport
 
 from thonny import get_workbench, roughparse, tktextext, ui_utils
 from thonny.common import TextRange
@@ -159,16 +160,13 @@ class CodeView(tktextext.EnhancedTextFrame):
         get_workbench().bind("SyntaxThemeChanged", self._reload_theme_options, True)
         self._original_newlines = os.linesep
         self._reload_theme_options()
+        # text line numbers of breakpoints, sorted (used only for drawing the gutter)
+        self._breakpoint_lines = []  # type: List[int]
+        self.text.bind("<<TextChange>>", self._on_text_change_for_breakpoints, True)
         self._gutter.bind("<Double-Button-1>", self._toggle_breakpoint, True)
         # self.text.tag_configure("breakpoint_line", background="pink")
-        self._gutter.tag_configure("breakpoint", foreground="crimson")
-
-        editor_font = tk.font.nametofont("EditorFont")
-        spacer_font = editor_font.copy()
-        spacer_font.configure(size=editor_font.cget("size") // 4)
-        self._gutter.tag_configure("spacer", font=spacer_font)
-        self._gutter.tag_configure("active", font="BoldEditorFont")
-        self._gutter.tag_raise("spacer")
+        self.gutter_tag_configure("breakpoint", foreground="crimson")
+        self.gutter_tag_configure("active", font="BoldEditorFont")
 
     def get_content(self):
         return self.text.get("1.0", "end-1c")  # -1c because Text always adds a newline itself
@@ -259,9 +257,9 @@ class CodeView(tktextext.EnhancedTextFrame):
             self.text.edit_reset()
 
     def _toggle_breakpoint(self, event):
-        index = "@%d,%d" % (event.x, event.y)
-        start_index = index + " linestart"
-        end_index = index + " lineend"
+        line = self._get_gutter_event_line(event)
+        start_index = "%d.0" % line
+        end_index = "%d.0 lineend" % line
 
         if self.text.tag_nextrange("breakpoint_line", start_index, end_index):
             self.text.tag_remove("breakpoint_line", start_index, end_index)
@@ -270,31 +268,37 @@ class CodeView(tktextext.EnhancedTextFrame):
             if line_content and line_content[0] != "#":
                 self.text.tag_add("breakpoint_line", start_index, end_index)
 
-        self.update_gutter(clean=True)
+        self._update_breakpoint_lines()
+        self.update_gutter()
+
+    def _get_breakpoint_text_lines(self):
+        ranges = self.text.tag_ranges("breakpoint_line")
+        return sorted({int(str(start).split(".")[0]) for start in ranges[::2]})
+
+    def _update_breakpoint_lines(self):
+        self._breakpoint_lines = self._get_breakpoint_text_lines()
+
+    def _on_text_change_for_breakpoints(self, event=None):
+        # breakpoint tags move together with the text and vanish with deleted text
+        # (edits can't create new breakpoints)
+        if self._breakpoint_lines:
+            old_lines = self._breakpoint_lines
+            self._update_breakpoint_lines()
+            if self._breakpoint_lines != old_lines:
+                self._schedule_gutter_update()
 
     def _clean_selection(self):
         self.text.tag_remove("sel", "1.0", "end")
-        self._gutter.tag_remove("sel", "1.0", "end")
 
-    def _text_changed(self, event):
-        self.update_gutter(
-            clean=self.text._last_event_changed_line_count
-            and self.text.tag_ranges("breakpoint_line")
-        )
+    def compute_gutter_line(self, lineno):
+        yield str(lineno), ()
 
-    def compute_gutter_line(self, lineno, plain=False):
-        if plain:
-            yield str(lineno) + " ", ()
+        text_line = lineno - self._first_line_number + 1
+        i = bisect_left(self._breakpoint_lines, text_line)
+        if i < len(self._breakpoint_lines) and self._breakpoint_lines[i] == text_line:
+            yield BREAKPOINT_SYMBOL, ("breakpoint",)
         else:
-            visual_line_number = self._first_line_number + lineno - 1
-            linestart = str(visual_line_number) + ".0"
-
-            yield str(lineno), ()
-
-            if self.text.tag_nextrange("breakpoint_line", linestart, linestart + " lineend"):
-                yield BREAKPOINT_SYMBOL, ("breakpoint",)
-            else:
-                yield " ", ()
+            yield " ", ()
 
     def select_range(self, text_range):
         self.text.tag_remove("sel", "1.0", tk.END)
@@ -323,11 +327,7 @@ class CodeView(tktextext.EnhancedTextFrame):
             self.text.see("%s -1 lines" % start)
 
     def get_breakpoint_line_numbers(self):
-        result = set()
-        for num_line in self._gutter.get("1.0", "end").splitlines():
-            if BREAKPOINT_SYMBOL in num_line:
-                result.add(int(num_line.replace(BREAKPOINT_SYMBOL, "")))
-        return result
+        return {line + self._first_line_number - 1 for line in self._get_breakpoint_text_lines()}
 
     def get_selected_range(self):
         if self.text.has_selection():
@@ -346,22 +346,14 @@ class CodeView(tktextext.EnhancedTextFrame):
     def _reload_gutter_theme_options(self, event=None):
         # super()._reload_gutter_theme_options(event)
         if "GUTTER" in _syntax_options:
-            opts = _syntax_options["GUTTER"].copy()
-            if "background" in opts and "selectbackground" not in opts:
-                opts["selectbackground"] = opts["background"]
-                opts["inactiveselectbackground"] = opts["background"]
-            if "foreground" in opts and "selectforeground" not in opts:
-                opts["selectforeground"] = opts["foreground"]
-
-            self._gutter.configure(opts)
+            opts = _syntax_options["GUTTER"]
+            self.configure_gutter(**opts)
 
             if "background" in opts:
-                background = opts["background"]
-                self._margin_line.configure(background=background)
-                self._gutter.tag_configure("sel", background=background)
+                self._margin_line.configure(background=opts["background"])
 
         if "breakpoint" in _syntax_options:
-            self._gutter.tag_configure("breakpoint", _syntax_options["breakpoint"])
+            self.gutter_tag_configure("breakpoint", **_syntax_options["breakpoint"])
 
 
 def set_syntax_options(syntax_options):
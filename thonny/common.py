@@ -288,6 +288,37 @@ def read_source(filename):
         return fp.read()
 
 
+def compute_text_edit(old: str, new: str) -> Tuple[int, int, str]:
+    """Returns (start, end, replacement) so that old[:start] + replacement + old[end:] == new"""
+    limit = min(len(old), len(new))
+
+    # binary search with slice comparisons is much faster than comparing char by char
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix_len = lo
+
+    lo, hi = 0, limit - prefix_len
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid :] == new[len(new) - mid :]:
+            lo = mid
+        else:
+            hi = mid - 1
+    suffix_len = lo
+
+    return prefix_len, len(old) - suffix_len, new[prefix_len : len(new) - suffix_len]
+
+
+def apply_text_edit(source: str, edit: Tuple[int, int, str]) -> str:
+    start, end, replacement = edit
+    return source[:start] + replacement + source[end:]
+
+
 def get_exe_dirs():
     result = []
     if site.ENABLE_USER_SITE:
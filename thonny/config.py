@@ -9,6 +9,7 @@ import sys
 import tkinter as tk
 from configparser import ConfigParser
 from logging import exception
+from typing import Any, Callable, Dict, List  # @UnusedImport
 
 from thonny import THONNY_USER_DIR
 
@@ -17,6 +18,9 @@ logger = logging.getLogger(__name__)
 
 _manager_cache = {}
 
+# marks missing values in the option cache
+_MISSING = object()
+
 
 def try_load_configuration(filename):
     if filename in _manager_cache:
@@ -51,6 +55,12 @@ class ConfigurationManager:
         self._defaults = {}
         self._defaults_overrides_str = {}
         self._variables = {}  # Tk variables
+        # Parsed values of the options, by the names used in get_option.
+        # Entries are dropped when the option gets a new value or default.
+        self._cache = {}  # type: Dict[str, Any]
+        self._listeners = {}  # type: Dict[str, List[Callable[[Any], None]]]
+        # last values passed to the listeners
+        self._listened_values = {}  # type: Dict[str, Any]
 
         if os.path.exists(self._filename):
             with open(self._filename, "r", encoding="UTF-8") as fp:
@@ -104,6 +114,20 @@ class ConfigurationManager:
                 self._defaults_overrides_str[section + "." + key] = defparser[section][key]
 
     def get_option(self, name, secondary_default=None):
+        value = self._cache.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = self._compute_option(name)
+        if value is _MISSING:
+            return secondary_default
+
+        # mutable values are parsed anew, so that callers can't modify the cached copy
+        if not isinstance(value, (list, dict, set)):
+            self._cache[name] = value
+        return value
+
+    def _compute_option(self, name):
         section, option = self._parse_name(name)
         name = section + "." + option
 
@@ -124,7 +148,7 @@ class ConfigurationManager:
             if name in self._defaults:
                 return self._defaults[name]
             else:
-                return secondary_default
+                return _MISSING
 
     def has_option(self, name):
         return name in self._defaults
@@ -144,6 +168,8 @@ class ConfigurationManager:
         if name in self._variables:
             self._variables[name].set(value)
 
+        self._option_changed(name)
+
     def set_default(self, name, primary_default_value):
         # normalize name
         section, option = self._parse_name(name)
@@ -159,6 +185,55 @@ class ConfigurationManager:
             value = primary_default_value
 
         self._defaults[name] = value
+        self._option_changed(name)
+
+    def add_option_listener(self, name: str, callback: Callable[[Any], None]) -> None:
+        """Makes callback get called with the new value when the option changes
+        (via set_option or its Tk variable).
+
+        Allows keeping a local copy of the value instead of asking it repeatedly."""
+        section, option = self._parse_name(name)
+        name = section + "." + option
+        if name not in self._listeners:
+            self._listeners[name] = []
+            self._listened_values[name] = self.get_option(name)
+        self._listeners[name].append(callback)
+
+    def remove_option_listener(self, name: str, callback: Callable[[Any], None]) -> None:
+        section, option = self._parse_name(name)
+        name = section + "." + option
+        listeners = self._listeners.get(name, [])
+        if callback in listeners:
+            listeners.remove(callback)
+        if not listeners:
+            self._listeners.pop(name, None)
+            self._listened_values.pop(name, None)
+
+    def _option_changed(self, name):
+        """name must be normalized"""
+        self._cache.pop(name, None)
+        section, option = name.split(".", 1)
+        if section == "general":
+            self._cache.pop(option, None)
+
+        if name not in self._listeners:
+            return
+
+        try:
+            value = self.get_option(name)
+        except tk.TclError:
+            # Tk variable has an unparseable value (eg. while the user is editing it)
+            return
+
+        if value == self._listened_values[name]:
+            return
+
+        self._listened_values[name] = value
+        for callback in list(self._listeners.get(name, [])):
+            try:
+                callback(value)
+            except Exception:
+                logger.exception("Problem in listener of option %s", name)
 
     def get_variable(self, name: str) -> tk.Variable:
         section, option = self._parse_name(name)
@@ -181,6 +256,9 @@ class ConfigurationManager:
                     "Can't create Tk Variable for " + name + ". Type is " + str(type(value))
                 )
             self._variables[name] = var
+            # the variable may be changed by a widget
+            var.trace_add("write", lambda *args: self._option_changed(name))
+            self._option_changed(name)
             return var
 
     def save(self):
@@ -0,0 +1,103 @@
+"""
+Decorations are tags derived from the document model (eg. statement boxes, cell headers,
+local names). For big files it doesn't pay off to tag the whole text, therefore
+decorations get materialized only for the visible lines and a margin around them.
+When the text is scrolled out of the margin, decorations are recomputed for the new
+range and the old ones are evicted, so the cost depends on the size of the screen,
+not on the size of the file.
+"""
+from typing import Iterable, List, Optional, Tuple  # @UnusedImport
+
+from thonny.document_model import DocumentModel, get_document_model
+
+# How many lines above and below the visible part get decorated
+VIEWPORT_MARGIN_LINES = 100
+
+
+def get_visible_lines(text) -> Tuple[int, int]:
+    """Returns first and last (partially) visible line number"""
+    first_line = int(text.index("@0,0").split(".")[0])
+    last_line = int(text.index("@%d,%d" % (text.winfo_width(), text.winfo_height())).split(".")[0])
+    return first_line, last_line
+
+
+class ViewportDecorator:
+    """Base class for decorations which are materialized only near the visible part
+    of the text.
+
+    Subclasses list their tags and implement compute_ranges."""
+
+    tags = []  # type: List[str]
+
+    def __init__(self, text):
+        self.text = text
+        self._update_scheduled = False
+        # (model version, first line, last line) of materialized decorations
+        self._materialized = None  # type: Optional[Tuple[int, int, int]]
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def compute_ranges(
+        self, model: DocumentModel, first_line: int, last_line: int
+    ) -> Optional[Iterable[Tuple[str, str, str]]]:
+        """Returns (tag, start_index, end_index) for decorations touching given lines
+        or None if the data is not ready yet (current decorations are then kept)"""
+        raise NotImplementedError()
+
+    def schedule_update(self):
+        def perform_update():
+            try:
+                self.update()
+            finally:
+                self._update_scheduled = False
+
+        if not self._update_scheduled:
+            self._update_scheduled = True
+            self.text.after_idle(perform_update)
+
+    def invalidate(self):
+        """Makes next update recompute the decorations even if the text hasn't changed"""
+        self._materialized = None
+
+    def update(self):
+        if not self.is_enabled():
+            if self._materialized is not None:
+                self.clear()
+            return
+
+        model = get_document_model(self.text)
+        version = model.get_version()
+        first_visible, last_visible = get_visible_lines(self.text)
+
+        if self._materialized is not None:
+            materialized_version, materialized_first, materialized_last = self._materialized
+            if (
+                materialized_version == version
+                and materialized_first <= first_visible
+                and last_visible <= materialized_last
+            ):
+                return
+
+        line_count = int(self.text.index("end-1c").split(".")[0])
+        first_line = max(1, first_visible - VIEWPORT_MARGIN_LINES)
+        last_line = min(line_count, last_visible + VIEWPORT_MARGIN_LINES)
+
+        ranges = self.compute_ranges(model, first_line, last_line)
+        if ranges is None:
+            return
+
+        with self.text.tag_batch() as batch:
+            # evicts also the decorations outside of the new range
+            for tag in self.tags:
+                batch.remove(tag)
+            for tag, start_index, end_index in ranges:
+                batch.add(tag, start_index, end_index)
+
+        self._materialized = (version, first_line, last_line)
+
+    def clear(self):
+        with self.text.tag_batch() as batch:
+            for tag in self.tags:
+                batch.remove(tag)
+        self._materialized = None
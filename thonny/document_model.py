@@ -0,0 +1,297 @@
+"""
+Shared model of the content of a text widget.
+
+Editor plugins used to fetch and parse the whole source on their own, several times
+per keypress. The model fetches the source once per version of the text, keeps a parso
+tree which gets updated incrementally and caches the results of registered analyses
+(eg. cells, outline, local names) until the text changes again.
+
+Heavier analyses can be run in a background thread on a snapshot of the model
+(see DocumentModel.analyze_in_background).
+"""
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple  # @UnusedImport
+
+logger = logging.getLogger(__name__)
+
+# How often (in ms) UI thread checks for finished background analyses
+ANALYSIS_POLL_INTERVAL = 20
+
+_analyses = {}  # type: Dict[str, Callable[[Any], Any]]
+_worker = None  # type: Optional[_AnalysisWorker]
+_last_parsed_snapshots = {}  # type: Dict[str, DocumentSnapshot]
+
+# parso's parser cache (used also by jedi) is global and not thread-safe, therefore
+# all parsing in the front-end process (in UI and analysis thread) must hold this lock
+parser_lock = threading.RLock()
+
+
+def register_analysis(name: str, compute: Callable[[Any], Any]) -> None:
+    """Registers a function which derives data from the model (or a snapshot of it).
+    Its result is computed on first request and reused until the text changes."""
+    _analyses[name] = compute
+
+
+def get_document_model(text) -> "DocumentModel":
+    model = getattr(text, "document_model", None)
+    if model is None:
+        model = DocumentModel(text)
+        text.document_model = model
+        text.bind("<Destroy>", model.dispose, True)
+
+    return model
+
+
+def _parse(source, path):
+    import parso
+
+    with parser_lock:
+        grammar = parso.load_grammar()
+        try:
+            return grammar.parse(source, path=path, diff_cache=True)
+        except Exception:
+            logger.exception("Incremental parsing failed, parsing from scratch")
+            _forget_parse_cache(path)
+            return grammar.parse(source, path=path, diff_cache=True)
+
+
+def _forget_parse_cache(path):
+    from pathlib import Path
+
+    from parso.cache import parser_cache
+
+    with parser_lock:
+        for grammar_cache in list(parser_cache.values()):
+            grammar_cache.pop(Path(path), None)
+
+
+class DocumentModel:
+    def __init__(self, text):
+        self.text = text
+        self._version = 0
+        self._source = None  # type: Optional[str]
+        # Content version of the widget corresponding to self._source
+        # (TweakableText counts its changes, for other widgets the source needs to be compared)
+        self._text_version = None
+        self._results = {}  # type: Dict[str, Tuple[int, Any]]
+        self._tree = None
+        self._tree_version = None
+        # identify this document in parso's diff cache
+        # (the analysis thread keeps its own tree)
+        self._parse_path = "<thonny-document-%d>" % id(self)
+        self._snapshot_parse_path = self._parse_path + "-snapshot"
+        self._snapshot = None  # type: Optional[DocumentSnapshot]
+
+        self._request_ids = {}  # type: Dict[str, int]
+        self._callbacks = {}  # type: Dict[str, Callable[[Any], None]]
+        self._unfinished_keys = set()  # type: Set[str]
+        self._finished_analyses = queue.Queue()
+        self._poll_scheduled = False
+        self._disposed = False
+
+    def get_version(self) -> int:
+        self._refresh()
+        return self._version
+
+    def get_source(self) -> str:
+        """Returns the whole content of the text (including the newline Text adds to the end)"""
+        self._refresh()
+        return self._source
+
+    def get_tree(self):
+        """Returns parso module for current source.
+
+        NB! The tree is updated in place when the source changes, so it must not be
+        kept across versions."""
+        source = self.get_source()
+        if self._tree_version != self._version:
+            self._tree = _parse(source, self._parse_path)
+            self._tree_version = self._version
+
+        return self._tree
+
+    def get(self, analysis_name: str) -> Any:
+        """Returns the result of registered analysis for current version"""
+        version = self.get_version()
+        cached = self._results.get(analysis_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        value = _analyses[analysis_name](self)
+        self._results[analysis_name] = (version, value)
+        return value
+
+    def snapshot(self) -> "DocumentSnapshot":
+        """Returns current version of the document, which can be analyzed in another thread"""
+        version = self.get_version()
+        if self._snapshot is None or self._snapshot.get_version() != version:
+            self._snapshot = DocumentSnapshot(self._source, version, self._snapshot_parse_path)
+
+        return self._snapshot
+
+    def analyze_in_background(
+        self,
+        key: str,
+        compute: Callable[["DocumentSnapshot"], Any],
+        callback: Callable[[Any], None],
+    ) -> None:
+        """Computes compute(snapshot) in the analysis thread and passes the result
+        to callback in the UI thread.
+
+        The result is dropped if the text has changed meanwhile or if a newer request with
+        same key has been made. Requests which haven't been started yet are replaced by
+        newer requests with same key."""
+        request_id = self._request_ids.get(key, 0) + 1
+        self._request_ids[key] = request_id
+        self._callbacks[key] = callback
+        self._unfinished_keys.add(key)
+        snapshot = self.snapshot()
+
+        def on_done(result, error):
+            self._finished_analyses.put((key, request_id, snapshot.get_version(), result, error))
+
+        _get_worker().submit((id(self), key), compute, snapshot, on_done)
+        self._schedule_poll()
+
+    def _schedule_poll(self):
+        if not self._poll_scheduled:
+            self._poll_scheduled = True
+            self.text.after(ANALYSIS_POLL_INTERVAL, self._poll_finished_analyses)
+
+    def _poll_finished_analyses(self):
+        self._poll_scheduled = False
+        if self._disposed:
+            return
+
+        while not self._finished_analyses.empty():
+            key, request_id, version, result, error = self._finished_analyses.get()
+            if request_id != self._request_ids.get(key):
+                # newer request has been made
+                continue
+
+            self._unfinished_keys.discard(key)
+            if error is None and version == self.get_version():
+                self._apply_result(key, result)
+
+        if self._unfinished_keys:
+            self._schedule_poll()
+
+    def _apply_result(self, key, result):
+        try:
+            self._callbacks[key](result)
+        except Exception:
+            logger.exception("Problem when applying result of %s", key)
+
+    def _refresh(self):
+        if hasattr(self.text, "get_content_version"):
+            text_version = self.text.get_content_version()
+            if text_version == self._text_version and self._source is not None:
+                return
+            source = self.text.get("1.0", "end")
+        else:
+            text_version = None
+            source = self.text.get("1.0", "end")
+            if source == self._source:
+                return
+
+        self._text_version = text_version
+        self._source = source
+        self._version += 1
+        self._results.clear()
+
+    def dispose(self, event=None):
+        if event is not None and event.widget is not self.text:
+            return
+
+        self._disposed = True
+        if self._tree is not None:
+            _forget_parse_cache(self._parse_path)
+        _forget_parse_cache(self._snapshot_parse_path)
+        _last_parsed_snapshots.pop(self._snapshot_parse_path, None)
+        self._tree = None
+        self._snapshot = None
+        self._results.clear()
+
+
+class DocumentSnapshot:
+    """One version of a document. Unlike DocumentModel it doesn't touch Tk,
+    so it can be used in the analysis thread."""
+
+    def __init__(self, source: str, version: int, parse_path: Optional[str] = None):
+        self._source = source
+        self._version = version
+        self._parse_path = parse_path
+        self._tree = None
+        self._results = {}  # type: Dict[str, Any]
+        self._lock = threading.Lock()
+
+    def get_version(self) -> int:
+        return self._version
+
+    def get_source(self) -> str:
+        return self._source
+
+    def get_tree(self):
+        with self._lock:
+            if self._parse_path is None:
+                if self._tree is None:
+                    import parso
+
+                    with parser_lock:
+                        self._tree = parso.parse(self._source)
+
+            elif self._tree is None or _last_parsed_snapshots.get(self._parse_path) is not self:
+                # diff parser updates the tree of previous snapshot in place
+                self._tree = _parse(self._source, self._parse_path)
+                _last_parsed_snapshots[self._parse_path] = self
+
+            return self._tree
+
+    def get(self, analysis_name: str) -> Any:
+        if analysis_name not in self._results:
+            self._results[analysis_name] = _analyses[analysis_name](self)
+
+        return self._results[analysis_name]
+
+
+class _AnalysisWorker(threading.Thread):
+    """Single thread performing background analyses for all documents"""
+
+    def __init__(self):
+        super().__init__(name="DocumentAnalysis", daemon=True)
+        self._condition = threading.Condition()
+        self._requests = OrderedDict()  # type: OrderedDict
+
+    def submit(self, request_key, compute, snapshot, on_done):
+        with self._condition:
+            # drop the stale request with same key (if it hasn't been started yet)
+            self._requests.pop(request_key, None)
+            self._requests[request_key] = (compute, snapshot, on_done)
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._requests:
+                    self._condition.wait()
+                _, (compute, snapshot, on_done) = self._requests.popitem(last=False)
+
+            try:
+                result = compute(snapshot)
+            except Exception as e:
+                logger.exception("Problem in background analysis")
+                on_done(None, e)
+            else:
+                on_done(result, None)
+
+
+def _get_worker() -> _AnalysisWorker:
+    global _worker
+    if _worker is None:
+        _worker = _AnalysisWorker()
+        _worker.start()
+
+    return _worker
@@ -488,6 +488,8 @@ class Editor(ttk.Frame):
 
     def _on_text_modified(self, event):
         self.update_title()
+        # Save button depends on modified state
+        get_workbench().schedule_toolbar_update()
 
     def update_title(self):
         try:
@@ -0,0 +1,429 @@
+"""
+Searching in the files of a directory tree (used by the Find in files view).
+
+Files are scanned in a pool of processes and the results are streamed to the caller
+via a queue. A trigram index (kept in Thonny's user directory) allows skipping the files
+which can't contain the searched literal text. Index entries are validated by the
+modification time and size of the file, so changed files get re-indexed while they
+are scanned.
+"""
+import logging
+import os.path
+import pickle
+import queue
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Pattern, Set, Tuple  # @UnusedImport
+
+logger = logging.getLogger(__name__)
+
+SEARCHABLE_EXTENSIONS = {
+    ".py",
+    ".pyw",
+    ".pyi",
+    ".txt",
+    ".md",
+    ".rst",
+    ".cfg",
+    ".ini",
+    ".toml",
+    ".json",
+    ".csv",
+    ".html",
+    ".css",
+    ".js",
+    ".xml",
+    ".yml",
+    ".yaml",
+}
+IGNORED_DIRS = {"__pycache__", ".git", ".hg", ".svn", ".tox", ".mypy_cache", "node_modules"}
+MAX_FILE_SIZE = 2 * 1024 * 1024
+# Number of files given to a worker process at once
+BATCH_SIZE = 50
+MAX_HITS_PER_FILE = 1000
+MAX_LINE_LENGTH = 300
+
+INDEX_FORMAT_VERSION = 1
+
+_executor = None  # type: Optional[ProcessPoolExecutor]
+_indexes = {}  # type: Dict[str, TrigramIndex]
+
+
+def extract_trigrams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def normalize_newlines(text: str) -> str:
+    """Search and replace see Windows line endings as "\\n" (eg. so that $ matches before them)"""
+    return text.replace("\r\n", "\n")
+
+
+def restore_newlines(
+    original: str, replacements: List[Tuple[int, int, str]]
+) -> List[Tuple[int, int, str]]:
+    """Converts (start, end, fragment) replacements computed for normalize_newlines(original)
+    to replacements for original. Line breaks in fragments get the prevailing style of
+    original, other line breaks are kept as they were."""
+    # normalized offsets of the line breaks, which are "\r\n" in original
+    crlf_offsets = [m.start() - i for i, m in enumerate(re.finditer("\r\n", original))]
+    if len(crlf_offsets) * 2 > original.count("\n"):
+        newline = "\r\n"
+    else:
+        newline = "\n"
+
+    return [
+        (
+            start + bisect_left(crlf_offsets, start),
+            end + bisect_left(crlf_offsets, end),
+            fragment.replace("\n", newline) if newline != "\n" else fragment,
+        )
+        for start, end, fragment in replacements
+    ]
+
+
+def find_hits(text: str, pattern: Pattern) -> List[Tuple[int, int, int, str]]:
+    """Returns (lineno, col, end_col, line) for the matches in text.
+
+    For matches spanning several lines end_col refers to the end of the first line."""
+    hits = []
+    line_offsets = None
+    lines = None
+    for m in pattern.finditer(text):
+        if m.end() == m.start():
+            continue
+        if line_offsets is None:
+            lines = text.split("\n")
+            line_offsets = [0]
+            for line in lines:
+                line_offsets.append(line_offsets[-1] + len(line) + 1)
+
+        lineno = bisect_right(line_offsets, m.start())
+        line = lines[lineno - 1]
+        col = m.start() - line_offsets[lineno - 1]
+        end_col = min(m.end() - line_offsets[lineno - 1], len(line))
+        hits.append((lineno, col, end_col, line[:MAX_LINE_LENGTH]))
+        if len(hits) >= MAX_HITS_PER_FILE:
+            break
+
+    return hits
+
+
+def scan_files(items: List[Tuple[str, bool]], pattern: Optional[Pattern]) -> List[Tuple]:
+    """Runs in a worker process.
+
+    Gets (path, needs_indexing) pairs, returns (path, mtime, size, trigrams, hits)
+    for each of them (mtime is None if the file couldn't be read)."""
+    results = []
+    for path, needs_indexing in items:
+        try:
+            # stat before reading, so that a concurrent change makes the entry stale
+            stat = os.stat(path)
+            with open(path, "rb") as fp:
+                data = fp.read()
+        except OSError:
+            results.append((path, None, None, None, []))
+            continue
+
+        if b"\0" in data[:8000]:
+            # binary file, gets indexed as containing nothing
+            text = ""
+        else:
+            text = normalize_newlines(data.decode("utf-8", errors="replace"))
+
+        hits = find_hits(text, pattern) if pattern is not None else []
+        trigrams = extract_trigrams(text) if needs_indexing else None
+        results.append((path, stat.st_mtime, stat.st_size, trigrams, hits))
+
+    return results
+
+
+def collect_files(root: str) -> List[Tuple[str, float, int]]:
+    """Returns (path, mtime, size) for searchable files under root"""
+    result = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            name for name in dirnames if name not in IGNORED_DIRS and not name.startswith(".")
+        )
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() not in SEARCHABLE_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_size <= MAX_FILE_SIZE:
+                result.append((path, stat.st_mtime, stat.st_size))
+
+    return result
+
+
+class TrigramIndex:
+    """Maps trigrams (of lowercased content) to the ids of the files containing them.
+
+    When a file changes, it gets a new id and the postings of its old id are left
+    in place until the index gets compacted."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._modified = False
+        self._clear()
+
+    def _clear(self):
+        self._files = {}  # type: Dict[str, Tuple[int, float, int]]
+        self._paths_by_id = {}  # type: Dict[int, str]
+        self._postings = {}  # type: Dict[str, array]
+        self._next_id = 0
+        self._dead_count = 0
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self._path):
+                return
+            try:
+                with open(self._path, "rb") as fp:
+                    data = pickle.load(fp)
+                if data.get("version") != INDEX_FORMAT_VERSION:
+                    return
+                self._files = data["files"]
+                self._postings = data["postings"]
+                self._next_id = data["next_id"]
+                self._dead_count = data["dead_count"]
+                self._paths_by_id = {file_id: path for path, (file_id, _, _) in self._files.items()}
+            except Exception:
+                logger.exception("Could not load search index from %s", self._path)
+                self._clear()
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._modified:
+                return
+            if self._dead_count > len(self._files):
+                self._compact()
+
+            data = {
+                "version": INDEX_FORMAT_VERSION,
+                "files": self._files,
+                "postings": self._postings,
+                "next_id": self._next_id,
+                "dead_count": self._dead_count,
+            }
+            tmp_path = self._path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                with open(tmp_path, "wb") as fp:
+                    pickle.dump(data, fp, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._path)
+                self._modified = False
+            except OSError:
+                logger.exception("Could not save search index to %s", self._path)
+
+    def is_fresh(self, path: str, mtime: float, size: int) -> bool:
+        entry = self._files.get(path)
+        return entry is not None and entry[1] == mtime and entry[2] == size
+
+    def update(self, path: str, mtime: float, size: int, trigrams: Set[str]) -> None:
+        with self._lock:
+            self._remove(path)
+            file_id = self._next_id
+            self._next_id += 1
+            for trigram in trigrams:
+                posting = self._postings.get(trigram)
+                if posting is None:
+                    self._postings[trigram] = array("I", [file_id])
+                else:
+                    posting.append(file_id)
+            self._files[path] = (file_id, mtime, size)
+            self._paths_by_id[file_id] = path
+            self._modified = True
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._remove(path)
+
+    def _remove(self, path):
+        entry = self._files.pop(path, None)
+        if entry is not None:
+            del self._paths_by_id[entry[0]]
+            self._dead_count += 1
+            self._modified = True
+
+    def get_paths_under(self, root: str) -> List[str]:
+        prefix = os.path.join(root, "")
+        return [path for path in self._files if path.startswith(prefix)]
+
+    def get_candidates(self, trigrams: Set[str]) -> Set[str]:
+        """Returns indexed paths which contain all given trigrams"""
+        with self._lock:
+            postings = []
+            for trigram in trigrams:
+                posting = self._postings.get(trigram)
+                if posting is None:
+                    return set()
+                postings.append(posting)
+
+            postings.sort(key=len)
+            ids = set(postings[0]) if postings else set(self._paths_by_id)
+            for posting in postings[1:]:
+                ids.intersection_update(posting)
+                if not ids:
+                    break
+
+            return {self._paths_by_id[file_id] for file_id in ids if file_id in self._paths_by_id}
+
+    def _compact(self):
+        live_ids = self._paths_by_id
+        for trigram in list(self._postings):
+            posting = array(
+                "I", (file_id for file_id in self._postings[trigram] if file_id in live_ids)
+            )
+            if posting:
+                self._postings[trigram] = posting
+            else:
+                del self._postings[trigram]
+        self._dead_count = 0
+
+
+def get_index(path: str) -> TrigramIndex:
+    """Returns the (shared) index stored in given file"""
+    if path not in _indexes:
+        _indexes[path] = TrigramIndex(path)
+    return _indexes[path]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    return _executor
+
+
+def _forget_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+class FileSearch:
+    """Searches for pattern in the files under root in a background thread.
+
+    Results appear in the queue as ("hits", path, hits), ("progress", scanned_count,
+    total_count) and finally ("done", summary) where summary is a dict."""
+
+    def __init__(
+        self,
+        root: str,
+        pattern: Optional[Pattern],
+        literal: Optional[str],
+        index: TrigramIndex,
+        use_processes: bool = True,
+    ):
+        """literal, if given, is text which must be present in the matching files
+        (it allows filtering the files by the index)"""
+        self.root = root
+        self.queue = queue.Queue()  # type: queue.Queue
+        self._pattern = pattern
+        self._literal = literal
+        self._index = index
+        self._use_processes = use_processes
+        self._cancelled = False
+        self._thread = threading.Thread(target=self._run, name="FileSearch", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def _run(self):
+        start_time = time.time()
+        summary = {"scanned_files": 0, "indexed_files": 0, "matching_files": 0, "hits": 0}
+        try:
+            self._search(summary)
+        except Exception as e:
+            logger.exception("File search failed")
+            summary["error"] = str(e)
+        finally:
+            summary["cancelled"] = self._cancelled
+            summary["duration"] = time.time() - start_time
+            self.queue.put(("done", summary))
+
+    def _search(self, summary):
+        self._index.load()
+        files = collect_files(self.root)
+
+        if self._literal is not None and len(self._literal) >= 3:
+            candidates = self._index.get_candidates(extract_trigrams(self._literal))
+        else:
+            candidates = None
+
+        items = []
+        for path, mtime, size in files:
+            if not self._index.is_fresh(path, mtime, size):
+                items.append((path, True))
+            elif candidates is None or path in candidates:
+                items.append((path, False))
+
+        existing_paths = {path for path, _, _ in files}
+        for path in self._index.get_paths_under(self.root):
+            if path not in existing_paths:
+                self._index.remove(path)
+
+        batches = [items[i : i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+        if len(batches) > 1 and self._use_processes:
+            results = self._scan_in_processes(batches)
+        else:
+            results = (scan_files(batch, self._pattern) for batch in batches)
+
+        for batch_results in results:
+            if self._cancelled:
+                break
+            for path, mtime, size, trigrams, hits in batch_results:
+                summary["scanned_files"] += 1
+                if mtime is None:
+                    self._index.remove(path)
+                    continue
+                if trigrams is not None:
+                    summary["indexed_files"] += 1
+                    self._index.update(path, mtime, size, trigrams)
+                if hits:
+                    summary["matching_files"] += 1
+                    summary["hits"] += len(hits)
+                    self.queue.put(("hits", path, hits))
+            self.queue.put(("progress", summary["scanned_files"], len(items)))
+
+        self._index.save()
+
+    def _scan_in_processes(self, batches):
+        from concurrent.futures import as_completed
+
+        try:
+            executor = _get_executor()
+            futures = [executor.submit(scan_files, batch, self._pattern) for batch in batches]
+        except Exception:
+            logger.exception("Could not use worker processes, scanning in this thread")
+            yield from (scan_files(batch, self._pattern) for batch in batches)
+            return
+
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BrokenProcessPool:
+            # eg. a worker got killed. Next search gets a new pool
+            _forget_executor()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,142 @@
+"""
+Finding the user files imported (directly or indirectly) by a program.
+
+Absolute imports are looked up in the directory of the main script (first entry of
+sys.path when the script runs), relative imports in the package of the importing file.
+Library modules are not included. Parsed imports of each file are cached and validated
+by the modification time and size of the file. When these have changed, but the content
+hash hasn't, the file is not parsed again.
+"""
+import ast
+import hashlib
+import os.path
+import time
+from typing import Dict, List, Optional, Set, Tuple  # @UnusedImport
+
+# (level, module, imported names), level is 0 for absolute imports
+ImportSpec = Tuple[int, str, Tuple[str, ...]]
+
+# files read this soon (s) after their modification are hashed again even if their
+# mtime and size haven't changed (another save may have happened during the same
+# mtime tick, eg. Run saves the file just before the analysis)
+MTIME_GRANULARITY = 2.0
+
+
+def parse_imports(source, filename: str = "<unknown>") -> List[ImportSpec]:
+    try:
+        root = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return []
+
+    result = []
+    for node in ast.walk(root):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                result.append((0, alias.name, ()))
+        elif isinstance(node, ast.ImportFrom):
+            result.append(
+                (node.level, node.module or "", tuple(alias.name for alias in node.names))
+            )
+    return result
+
+
+def find_module_file(search_dir: str, module_name: str) -> Optional[str]:
+    path = os.path.join(search_dir, *module_name.split("."))
+    for candidate in [path + ".py", path + ".pyw", os.path.join(path, "__init__.py")]:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+class ImportGraph:
+    def __init__(self):
+        # path -> (mtime, size, content hash, imports, read time)
+        self._entries = {}  # type: Dict[str, Tuple[float, int, str, List[ImportSpec], float]]
+
+    def _get_entry(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            return None
+
+        entry = self._entries.get(path)
+        if (
+            entry is not None
+            and entry[0] == stat.st_mtime
+            and entry[1] == stat.st_size
+            and entry[4] - stat.st_mtime >= MTIME_GRANULARITY
+        ):
+            return entry
+
+        read_time = time.time()
+        try:
+            with open(path, "rb") as fp:
+                source = fp.read()
+        except OSError:
+            self._entries.pop(path, None)
+            return None
+
+        digest = hashlib.sha1(source).hexdigest()
+        if entry is not None and entry[2] == digest:
+            imports = entry[3]
+        else:
+            imports = parse_imports(source, path)
+
+        entry = (stat.st_mtime, stat.st_size, digest, imports, read_time)
+        self._entries[path] = entry
+        return entry
+
+    def get_digest(self, path: str) -> Optional[str]:
+        """Returns content hash of the file (None if the file can't be read)"""
+        entry = self._get_entry(path)
+        return entry[2] if entry is not None else None
+
+    def get_imported_files(self, path: str, search_dir: str) -> Set[str]:
+        """Returns the files under search_dir, which given file imports directly"""
+        entry = self._get_entry(path)
+        if entry is None:
+            return set()
+
+        result = set()
+        for level, module, names in entry[3]:
+            base_dir = search_dir if level == 0 else os.path.dirname(path)
+            for _ in range(level - 1):
+                base_dir = os.path.dirname(base_dir)
+
+            # importing a submodule imports also the packages containing it
+            parts = module.split(".") if module else []
+            module_file = None
+            for i in range(len(parts)):
+                module_file = find_module_file(base_dir, ".".join(parts[: i + 1]))
+                if module_file is None:
+                    break
+                result.add(module_file)
+
+            if not parts or (module_file is not None and module_file.endswith("__init__.py")):
+                # imported names may be submodules of the package
+                package_dir = os.path.join(base_dir, *parts)
+                for name in names:
+                    submodule_file = find_module_file(package_dir, name)
+                    if submodule_file is not None:
+                        result.add(submodule_file)
+
+        prefix = os.path.join(search_dir, "")
+        return {item for item in result if item.startswith(prefix) and item != path}
+
+    def get_dependencies(self, path: str, search_dir: Optional[str] = None) -> Set[str]:
+        """Returns the files imported by given file directly or indirectly
+        (by default looks in the directory of the file)"""
+        if search_dir is None:
+            search_dir = os.path.dirname(path)
+
+        result = set()
+        to_visit = [path]
+        while to_visit:
+            for imported_path in self.get_imported_files(to_visit.pop(), search_dir):
+                if imported_path not in result:
+                    result.add(imported_path)
+                    to_visit.append(imported_path)
+
+        result.discard(path)
+        return result
@@ -1,7 +1,17 @@
 """
 Utils to handle different jedi versions
 """
-from typing import List, Dict
+import logging
+import os.path
+from typing import Any, Dict, Iterator, List, Optional, Tuple  # @UnusedImport
+
+logger = logging.getLogger(__name__)
+
+# Scripts are reused while the source doesn't change (jedi caches inferred information
+# in them) and projects are reused for all files of a directory
+MAX_CACHED_SCRIPTS = 10
+_cached_scripts = {}  # type: Dict[Optional[str], Tuple[str, Any]]
+_cached_projects = {}  # type: Dict[str, Any]
 
 
 def get_statement_of_position(node, pos):
@@ -53,7 +63,7 @@ def get_script_completions(source: str, row: int, column: int, filename: str):
         script = jedi.Script(source, row, column, filename)
         completions = script.completions()
     else:
-        script = jedi.Script(code=source, path=filename)
+        script = _get_script(source, filename)
         completions = script.complete(line=row, column=column)
 
     return _tweak_completions(completions)
@@ -99,10 +109,75 @@ def get_definitions(source: str, row: int, column: int, filename: str):
         script = jedi.Script(source, row, column, filename)
         return script.goto_definitions()
     else:
-        script = jedi.Script(code=source, path=filename)
+        script = _get_script(source, filename)
         return script.infer(line=row, column=column)
 
 
+def _get_script(source: str, filename: Optional[str]):
+    import jedi
+
+    cached = _cached_scripts.pop(filename, None)
+    if cached is not None and cached[0] == source:
+        script = cached[1]
+    else:
+        script = jedi.Script(code=source, path=filename, project=_get_project(filename))
+
+    # most recently used goes to the end
+    _cached_scripts[filename] = (source, script)
+    while len(_cached_scripts) > MAX_CACHED_SCRIPTS:
+        del _cached_scripts[next(iter(_cached_scripts))]
+
+    return script
+
+
+def _get_project(filename: Optional[str]):
+    import jedi
+
+    if filename is None:
+        return None
+
+    dir_name = os.path.dirname(os.path.abspath(filename))
+    if dir_name not in _cached_projects:
+        _cached_projects[dir_name] = jedi.get_default_project(dir_name)
+    return _cached_projects[dir_name]
+
+
+def warm_up(module_names: List[str]) -> Iterator[None]:
+    """Imports jedi and lets it infer given modules, so that first real requests
+    don't need to wait for this. Parsed trees stay in parso's memory cache and
+    jedi persists them (incl. stubs) in its cache directory for next sessions.
+
+    Works in steps (yields after each), so the caller can pause when it has
+    something more important to do. Names appended to module_names
+    during the warm-up get processed as well."""
+    import parso
+
+    yield
+    parso.load_grammar()
+    yield
+
+    import jedi
+
+    yield
+    if _using_older_jedi(jedi):
+        return
+
+    # builtins stubs
+    _get_script("", None).complete(line=1, column=0)
+    yield
+
+    i = 0
+    while i < len(module_names):
+        name = module_names[i]
+        i += 1
+        source = "import %s\n%s." % (name, name)
+        try:
+            jedi.Script(code=source).complete(line=2, column=len(name) + 1)
+        except Exception:
+            logger.exception("Could not warm up jedi for %s", name)
+        yield
+
+
 def _using_older_jedi(jedi):
     return jedi.__version__[:4] in ["0.13", "0.14", "0.15", "0.16", "0.17"]
 
@@ -1 +1,56 @@
 # Package marker
+
+# Plug-ins which get imported and loaded only when one of their views or commands
+# is first used. Their contributions are declared here, so that the workbench can
+# present them without importing the plug-in (load_plugin of the plug-in must register
+# the same views and commands).
+#
+# Labels get translated when registered, default_sequence may be given as
+# (sequence, mac_sequence).
+LAZY_PLUGINS = {
+    "thonny.plugins.ast_view": {
+        "views": [{"view_id": "AstView", "label": "Program tree", "default_location": "s"}]
+    },
+    "thonny.plugins.find_in_files": {
+        "views": [
+            {"view_id": "FindInFilesView", "label": "Find in files", "default_location": "s"}
+        ],
+        "commands": [
+            {
+                "command_id": "FindInFiles",
+                "menu_name": "edit",
+                "command_label": "Find in files",
+                "default_sequence": ("<Control-Shift-F>", "<Command-Shift-f>"),
+            }
+        ],
+    },
+    "thonny.plugins.heap": {
+        "views": [{"view_id": "HeapView", "label": "Heap", "default_location": "e"}]
+    },
+    "thonny.plugins.notes": {
+        "views": [
+            {
+                "view_id": "NotesView",
+                "label": "Notes",
+                "default_location": "ne",
+                "default_position_key": "zz",
+            }
+        ]
+    },
+    "thonny.plugins.pip_gui": {
+        "commands": [
+            {
+                "command_id": "backendpipgui",
+                "menu_name": "tools",
+                "command_label": "Manage packages...",
+                "group": 80,
+            },
+            {
+                "command_id": "pluginspipgui",
+                "menu_name": "tools",
+                "command_label": "Manage plug-ins...",
+                "group": 180,
+            },
+        ]
+    },
+}
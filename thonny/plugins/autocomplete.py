@@ -5,15 +5,28 @@ from tkinter import messagebox
 
 from thonny import get_runner, get_workbench
 from thonny.codeview import CodeViewText
-from thonny.common import InlineCommand
+from thonny.common import InlineCommand, compute_text_edit
 from thonny.languages import tr
 from thonny.shell import ShellText
 
 # TODO: adjust the window position in cases where it's too close to bottom or right edge - but make sure the current line is shown
 """Completions get computed on the backend, therefore getting the completions is
 asynchronous.
+
+Backend remembers the last source of each editor, so after the first request
+only the changed part of the text is sent.
 """
 
+# Delay (ms) before updating the visible completions after the text changes
+AUTOCOMPLETE_UPDATE_DELAY = 100
+
+_IMPORT_REGEX = re.compile(
+    r"^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import\b|import[ \t]+([\w.]+(?:[ \t]*,[ \t]*[\w.]+)*))",
+    re.MULTILINE,
+)
+
+_warm_up_requested = False
+
 
 class Completer(tk.Listbox):
     def __init__(self, text):
@@ -24,6 +37,16 @@ class Completer(tk.Listbox):
         self.text = text
         self.completions = []
 
+        # identifies the document on the backend
+        self._doc_id = "editor_%d" % text.winfo_id()
+        # version and source known to the backend (assuming it has received last request)
+        self._synced_version = None
+        self._synced_source = None
+        self._version = 0
+        # version, content version of the text and position of the last request
+        self._last_request = None
+        self._scheduled_request_id = None
+
         self.doc_label = tk.Label(
             master=text, text="...", bg="#ffffe0", justify="left", anchor="nw"
         )
@@ -45,25 +68,74 @@ class Completer(tk.Listbox):
     def _bind_result_event(self):
         # TODO: remove binding when editor gets closed
         get_workbench().bind("editor_autocomplete_response", self._handle_backend_response, True)
+        get_workbench().bind("BackendRestart", self._forget_synced_source, True)
+
+    def _forget_synced_source(self, event=None):
+        self._synced_version = None
+        self._synced_source = None
 
     def handle_autocomplete_request(self):
+        if self._scheduled_request_id is not None:
+            self.after_cancel(self._scheduled_request_id)
+            self._scheduled_request_id = None
+
         row, column = self._get_position()
         source = self.text.get("1.0", "end-1c")
-        get_runner().send_command(
-            InlineCommand(
-                "editor_autocomplete",
-                source=source,
-                row=row,
-                column=column,
-                filename=self._get_filename(),
-            )
+        self._version += 1
+        cmd = InlineCommand(
+            "editor_autocomplete",
+            doc_id=self._doc_id,
+            version=self._version,
+            row=row,
+            column=column,
+            filename=self._get_filename(),
+        )
+        if self._synced_source is None:
+            cmd["source"] = source
+        else:
+            cmd["base_version"] = self._synced_version
+            cmd["edit"] = compute_text_edit(self._synced_source, source)
+
+        self._synced_version = self._version
+        self._synced_source = source
+        self._last_request = (self._version, self._get_content_version(), row, column)
+        get_runner().send_command(cmd)
+
+    def _schedule_request(self):
+        # while the user is typing, only the last state needs completions
+        if self._scheduled_request_id is not None:
+            self.after_cancel(self._scheduled_request_id)
+        self._scheduled_request_id = self.after(
+            AUTOCOMPLETE_UPDATE_DELAY, self.handle_autocomplete_request
         )
 
+    def _get_content_version(self):
+        if hasattr(self.text, "get_content_version"):
+            return self.text.get_content_version()
+        else:
+            return self.text.get("1.0", "end-1c")
+
     def _handle_backend_response(self, msg):
-        row, column = self._get_position()
-        source = self.text.get("1.0", "end-1c")
+        if msg.get("doc_id") != self._doc_id or self._last_request is None:
+            return
+
+        version, content_version, row, column = self._last_request
+        if msg.version != version or msg.get("cancelled"):
+            # response to an older request
+            return
+
+        if msg.get("out_of_sync"):
+            # backend doesn't know the base version (eg. it has been restarted)
+            self._forget_synced_source()
+            self.handle_autocomplete_request()
+            return
 
-        if msg.source != source or msg.row != row or msg.column != column:
+        current_row, current_column = self._get_position()
+        if (
+            content_version != self._get_content_version()
+            or current_row != row
+            or current_column != column
+        ):
             # situation has changed, information is obsolete
             self._close()
         elif msg.get("error"):
@@ -249,7 +321,7 @@ class Completer(tk.Listbox):
 
     def _on_text_change(self, event=None):
         if self._is_visible():
-            self.handle_autocomplete_request()
+            self._schedule_request()
 
     def _close(self, event=None):
         self.place_forget()
@@ -309,6 +381,40 @@ def _handle_autocomplete_request_for_text(text):
     text.autocompleter.handle_autocomplete_request()
 
 
+def get_imported_modules(source):
+    """Returns names of top-level modules imported in the source (in the order of appearance)"""
+    result = []
+    for m in _IMPORT_REGEX.finditer(source):
+        names = [m.group(1)] if m.group(1) else m.group(2).split(",")
+        for name in names:
+            name = name.strip().split(".")[0]
+            if name and name not in result:
+                result.append(name)
+    return result
+
+
+def _request_warm_up(event=None):
+    # Back-end can prepare completions for the modules used in the editors
+    # while the user is not doing anything
+    global _warm_up_requested
+    if _warm_up_requested:
+        return
+
+    module_names = []
+    for editor in get_workbench().get_editor_notebook().get_all_editors():
+        for name in get_imported_modules(editor.get_text_widget().get("1.0", "end-1c")):
+            if name not in module_names:
+                module_names.append(name)
+
+    _warm_up_requested = True
+    get_runner().send_command(InlineCommand("warm_up_editor_analysis", module_names=module_names))
+
+
+def _reset_warm_up_request(event=None):
+    global _warm_up_requested
+    _warm_up_requested = False
+
+
 def patched_perform_midline_tab(text, event):
     if text.is_python_text():
         if isinstance(text, ShellText):
@@ -340,5 +446,8 @@ def load_plugin() -> None:
     get_workbench().set_default("edit.tab_complete_in_editor", True)
     get_workbench().set_default("edit.tab_complete_in_shell", True)
 
+    get_workbench().bind("ToplevelResponse", _request_warm_up, True)
+    get_workbench().bind("BackendRestart", _reset_warm_up_request, True)
+
     CodeViewText.perform_midline_tab = patched_perform_midline_tab  # type: ignore
     ShellText.perform_midline_tab = patched_perform_midline_tab  # type: ignore
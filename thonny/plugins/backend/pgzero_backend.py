@@ -2,6 +2,7 @@ import ast
 import os
 import sys
 
+from thonny.common import InlineResponse
 from thonny.plugins.cpython.cpython_backend import get_backend, MainCPythonBackend
 
 
@@ -70,6 +71,11 @@ def augment_ast(root):
 
 
 def patched_editor_autocomplete(self, cmd):
+    # The source needs to be known before it can be augmented
+    early_response = get_backend()._prepare_editor_command(cmd)
+    if early_response is not None:
+        return InlineResponse("editor_autocomplete", **early_response)
+
     # Make extra builtins visible for Jedi
     prefix = "from pgzero.builtins import *\n"
     cmd["source"] = prefix + cmd["source"]
@@ -77,7 +83,6 @@ def patched_editor_autocomplete(self, cmd):
 
     result = get_backend()._original_editor_autocomplete(cmd)
     result["row"] = result["row"] - 1
-    result["source"] = result["source"][len(prefix) :]
 
     return result
 
@@ -4,25 +4,22 @@ import re
 
 from thonny import get_runner, get_workbench, ui_utils
 from thonny.codeview import CodeViewText
+from thonny.decorations import ViewportDecorator
+from thonny.document_model import get_document_model, register_analysis
 
 cell_regex = re.compile(r"(^|\n)(# ?%%|##|# In\[\d+\]:)[^\n]*", re.MULTILINE)  # @UndefinedVariable
 
 
-def update_editor_cells(event):
-    text = event.widget
-
-    if not getattr(text, "cell_tags_configured", False):
-        text.tag_configure("CURRENT_CELL", borderwidth=1, relief="groove", background="LightYellow")
-        text.tag_configure("CELL_HEADER", font="BoldEditorFont", foreground="#665843")
+def _offset_to_index(source, offset):
+    line_start = source.rfind("\n", 0, offset) + 1
+    return "%d.%d" % (source.count("\n", 0, offset) + 1, offset - line_start)
 
-        text.tag_lower("CELL_HEADER")
-        text.tag_lower("CURRENT_CELL")
-        text.cell_tags_configured = True
 
-    text.tag_remove("CURRENT_CELL", "0.1", "end")
-    text.tag_remove("CELL_HEADER", "0.1", "end")
-    source = text.get("1.0", "end")
+def _find_cells(model):
+    """Returns cell ranges and cell header ranges as text indices"""
+    source = model.get_source()
     cells = []
+    headers = []
     prev_marker = 0
     for match in cell_regex.finditer(source):
         if match.start() == 0:
@@ -30,16 +27,52 @@ def update_editor_cells(event):
         else:
             this_marker = match.start() + 1
 
-        cell_start_index = text.index("1.0+%dc" % prev_marker)
-        header_end_index = text.index("1.0+%dc" % match.end())
-        cell_end_index = text.index("1.0+%dc" % this_marker)
-        text.tag_add("CELL_HEADER", cell_end_index, header_end_index)
+        cell_start_index = _offset_to_index(source, prev_marker)
+        header_end_index = _offset_to_index(source, match.end())
+        cell_end_index = _offset_to_index(source, this_marker)
+        headers.append((cell_end_index, header_end_index))
         cells.append((cell_start_index, cell_end_index))
 
         prev_marker = this_marker
 
     if prev_marker != 0:
-        cells.append((text.index("1.0+%dc" % prev_marker), "end"))
+        cells.append((_offset_to_index(source, prev_marker), "end"))
+
+    return cells, headers
+
+
+register_analysis("cells", _find_cells)
+
+
+class CellHeaderDecorator(ViewportDecorator):
+    tags = ["CELL_HEADER"]
+
+    def compute_ranges(self, model, first_line, last_line):
+        _, headers = model.get("cells")
+        return [
+            ("CELL_HEADER", start_index, end_index)
+            for start_index, end_index in headers
+            if first_line <= int(start_index.split(".")[0]) <= last_line
+        ]
+
+
+def update_editor_cells(event):
+    text = event.widget
+
+    if not getattr(text, "cell_tags_configured", False):
+        text.tag_configure("CURRENT_CELL", borderwidth=1, relief="groove", background="LightYellow")
+        text.tag_configure("CELL_HEADER", font="BoldEditorFont", foreground="#665843")
+
+        text.tag_lower("CELL_HEADER")
+        text.tag_lower("CURRENT_CELL")
+        text.cell_tags_configured = True
+
+    if not hasattr(text, "cell_header_decorator"):
+        text.cell_header_decorator = CellHeaderDecorator(text)
+    text.cell_header_decorator.update()
+
+    text.tag_remove("CURRENT_CELL", "0.1", "end")
+    cells, _ = get_document_model(text).get("cells")
 
     # if get_workbench().focus_get() == text:
     # It's nice to have cell highlighted even when focus
@@ -160,6 +193,7 @@ def _load_plugin():
     wb = get_workbench()
     wb.bind_class("CodeViewText", "<<CursorMove>>", update_editor_cells, True)
     wb.bind_class("CodeViewText", "<<TextChange>>", update_editor_cells, True)
+    wb.bind_class("CodeViewText", "<<VerticalScroll>>", update_editor_cells, True)
     wb.bind_class("CodeViewText", "<FocusIn>", update_editor_cells, True)
     wb.bind_class("CodeViewText", "<FocusOut>", update_editor_cells, True)
 
@@ -3,7 +3,10 @@ Each text will get its on SyntaxColorer.
 
 For performance reasons, coloring is updated in 2 phases:
     1. recolor single-line tokens on the modified line(s)
-    2. recolor multi-line tokens (triple-quoted strings) in the whole text
+    2. recolor multi-line tokens (triple-quoted strings). In editors this is done
+       by a line-based lexer, which remembers its state at the end of each line
+       and re-lexes only from the modified line until the state matches the
+       state computed before the edit. In Shell the whole command is re-scanned.
 
 First phase may insert wrong tokens inside triple-quoted strings, but the
 priorities of triple-quoted-string tags are higher and therefore user
@@ -16,6 +19,7 @@ Regexes are adapted from idlelib
 """
 
 import re
+from bisect import bisect_right
 
 import tkinter
 from thonny import get_workbench
@@ -24,6 +28,63 @@ from thonny.shell import ShellText
 
 TODO = "COLOR_TODO"
 
+# Marks line states which need to be recomputed. Never equal to a real state.
+DIRTY_STATE = object()
+
+_CODE_TOKEN_REGEX = re.compile(r"#|(?:(?<!\w)[rRbBuUfF]{1,2})?(\"\"\"|''')|(['\"])")
+_STRING_END_REGEXES = {
+    "'": re.compile(r"[^'\\\n]*(?:\\.[^'\\\n]*)*'"),
+    '"': re.compile(r'[^"\\\n]*(?:\\.[^"\\\n]*)*"'),
+}
+_STRING3_END_REGEXES = {
+    "'''": re.compile(r"[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''"),
+    '"""': re.compile(r'[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""'),
+}
+
+
+def lex_line(line, state):
+    """Finds triple-quoted string segments in a line (without trailing newline).
+
+    State is None when the line starts outside of triple-quoted string,
+    otherwise it is a pair of delimiter and the column where the string started
+    (None if the string started on an earlier line).
+
+    Returns list of (start_col, end_col) pairs (end_col is None if the segment
+    extends to the next line) and the state at the end of the line."""
+    segments = []
+    pos = 0
+    continued = state is not None
+    delimiter = state[0] if continued else None
+    segment_start = 0
+
+    while True:
+        if delimiter is not None:
+            match = _STRING3_END_REGEXES[delimiter].match(line, pos)
+            if match is None:
+                segments.append((segment_start, None))
+                return segments, (delimiter, None if continued else segment_start)
+
+            segments.append((segment_start, match.end()))
+            pos = match.end()
+            delimiter = None
+            continued = False
+            continue
+
+        match = _CODE_TOKEN_REGEX.search(line, pos)
+        if match is None or match.group(0) == "#":
+            return segments, None
+
+        if match.group(1):
+            delimiter = match.group(1)
+            segment_start = match.start()
+            pos = match.end()
+        else:
+            end_match = _STRING_END_REGEXES[match.group(2)].match(line, match.end())
+            if end_match is None:
+                # open single-line string
+                return segments, None
+            pos = end_match.end()
+
 
 class SyntaxColorer:
     def __init__(self, text: tkinter.Text):
@@ -32,7 +93,6 @@ class SyntaxColorer:
         self._config_tags()
         self._update_scheduled = False
         self._use_coloring = True
-        self._multiline_dirty = True
         self._highlight_tabs = True
 
     def _compile_regexes(self):
@@ -121,19 +181,23 @@ class SyntaxColorer:
                 end_row = start_row + event.text.count("\n")
                 start_index = "%d.%d" % (start_row, 0)
                 end_index = "%d.%d" % (end_row + 1, 0)
-                if not event.trivial_for_coloring:
-                    self._multiline_dirty = True
+                self._note_modified_line(start_row)
 
             elif event.sequence == "TextDelete":
                 index = self.text.index(event.index1)
                 start_row = int(index.split(".")[0])
                 start_index = "%d.%d" % (start_row, 0)
                 end_index = "%d.%d" % (start_row + 1, 0)
-                if not event.trivial_for_coloring:
-                    self._multiline_dirty = True
+                self._note_modified_line(start_row)
+
+        elif event is None:
+            self._note_modified_line(None)
 
         self.text.tag_add(TODO, start_index, end_index)
 
+    def _note_modified_line(self, row):
+        """Called after an edit starting at given line (or None for unknown changes)"""
+
     def schedule_update(self):
         self._highlight_tabs = get_workbench().get_option("view.highlight_tabs")
         self._use_coloring = (
@@ -154,11 +218,23 @@ class SyntaxColorer:
         raise NotImplementedError()
 
     def _update_uniline_tokens(self, start, end):
+        start = self.text.index(start)
         chars = self.text.get(start, end)
+        start_line, start_col = map(int, start.split("."))
+        line_offsets = [0] + [match.end() for match in re.finditer("\n", chars)]
+
+        def offset_to_index(offset):
+            line_no = bisect_right(line_offsets, offset) - 1
+            col = offset - line_offsets[line_no]
+            if line_no == 0:
+                col += start_col
+            return "%d.%d" % (start_line + line_no, col)
 
+        batch = self.text.tag_batch()
         # clear old tags
         for tag in self.uniline_tags | {"tab"}:
-            self.text.tag_remove(tag, start, end)
+            batch.remove(tag, start, end)
+        batch.remove(TODO, start, end)
 
         if self._use_coloring:
             for match in self.uniline_regex.finditer(chars):
@@ -167,8 +243,8 @@ class SyntaxColorer:
                         token_text = token_text.strip()
                         match_start, match_end = match.span(token_type)
 
-                        self.text.tag_add(
-                            token_type, start + "+%dc" % match_start, start + "+%dc" % match_end
+                        batch.add(
+                            token_type, offset_to_index(match_start), offset_to_index(match_end)
                         )
 
                         # Mark also the word following def or class
@@ -176,16 +252,19 @@ class SyntaxColorer:
                             id_match = self.id_regex.match(chars, match_end)
                             if id_match:
                                 id_match_start, id_match_end = id_match.span(1)
-                                self.text.tag_add(
+                                batch.add(
                                     "definition",
-                                    start + "+%dc" % id_match_start,
-                                    start + "+%dc" % id_match_end,
+                                    offset_to_index(id_match_start),
+                                    offset_to_index(id_match_end),
                                 )
 
         if self._highlight_tabs:
-            self._update_tabs(start, end)
+            pos = chars.find("\t")
+            while pos != -1:
+                batch.add("tab", offset_to_index(pos), offset_to_index(pos + 1))
+                pos = chars.find("\t", pos + 1)
 
-        self.text.tag_remove(TODO, start, end)
+        batch.flush()
 
     def _update_multiline_tokens(self, start, end):
         chars = self.text.get(start, end)
@@ -220,20 +299,134 @@ class SyntaxColorer:
             token_end = start + "+%dc" % match_end
             self.text.tag_add(token_type, token_start, token_end)
 
-        self._multiline_dirty = False
         self._raise_tags()
 
-    def _update_tabs(self, start, end):
+
+class CodeViewSyntaxColorer(SyntaxColorer):
+    def __init__(self, text: tkinter.Text):
+        super().__init__(text)
+        # lexer state at the end of each line, None if the text hasn't been lexed yet
+        self._line_states = None
+        self._has_dirty_lines = False
+
+    def _get_line_count(self):
+        return int(self.text.index("end-1c").split(".")[0])
+
+    def _note_modified_line(self, row):
+        if row is None or self._line_states is None:
+            self._line_states = None
+            return
+
+        line_count = self._get_line_count()
+        delta = line_count - len(self._line_states)
+        i = row - 1
+        if delta > 0:
+            self._line_states[i:i] = [DIRTY_STATE] * delta
+        elif delta < 0:
+            del self._line_states[i : i - delta]
+
+        if len(self._line_states) != line_count or i >= line_count:
+            # something went out of sync
+            self._line_states = None
+            return
+
+        # all lines touched by the edit
+        touched_count = max(delta, 0) + 1
+        self._line_states[i : i + touched_count] = [DIRTY_STATE] * touched_count
+        self._has_dirty_lines = True
+
+    def _update_line_states(self):
+        if not self._use_coloring:
+            if self._line_states is not None:
+                for tag in self.multiline_tags:
+                    self.text.tag_remove(tag, "1.0", "end")
+                self._line_states = None
+            return
+
+        line_count = self._get_line_count()
+        if self._line_states is None or len(self._line_states) != line_count:
+            self._line_states = [DIRTY_STATE] * line_count
+            self._has_dirty_lines = True
+
+        if not self._has_dirty_lines:
+            return
+
+        i = 0
         while True:
-            pos = self.text.search("\t", start, end)
-            if pos:
-                self.text.tag_add("tab", pos)
-                start = self.text.index("%s +1 c" % pos)
-            else:
+            try:
+                i = self._line_states.index(DIRTY_STATE, i)
+            except ValueError:
                 break
+            i = self._relex_from(i)
 
+        self._has_dirty_lines = False
+        self._update_open_string3()
+        self._raise_tags()
+
+    def _relex_from(self, i):
+        """Lexes lines starting from given 0-based line index until a line ends with
+        same state as before. Returns the index of the next line not lexed."""
+        states = self._line_states
+        state = states[i - 1] if i > 0 else None
+        first_line_no = i + 1
+        batch = self.text.tag_batch()
+        range_start = None
+        lines = []
+        chunk_size = 64
+
+        while i < len(states):
+            if not lines:
+                lines = self.text.get("%d.0" % (i + 1), "%d.0" % (i + 1 + chunk_size)).split("\n")
+                lines.reverse()
+                chunk_size = min(chunk_size * 2, 4096)
+
+            segments, new_state = lex_line(lines.pop(), state)
+            for start_col, end_col in segments:
+                if range_start is None:
+                    range_start = "%d.%d" % (i + 1, start_col)
+                if end_col is not None:
+                    batch.add("string3", range_start, "%d.%d" % (i + 1, end_col))
+                    range_start = None
+
+            old_state = states[i]
+            states[i] = state = new_state
+            i += 1
+            if new_state == old_state:
+                break
+
+        if range_start is not None:
+            batch.add("string3", range_start, "%d.0" % (i + 1))
+
+        for tag in self.multiline_tags:
+            batch.remove(tag, "%d.0" % first_line_no, "%d.0" % (i + 1))
+        batch.flush()
+
+        return i
+
+    def _update_open_string3(self):
+        """Triple-quoted string which isn't closed before the end of the text gets
+        a different tag"""
+        old_ranges = self.text.tag_ranges("open_string3")
+        if old_ranges:
+            self.text.tag_remove("open_string3", "1.0", "end")
+            self.text.tag_add("string3", *old_ranges)
+
+        if not self._line_states or self._line_states[-1] is None:
+            return
+
+        for i in range(len(self._line_states) - 1, -1, -1):
+            state = self._line_states[i]
+            if state is None or state[1] is not None:
+                break
+
+        if state is None:
+            # Shouldn't happen
+            return
+
+        start_index = "%d.%d" % (i + 1, state[1])
+        self.text.tag_remove("string3", start_index, "end")
+        self.text.tag_add("open_string3", start_index, "end")
 
-class CodeViewSyntaxColorer(SyntaxColorer):
     def _update_coloring(self):
         viewport_start = self.text.index("@0,0")
         viewport_end = self.text.index(
@@ -267,9 +460,7 @@ class CodeViewSyntaxColorer(SyntaxColorer):
             else:
                 search_start = update_end
 
-        # Multiline tokens need to be searched from the whole source
-        if self._multiline_dirty:
-            self._update_multiline_tokens("1.0", "end")
+        self._update_line_states()
 
         # Get rid of wrong open string tags (https://github.com/thonny/thonny/issues/943)
         search_start = viewport_start
@@ -34,6 +34,8 @@ logger = logging.getLogger(__name__)
 class CPythonProxy(SubprocessProxy):
     "abstract class"
 
+    uses_warm_processes = True
+
     def __init__(self, clean: bool, executable: str) -> None:
         super().__init__(clean, executable)
         self._send_msg(ToplevelCommand("get_environment_info"))
@@ -14,13 +14,14 @@ import re
 import site
 import subprocess
 import sys
+import time
 import tokenize
 import traceback
 import types
 import warnings
 from collections import namedtuple
 from importlib.machinery import SourceFileLoader, PathFinder
-from typing import Optional, Dict
+from typing import Dict, Iterator, List, Optional  # @UnusedImport
 
 import __main__
 
@@ -62,6 +63,9 @@ BEFORE_EXPRESSION_MARKER = "_thonny_hidden_before_expr"
 AFTER_STATEMENT_MARKER = "_thonny_hidden_after_stmt"
 AFTER_EXPRESSION_MARKER = "_thonny_hidden_after_expr"
 
+# How long (in seconds) back-end must be idle before warming up jedi
+JEDI_WARMUP_IDLE_DELAY = 0.5
+
 _CO_GENERATOR = getattr(inspect, "CO_GENERATOR", 0)
 _CO_COROUTINE = getattr(inspect, "CO_COROUTINE", 0)
 _CO_ITERABLE_COROUTINE = getattr(inspect, "CO_ITERABLE_COROUTINE", 0)
@@ -118,6 +122,11 @@ class MainCPythonBackend(MainBackend):
         self._tty_mode = True
         self._tcl = None
 
+        # jedi gets warmed up in idle time, step by step
+        self._jedi_warmup = None  # type: Optional[Iterator[None]]
+        self._jedi_warmup_modules = []  # type: List[str]
+        self._last_command_time = time.time()
+
         # clean __main__ global scope
         for key in list(__main__.__dict__.keys()):
             if not key.startswith("__") or key in {"__file__", "__cached__"}:
@@ -252,6 +261,32 @@ class MainCPythonBackend(MainBackend):
             )
 
         self.send_message(real_response)
+        self._last_command_time = time.time()
+
+    def _perform_idle_tasks(self):
+        if (
+            self._jedi_warmup is not None
+            and time.time() - self._last_command_time > JEDI_WARMUP_IDLE_DELAY
+        ):
+            # mainloop calls this only when there are no commands waiting,
+            # so a real command has to wait for one step at most
+            try:
+                next(self._jedi_warmup)
+            except StopIteration:
+                self._jedi_warmup = None
+            except Exception:
+                logger.exception("Could not warm up jedi")
+                self._jedi_warmup = None
+
+    def _cmd_warm_up_editor_analysis(self, cmd):
+        for name in cmd.module_names:
+            if name not in self._jedi_warmup_modules:
+                self._jedi_warmup_modules.append(name)
+
+        if self._jedi_warmup is None:
+            self._jedi_warmup = jedi_utils.warm_up(self._jedi_warmup_modules)
+
+        return False
 
     def _handle_immediate_command(self, cmd: ImmediateCommand) -> None:
         if cmd.name == "interrupt":
@@ -599,6 +634,10 @@ class MainCPythonBackend(MainBackend):
         )
 
     def _cmd_editor_autocomplete(self, cmd):
+        early_response = self._prepare_editor_command(cmd)
+        if early_response is not None:
+            return InlineResponse("editor_autocomplete", **early_response)
+
         error = None
         try:
             import jedi
@@ -621,7 +660,8 @@ class MainCPythonBackend(MainBackend):
 
         return InlineResponse(
             "editor_autocomplete",
-            source=cmd.source,
+            doc_id=cmd.get("doc_id"),
+            version=cmd.get("version"),
             row=cmd.row,
             column=cmd.column,
             filename=cmd.filename,
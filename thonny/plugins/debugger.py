@@ -421,14 +421,15 @@ class FrameVisualizer:
             self._next_frame_visualizer.update_this_and_next_frames(msg)
 
     def remove_focus_tags(self):
-        for name in [
-            "exception_focus",
-            "active_focus",
-            "completed_focus",
-            "suspended_focus",
-            "sel",
-        ]:
-            self._text.tag_remove(name, "0.0", "end")
+        with self._text.tag_batch() as batch:
+            for name in [
+                "exception_focus",
+                "active_focus",
+                "completed_focus",
+                "suspended_focus",
+                "sel",
+            ]:
+                batch.remove(name, "0.0", "end")
 
     def hide_expression_box(self):
         if self._expression_box is not None:
@@ -514,8 +515,9 @@ class FrameVisualizer:
             # normal statement
             first_line, first_col, last_line = self._get_text_range_block(text_range)
 
-            for lineno in range(first_line, last_line + 1):
-                self._text.tag_add(tag, "%d.%d" % (lineno, first_col), "%d.0" % (lineno + 1))
+            with self._text.tag_batch() as batch:
+                for lineno in range(first_line, last_line + 1):
+                    batch.add(tag, "%d.%d" % (lineno, first_col), "%d.0" % (lineno + 1))
 
         self._text.update_idletasks()
         self._text.see("%d.0" % (last_line))
@@ -1,7 +1,22 @@
+"""
+Logs user actions (for studying how students work).
+
+Events are passed to a writer thread, which appends them as lines of JSON to a log
+file in Thonny's user directory. When the file grows too big, it gets compressed and
+a new file is started, so a crash loses at most the events waiting in the queue.
+The logs can be read with thonny.replay.
+"""
+import gzip
+import json
+import logging
 import os.path
+import queue
+import shutil
+import threading
 import time
 import tkinter as tk
 from datetime import datetime
+from typing import Any, Dict  # @UnusedImport
 
 from thonny import THONNY_USER_DIR, get_workbench
 from thonny.languages import tr
@@ -9,11 +24,20 @@ from thonny.shell import ShellView
 from thonny.ui_utils import asksaveasfilename
 from thonny.workbench import WorkbenchEvent
 
+logger = logging.getLogger(__name__)
+
+LOG_FILE_EXTENSION = "jsonl"
+# Events which the writer thread hasn't written yet. Further events get dropped.
+MAX_QUEUED_EVENTS = 10000
+MAX_LOG_FILE_SIZE = 5 * 1024 * 1024
+# Max time (in seconds) written events may stay only in the OS buffers
+FSYNC_INTERVAL = 5.0
+
 
 class EventLogger:
-    def __init__(self, filename):
-        self._filename = filename
-        self._events = []
+    def __init__(self):
+        self._writer = EventLogWriter()
+        self._writer.start()
 
         wb = get_workbench()
         wb.bind("WorkbenchClose", self._on_worbench_close, True)
@@ -121,39 +145,100 @@ class EventLogger:
         if len(data["time"]) == 19:
             # 0 fraction gets skipped, but reader assumes it
             data["time"] += ".0"
-        self._events.append(data)
+        self._writer.submit(data)
 
     def _on_worbench_close(self, event=None):
-        import json
-
-        with open(self._filename, encoding="UTF-8", mode="w") as fp:
-            json.dump(self._events, fp, indent="    ")
-
-        self._check_compress_logs()
-
-    def _check_compress_logs(self):
-        import zipfile
-
-        # if uncompressed logs have grown over 10MB,
-        # compress these into new zipfile
-
-        log_dir = _get_log_dir()
-        total_size = 0
-        uncompressed_files = []
-        for item in os.listdir(log_dir):
-            if item.endswith(".txt"):
-                full_name = os.path.join(log_dir, item)
-                total_size += os.stat(full_name).st_size
-                uncompressed_files.append((item, full_name))
-
-        if total_size > 10 * 1024 * 1024:
-            zip_filename = _generate_timestamp_file_name("zip")
-            with zipfile.ZipFile(zip_filename, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
-                for item, full_name in uncompressed_files:
-                    zipf.write(full_name, arcname=item)
-
-            for _, full_name in uncompressed_files:
-                os.remove(full_name)
+        self._writer.close()
+
+
+class EventLogWriter(threading.Thread):
+    """Appends the submitted events to the log file as lines of JSON"""
+
+    def __init__(self):
+        super().__init__(name="EventLogWriter", daemon=True)
+        self._queue = queue.Queue(maxsize=MAX_QUEUED_EVENTS)  # type: queue.Queue
+        self._dropped_count = 0
+        self._filename = None
+        self._fp = None
+        self._unsynced = False
+        self._last_sync_time = time.time()
+
+    def submit(self, data: Dict[str, Any]) -> None:
+        """Called in UI thread. Doesn't block, drops the event when the writer is behind"""
+        try:
+            if self._dropped_count:
+                self._queue.put_nowait(
+                    {
+                        "sequence": "EventsDropped",
+                        "time": data["time"],
+                        "count": self._dropped_count,
+                    }
+                )
+                self._dropped_count = 0
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self._dropped_count += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Event log writer is stuck, unwritten events get lost")
+            return
+        self.join(timeout)
+
+    def run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=FSYNC_INTERVAL)]
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                batch = []
+
+            stopping = None in batch
+            try:
+                for data in batch:
+                    if data is not None:
+                        self._write(data)
+                if self._fp is not None:
+                    self._fp.flush()
+                if self._unsynced and (
+                    stopping or time.time() - self._last_sync_time >= FSYNC_INTERVAL
+                ):
+                    self._sync()
+                if stopping and self._fp is not None:
+                    self._fp.close()
+            except Exception:
+                logger.exception("Problem writing event log")
+
+            if stopping:
+                return
+
+    def _write(self, data):
+        if self._fp is None:
+            self._filename = _generate_timestamp_file_name(LOG_FILE_EXTENSION)
+            self._fp = open(self._filename, mode="a", encoding="UTF-8")
+
+        self._fp.write(json.dumps(data) + "\n")
+        self._unsynced = True
+        if self._fp.tell() >= MAX_LOG_FILE_SIZE:
+            self._sync()
+            self._rotate()
+
+    def _sync(self):
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._unsynced = False
+        self._last_sync_time = time.time()
+
+    def _rotate(self):
+        """Compresses current file, next events go to a new file"""
+        self._fp.close()
+        self._fp = None
+        with open(self._filename, "rb") as src, gzip.open(self._filename + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self._filename)
 
 
 def _generate_timestamp_file_name(extension):
@@ -166,7 +251,8 @@ def _generate_timestamp_file_name(extension):
         filename = os.path.join(
             folder, time.strftime("%Y-%m-%d_%H-%M-%S_{}.{}".format(i, extension))
         )
-        if not os.path.exists(filename):
+        # rotated logs are compressed
+        if not os.path.exists(filename) and not os.path.exists(filename + ".gz"):
             return filename
 
     raise RuntimeError()
@@ -194,7 +280,7 @@ def export():
 
     with zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
         for item in os.listdir(log_dir):
-            if item.endswith(".txt") or item.endswith(".zip"):
+            if item.endswith((".txt", ".zip", "." + LOG_FILE_EXTENSION, ".gz")):
                 zipf.write(os.path.join(log_dir, item), arcname=item)
 
 
@@ -206,6 +292,4 @@ def load_plugin() -> None:
             "export_usage_logs", "tools", tr("Export usage logs..."), export, group=110
         )
 
-        filename = _generate_timestamp_file_name("txt")
-        # create logger
-        EventLogger(filename)
+        EventLogger()
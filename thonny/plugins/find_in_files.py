@@ -0,0 +1,298 @@
+import logging
+import os.path
+import re
+import tkinter as tk
+from tkinter import messagebox, ttk
+
+from thonny import THONNY_USER_DIR, get_workbench
+from thonny.file_search import FileSearch, get_index, normalize_newlines, restore_newlines
+from thonny.languages import tr
+from thonny.plugins.find_replace import (
+    apply_replacements,
+    compile_search_pattern,
+    compute_replace_all,
+    replace_in_text,
+)
+from thonny.ui_utils import SafeScrollbar, select_sequence
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = os.path.join(THONNY_USER_DIR, "find_in_files_index.pickle")
+# how often (ms) the view checks for new results
+POLL_INTERVAL = 50
+# max number of result items shown per poll (keeps the UI responsive)
+MAX_ITEMS_PER_POLL = 200
+
+
+def get_search_root():
+    """Returns the folder shown in the Files view or the working directory"""
+    try:
+        files_view = get_workbench().get_view("FilesView", create=False)
+        path = files_view.get_active_local_dir()
+        if path and os.path.isdir(path):
+            return path
+    except (KeyError, RuntimeError):
+        pass
+
+    return get_workbench().get_local_cwd()
+
+
+class FindInFilesView(ttk.Frame):
+    def __init__(self, master):
+        ttk.Frame.__init__(self, master)
+        self._search = None
+        self._file_nodes = {}
+        self._init_widgets()
+
+    def _init_widgets(self):
+        header = ttk.Frame(self)
+        header.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
+        header.columnconfigure(1, weight=1)
+
+        ttk.Label(header, text=tr("Find:")).grid(row=0, column=0, sticky="w")
+        self.find_entry = ttk.Entry(header)
+        self.find_entry.grid(row=0, column=1, sticky="ew")
+        self.find_entry.bind("<Return>", self.start_search, True)
+        self.find_entry.bind("<KP_Enter>", self.start_search, True)
+        self.search_button = ttk.Button(header, text=tr("Search"), command=self.start_search)
+        self.search_button.grid(row=0, column=2, sticky="ew", padx=(5, 0))
+
+        ttk.Label(header, text=tr("Replace with:")).grid(row=1, column=0, sticky="w")
+        self.replace_entry = ttk.Entry(header)
+        self.replace_entry.grid(row=1, column=1, sticky="ew")
+        self.replace_button = ttk.Button(
+            header, text=tr("Replace all"), command=self.replace_all, state="disabled"
+        )
+        self.replace_button.grid(row=1, column=2, sticky="ew", padx=(5, 0))
+
+        ttk.Label(header, text=tr("Folder:")).grid(row=2, column=0, sticky="w")
+        self.folder_var = tk.StringVar(value="")
+        ttk.Entry(header, textvariable=self.folder_var).grid(row=2, column=1, sticky="ew")
+
+        options = ttk.Frame(header)
+        options.grid(row=3, column=0, columnspan=3, sticky="w")
+        self.case_var = tk.IntVar()
+        ttk.Checkbutton(options, text=tr("Case sensitive"), variable=self.case_var).grid(
+            row=0, column=0
+        )
+        self.regex_var = tk.IntVar()
+        ttk.Checkbutton(options, text=tr("Regular expression"), variable=self.regex_var).grid(
+            row=0, column=1, padx=(10, 0)
+        )
+
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.status_var).grid(
+            row=1, column=0, columnspan=2, sticky="w", padx=5
+        )
+
+        self.vert_scrollbar = SafeScrollbar(self, orient=tk.VERTICAL)
+        self.vert_scrollbar.grid(row=2, column=1, sticky=tk.NSEW)
+        self.tree = ttk.Treeview(self, yscrollcommand=self.vert_scrollbar.set, show="tree")
+        self.tree.grid(row=2, column=0, sticky=tk.NSEW)
+        self.vert_scrollbar["command"] = self.tree.yview
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, True)
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(2, weight=1)
+
+    def focus_set(self):
+        if not self.folder_var.get():
+            self.folder_var.set(get_search_root())
+        self.find_entry.focus_set()
+        self.find_entry.selection_range(0, tk.END)
+
+    def _get_pattern(self):
+        tofind = self.find_entry.get()
+        if not tofind:
+            return None
+        try:
+            return compile_search_pattern(
+                tofind, self.case_var.get() != 0, self.regex_var.get() != 0
+            )
+        except re.error as e:
+            self.status_var.set(tr("Invalid regular expression") + ": " + str(e))
+            return None
+
+    def start_search(self, event=None):
+        pattern = self._get_pattern()
+        if pattern is None:
+            return
+
+        if not self.folder_var.get():
+            self.folder_var.set(get_search_root())
+        root = os.path.abspath(os.path.expanduser(self.folder_var.get()))
+        if not os.path.isdir(root):
+            self.status_var.set(tr("Folder not found"))
+            return
+
+        self.cancel_search()
+        self.tree.delete(*self.tree.get_children())
+        self._file_nodes = {}
+        self.replace_button.configure(state="disabled")
+        self.search_button.configure(text=tr("Stop"), command=self.cancel_search)
+        self.status_var.set(tr("Searching..."))
+
+        self._search = FileSearch(
+            root,
+            pattern,
+            None if self.regex_var.get() else self.find_entry.get(),
+            get_index(INDEX_FILE),
+        )
+        self._search.start()
+        self.after(POLL_INTERVAL, self._poll_results, self._search)
+
+    def cancel_search(self):
+        if self._search is not None:
+            self._search.cancel()
+
+    def _poll_results(self, search):
+        if search is not self._search:
+            # replaced by newer search
+            return
+
+        for _ in range(MAX_ITEMS_PER_POLL):
+            if search.queue.empty():
+                break
+
+            item = search.queue.get()
+            if item[0] == "hits":
+                self._add_hits(search.root, item[1], item[2])
+            elif item[0] == "progress":
+                self.status_var.set(
+                    tr("Searching...") + " %d / %d " % (item[1], item[2]) + tr("files")
+                )
+            else:
+                self._finish_search(item[1])
+                return
+
+        self.after(POLL_INTERVAL, self._poll_results, search)
+
+    def _add_hits(self, root, path, hits):
+        file_node = self.tree.insert(
+            "",
+            "end",
+            text="%s (%d)" % (os.path.relpath(path, root), len(hits)),
+            open=len(self._file_nodes) < 20,
+        )
+        self._file_nodes[file_node] = path
+        for lineno, col, end_col, line in hits:
+            self.tree.insert(
+                file_node,
+                "end",
+                text="%d: %s" % (lineno, line.strip()),
+                values=(lineno, col),
+            )
+
+    def _finish_search(self, summary):
+        self._search = None
+        self.search_button.configure(text=tr("Search"), command=self.start_search)
+        if summary.get("error"):
+            self.status_var.set(tr("Search failed") + ": " + summary["error"])
+            return
+
+        status = tr("Found %d matches in %d files") % (summary["hits"], summary["matching_files"])
+        if summary["cancelled"]:
+            status += " (" + tr("stopped") + ")"
+        self.status_var.set(status + " (%.2f s)" % summary["duration"])
+        if self._file_nodes:
+            self.replace_button.configure(state="normal")
+
+    def _on_select(self, event=None):
+        node = self.tree.focus()
+        parent = self.tree.parent(node)
+        if not parent:
+            return
+
+        lineno, col = map(int, self.tree.item(node, "values"))
+        get_workbench().get_editor_notebook().show_file_at_line(
+            self._file_nodes[parent], lineno, col
+        )
+
+    def replace_all(self):
+        pattern = self._get_pattern()
+        if pattern is None or not self._file_nodes:
+            return
+
+        paths = list(self._file_nodes.values())
+        if not messagebox.askyesno(
+            tr("Replace all"),
+            tr("Replace all occurrences in %d files?") % len(paths),
+            master=self,
+        ):
+            return
+
+        replacement = self.replace_entry.get()
+        regex = self.regex_var.get() != 0
+        total = 0
+        failed = []
+        notebook = get_workbench().get_editor_notebook()
+        for path in paths:
+            try:
+                editor = notebook.get_editor(path)
+                if editor is not None:
+                    # replace in the editor (user decides whether to save)
+                    total += self._replace_in_text(
+                        editor.get_text_widget(), pattern, replacement, regex
+                    )
+                else:
+                    total += self._replace_in_file(path, pattern, replacement, regex)
+            except (OSError, UnicodeDecodeError, re.error, IndexError):
+                logger.exception("Could not replace in %s", path)
+                failed.append(path)
+
+        self.tree.delete(*self.tree.get_children())
+        self._file_nodes = {}
+        self.replace_button.configure(state="disabled")
+        status = tr("Replaced %d occurrences") % total
+        if failed:
+            status += ", " + tr("failed in %d files") % len(failed)
+        self.status_var.set(status)
+
+    def _replace_in_text(self, text, pattern, replacement, regex):
+        source = text.get("1.0", "end-1c")
+        replacements = compute_replace_all(source, pattern, replacement, regex)
+        if replacements:
+            replace_in_text(text, source, replacements)
+        return len(replacements)
+
+    def _replace_in_file(self, path, pattern, replacement, regex):
+        # newline="" keeps the line endings
+        with open(path, encoding="utf-8", newline="") as fp:
+            original = fp.read()
+
+        # match the same text the search saw
+        replacements = compute_replace_all(
+            normalize_newlines(original), pattern, replacement, regex
+        )
+        if not replacements:
+            return 0
+
+        with open(path, "w", encoding="utf-8", newline="") as fp:
+            fp.write(apply_replacements(original, restore_newlines(original, replacements)))
+
+        get_workbench().event_generate("LocalFileOperation", path=path, operation="save")
+        return len(replacements)
+
+    def destroy(self):
+        self.cancel_search()
+        self._search = None
+        self.vert_scrollbar["command"] = None
+        ttk.Frame.destroy(self)
+
+
+def load_plugin() -> None:
+    def cmd_find_in_files():
+        view = get_workbench().show_view("FindInFilesView", False)
+        if view:
+            # search where the Files view currently is
+            view.folder_var.set(get_search_root())
+            view.focus_set()
+
+    get_workbench().add_view(FindInFilesView, tr("Find in files"), "s")
+    get_workbench().add_command(
+        "FindInFiles",
+        "edit",
+        tr("Find in files"),
+        cmd_find_in_files,
+        default_sequence=select_sequence("<Control-Shift-F>", "<Command-Shift-f>"),
+    )
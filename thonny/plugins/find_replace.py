@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import re
 import tkinter as tk
+from bisect import bisect_left, bisect_right
 from tkinter import ttk
+from typing import List, Optional, Pattern, Sequence, Tuple  # @UnusedImport
 
 from thonny import get_workbench
 from thonny.languages import tr
@@ -17,6 +20,127 @@ from thonny.ui_utils import CommonDialog, select_sequence
 
 _active_find_dialog = None
 
+# delay (ms) between typing into the find field and updating the match count
+MATCH_COUNT_DELAY = 300
+
+# Replace All doesn't merge edits over text with these tags (see replace_in_text)
+PRESERVED_TAGS = ["breakpoint_line"]
+
+
+def compile_search_pattern(tofind: str, case_sensitive: bool, regex: bool) -> Pattern:
+    """Raises re.error if regex is True and tofind is not a valid regular expression"""
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(tofind if regex else re.escape(tofind), flags)
+
+
+def find_matches(source: str, pattern: Pattern) -> List[Tuple[int, int]]:
+    """Returns start and end offsets of non-empty matches"""
+    return [m.span() for m in pattern.finditer(source) if m.end() > m.start()]
+
+
+def compute_replace_all(
+    source: str, pattern: Pattern, replacement: str, regex: bool
+) -> List[Tuple[int, int, str]]:
+    """Returns (start, end, fragment) for each match (same matches as find_matches give)
+    meaning that source[start:end] should be replaced with fragment.
+
+    In regex mode the replacement may refer to groups (eg. \\1 or \\g<name>)."""
+    return [
+        (m.start(), m.end(), m.expand(replacement) if regex else replacement)
+        for m in pattern.finditer(source)
+        if m.end() > m.start()
+    ]
+
+
+def apply_replacements(source: str, replacements: List[Tuple[int, int, str]]) -> str:
+    parts = []
+    pos = 0
+    for start, end, fragment in replacements:
+        parts.append(source[pos:start])
+        parts.append(fragment)
+        pos = end
+    parts.append(source[pos:])
+    return "".join(parts)
+
+
+def coalesce_replacements(
+    source: str,
+    replacements: List[Tuple[int, int, str]],
+    protected_ranges: Sequence[Tuple[int, int]] = (),
+) -> List[Tuple[int, int, str]]:
+    """Merges consecutive replacements into one replacement spanning from the first
+    to the last of them, unless a protected range (eg. a breakpoint line) lies in
+    the text between them. Drops the replacements which wouldn't change anything."""
+    protected_ranges = sorted(protected_ranges)
+    result = []  # type: List[Tuple[int, int, str]]
+    group = []  # type: List[Tuple[int, int, str]]
+
+    def flush():
+        if group:
+            start, end = group[0][0], group[-1][1]
+            shifted = [(s - start, e - start, fragment) for s, e, fragment in group]
+            fragment = apply_replacements(source[start:end], shifted)
+            if fragment != source[start:end]:
+                result.append((start, end, fragment))
+            group.clear()
+
+    i = 0
+    for replacement in replacements:
+        if group:
+            gap_start, gap_end = group[-1][1], replacement[0]
+            while i < len(protected_ranges) and protected_ranges[i][1] <= gap_start:
+                i += 1
+            if i < len(protected_ranges) and protected_ranges[i][0] < gap_end:
+                flush()
+        group.append(replacement)
+    flush()
+
+    return result
+
+
+def replace_in_text(text, source: str, replacements: List[Tuple[int, int, str]]) -> None:
+    """Applies the replacements computed for source (the content of text) to the text.
+
+    Matches get merged into as few edits as possible (each edit means a TextDelete and
+    a TextInsert event for coloring, logging etc.), but text carrying PRESERVED_TAGS
+    is not touched. The edits are made from the last to the first, so that the offsets
+    of the remaining edits stay valid, and they get undone in one step."""
+    line_offsets = get_line_offsets(source)
+    protected_ranges = []
+    for tag in PRESERVED_TAGS:
+        ranges = text.tag_ranges(tag)
+        for start, end in zip(ranges[::2], ranges[1::2]):
+            protected_ranges.append(
+                (index_to_offset(line_offsets, str(start)), index_to_offset(line_offsets, str(end)))
+            )
+
+    text.edit_separator()
+    for start, end, fragment in reversed(
+        coalesce_replacements(source, replacements, protected_ranges)
+    ):
+        start_index = offset_to_index(line_offsets, start)
+        text.delete(start_index, offset_to_index(line_offsets, end))
+        text.insert(start_index, fragment)
+    text.edit_separator()
+
+
+def get_line_offsets(source: str) -> List[int]:
+    offsets = [0]
+    offsets.extend(m.end() for m in re.finditer("\n", source))
+    return offsets
+
+
+def offset_to_index(line_offsets: List[int], offset: int) -> str:
+    line = bisect_right(line_offsets, offset)
+    return "%d.%d" % (line, offset - line_offsets[line - 1])
+
+
+def index_to_offset(line_offsets: List[int], index: str) -> int:
+    line, col = map(int, index.split("."))
+    return line_offsets[line - 1] + col
+
 
 class FindDialog(CommonDialog):
 
@@ -34,8 +158,6 @@ class FindDialog(CommonDialog):
 
         self.codeview = master
 
-        # references to the current set of passive found tags e.g. all words that match the searched term but are not the active string
-        self.passive_found_tags = set()
         self.active_found_tag = None  # reference to the currently active (centered) found string
 
         # a tuple containing the start and indexes of the last processed string
@@ -44,6 +166,7 @@ class FindDialog(CommonDialog):
         # and end of the inserted word
         self.last_processed_indexes = None
         self.last_search_case = None  # case sensitivity value used during the last search
+        self.last_search_regex = None  # regex mode used during the last search
 
         # set up window display
         self.geometry(
@@ -91,7 +214,14 @@ class FindDialog(CommonDialog):
         self.case_checkbutton = ttk.Checkbutton(
             main_frame, text=tr("Case sensitive"), variable=self.case_var
         )
-        self.case_checkbutton.grid(column=0, row=3, padx=(padx, 0), pady=(0, pady))
+        self.case_checkbutton.grid(column=0, row=3, sticky="w", padx=(padx, 0))
+
+        # Regex checkbox
+        self.regex_var = tk.IntVar()
+        self.regex_checkbutton = ttk.Checkbutton(
+            main_frame, text=tr("Regular expression"), variable=self.regex_var
+        )
+        self.regex_checkbutton.grid(column=0, row=4, sticky="w", padx=(padx, 0), pady=(0, pady))
 
         # Direction radiobuttons
         self.direction_var = tk.IntVar()
@@ -150,11 +280,16 @@ class FindDialog(CommonDialog):
         # create bindings
         self.bind("<Escape>", self._ok)
         self.find_entry_var.trace("w", self._update_button_statuses)
+        self.find_entry_var.trace("w", self._schedule_match_count_update)
+        self.case_var.trace("w", self._schedule_match_count_update)
+        self.regex_var.trace("w", self._schedule_match_count_update)
+        self._match_count_update_id = None
         self.find_entry.bind("<Return>", self._perform_find, True)
         self.bind("<F3>", self._perform_find, True)
         self.find_entry.bind("<KP_Enter>", self._perform_find, True)
 
         self._update_button_statuses()
+        self._schedule_match_count_update()
 
         global _active_find_dialog
         _active_find_dialog = self
@@ -181,12 +316,58 @@ class FindDialog(CommonDialog):
     def _is_search_case_sensitive(self):
         return self.case_var.get() != 0
 
+    def _is_search_regex(self):
+        return self.regex_var.get() != 0
+
+    def _set_info(self, message, error=True):
+        self.infotext_label.configure(foreground="red" if error else "")
+        self.infotext_label_var.set(message)
+
+    # returns the compiled pattern or None (with an error message in the info label) if it's invalid
+    def _get_pattern(self, tofind):
+        try:
+            return compile_search_pattern(
+                tofind, self._is_search_case_sensitive(), self._is_search_regex()
+            )
+        except re.error as e:
+            self._set_info(tr("Invalid regular expression") + ": " + str(e))
+            return None
+
+    # returns source of the codeview and the line offsets for converting between offsets and indices
+    def _get_source(self):
+        source = self.codeview.text.get("1.0", "end-1c")
+        return source, get_line_offsets(source)
+
+    def _schedule_match_count_update(self, *args):
+        if self._match_count_update_id is not None:
+            self.after_cancel(self._match_count_update_id)
+        self._match_count_update_id = self.after(MATCH_COUNT_DELAY, self._update_match_count)
+
+    # previews how many occurrences the find field currently matches
+    def _update_match_count(self):
+        self._match_count_update_id = None
+        tofind = self.find_entry.get()
+        if len(tofind) == 0:
+            self._set_info("")
+            return
+
+        pattern = self._get_pattern(tofind)
+        if pattern is None:
+            return
+
+        count = len(find_matches(self._get_source()[0], pattern))
+        if count == 1:
+            self._set_info(tr("1 match"), error=False)
+        else:
+            self._set_info(tr("%d matches") % count, error=False)
+
     # returns whether the current search is a repeat of the last searched based on all significant values
     def _repeats_last_search(self, tofind):
         return (
             tofind == FindDialog.last_searched_word
             and self.last_processed_indexes is not None
             and self.last_search_case == self._is_search_case_sensitive()
+            and self.last_search_regex == self._is_search_regex()
         )
 
     # performs the replace operation - replaces the currently active found word with what is entered in the replace field
@@ -203,11 +384,29 @@ class FindDialog(CommonDialog):
         # erase all tags - these would not be correct anyway after new word is inserted
         self._remove_all_tags()
         toreplace = self.replace_entry.get()  # get the text to replace
-
+        old_text = self.codeview.text.get(del_start, del_end)
+
+        if self._is_search_regex():
+            # expand group references in the context of the whole source (for lookarounds)
+            pattern = self._get_pattern(self.find_entry.get())
+            if pattern is None:
+                return
+            source, line_offsets = self._get_source()
+            start_offset = index_to_offset(line_offsets, self.codeview.text.index(del_start))
+            match = pattern.match(source, start_offset)
+            if match is not None and match.end() - match.start() == len(old_text):
+                try:
+                    toreplace = match.expand(toreplace)
+                except (re.error, IndexError) as e:
+                    self._set_info(str(e))
+                    return
+
+        self.codeview.text.edit_separator()
         # delete the found word
         self.codeview.text.delete(del_start, del_end)
         # insert the new word
         self.codeview.text.insert(del_start, toreplace)
+        self.codeview.text.edit_separator()
         # mark the inserted word boundaries
         self.last_processed_indexes = (
             del_start,
@@ -215,10 +414,7 @@ class FindDialog(CommonDialog):
         )
 
         get_workbench().event_generate(
-            "Replace",
-            widget=self.codeview.text,
-            old_text=self.codeview.text.get(del_start, del_end),
-            new_text=toreplace,
+            "Replace", widget=self.codeview.text, old_text=old_text, new_text=toreplace
         )
 
     # performs the replace operation followed by a new find
@@ -233,42 +429,54 @@ class FindDialog(CommonDialog):
 
         tofind = self.find_entry.get()
         if len(tofind) == 0:
-            self.infotext_label_var.set(tr("Enter string to be replaced."))
+            self._set_info(tr("Enter string to be replaced."))
             return
 
         toreplace = self.replace_entry.get()
+        pattern = self._get_pattern(tofind)
+        if pattern is None:
+            return
 
         self._remove_all_tags()
 
-        currentpos = 1.0
-        end = self.codeview.text.index("end")
-
-        while True:
-            currentpos = self.codeview.text.search(
-                tofind, currentpos, end, nocase=not self._is_search_case_sensitive()
-            )
-            if currentpos == "":
-                break
-
-            endpos = self.codeview.text.index("%s+%dc" % (currentpos, len(tofind)))
+        source = self._get_source()[0]
+        try:
+            replacements = compute_replace_all(source, pattern, toreplace, self._is_search_regex())
+        except (re.error, IndexError) as e:
+            self._set_info(str(e))
+            return
 
-            self.codeview.text.delete(currentpos, endpos)
+        count = len(replacements)
+        if count == 0:
+            self._set_info(tr("The specified text was not found!"))
+            return
 
-            if toreplace != "":
-                self.codeview.text.insert(currentpos, toreplace)
+        replace_in_text(self.codeview.text, source, replacements)
 
-            currentpos = self.codeview.text.index("%s+%dc" % (currentpos, len(toreplace)))
+        if count == 1:
+            self._set_info(tr("Replaced 1 occurrence"), error=False)
+        else:
+            self._set_info(tr("Replaced %d occurrences") % count, error=False)
 
         get_workbench().event_generate(
-            "ReplaceAll", widget=self.codeview.text, old_text=tofind, new_text=toreplace
+            "ReplaceAll",
+            widget=self.codeview.text,
+            old_text=tofind,
+            new_text=toreplace,
+            regex=self._is_search_regex(),
+            count=count,
         )
 
     def _perform_find(self, event=None):
-        self.infotext_label_var.set("")  # reset the info label text
+        self._set_info("")  # reset the info label text
         tofind = self.find_entry.get()  # get the text to find
         if len(tofind) == 0:  # in the case of empty string, cancel
             return  # TODO - set warning text to info label?
 
+        pattern = self._get_pattern(tofind)
+        if pattern is None:
+            return
+
         search_backwards = (
             self.direction_var.get() == 1
         )  # True - search backwards ('up'), False - forwards ('down')
@@ -285,52 +493,46 @@ class FindDialog(CommonDialog):
                 self.codeview.text.tag_remove(
                     "current_found", self.active_found_tag[0], self.active_found_tag[1]
                 )  # remove the active tag from the previously found string
-                self.passive_found_tags.add(
-                    (self.active_found_tag[0], self.active_found_tag[1])
-                )  # ..and set it to passive instead
                 self.codeview.text.tag_add(
                     "found", self.active_found_tag[0], self.active_found_tag[1]
-                )
+                )  # ..and set it to passive instead
 
         else:  # start a new search, start from the current insert line position
-            if self.active_found_tag is not None:
-                self.codeview.text.tag_remove(
-                    "current_found", self.active_found_tag[0], self.active_found_tag[1]
-                )  # remove the previous active tag if it was present
-            for tag in self.passive_found_tags:
-                self.codeview.text.tag_remove(
-                    "found", tag[0], tag[1]
-                )  # and remove all the previous passive tags that were present
+            self._remove_all_tags()
             search_start_index = self.codeview.text.index(
                 "insert"
             )  # start searching from the current insert position
-            self._find_and_tag_all(tofind)  # set the passive tag to ALL found occurences
+            self._find_and_tag_all(tofind, pattern)  # set the passive tag to ALL found occurences
             FindDialog.last_searched_word = tofind  # set the data about last search
             self.last_search_case = self._is_search_case_sensitive()
+            self.last_search_regex = self._is_search_regex()
 
-        wordstart = self.codeview.text.search(
-            tofind,
-            search_start_index,
-            backwards=search_backwards,
-            forwards=not search_backwards,
-            nocase=not self._is_search_case_sensitive(),
-        )  # performs the search and sets the start index of the found string
-        if len(wordstart) == 0:
-            self.infotext_label_var.set(
+        source, line_offsets = self._get_source()
+        matches = find_matches(source, pattern)
+        if not matches:
+            self._set_info(
                 tr("The specified text was not found!")
             )  # TODO - better text, also move it to the texts resources list
             self.replace_and_find_button.config(state="disabled")
             self.replace_button.config(state="disabled")
             return
 
+        # like Text.search, wraps around at the end (or start) of the text
+        search_start = index_to_offset(line_offsets, self.codeview.text.index(search_start_index))
+        starts = [match_start for match_start, _ in matches]
+        if search_backwards:
+            i = bisect_left(starts, search_start) - 1
+        else:
+            i = bisect_left(starts, search_start) % len(matches)
+        match_start, match_end = matches[i]
+        wordstart = offset_to_index(line_offsets, match_start)
+        wordend = offset_to_index(line_offsets, match_end)
+
         self.last_processed_indexes = (
             wordstart,
             self.codeview.text.index("%s+1c" % wordstart),
         )  # sets the data about last search
         self.codeview.text.see(wordstart)  # moves the view to the found index
-        wordend = self.codeview.text.index(
-            "%s+%dc" % (wordstart, len(tofind))
-        )  # calculates the end index of the found string
         self.codeview.text.tag_add(
             "current_found", wordstart, wordend
         )  # tags the found word as active
@@ -344,10 +546,13 @@ class FindDialog(CommonDialog):
             text=tofind,
             backwards=search_backwards,
             case_sensitive=self._is_search_case_sensitive(),
+            regex=self._is_search_regex(),
         )
 
     def _ok(self, event=None):
         """Called when the window is closed. responsible for handling all cleanup."""
+        if self._match_count_update_id is not None:
+            self.after_cancel(self._match_count_update_id)
         self._remove_all_tags()
         self.destroy()
 
@@ -356,43 +561,29 @@ class FindDialog(CommonDialog):
 
     # removes the active tag and all passive tags
     def _remove_all_tags(self):
-        for tag in self.passive_found_tags:
-            self.codeview.text.tag_remove("found", tag[0], tag[1])  # removes the passive tags
-
-        if self.active_found_tag is not None:
-            self.codeview.text.tag_remove(
-                "current_found", self.active_found_tag[0], self.active_found_tag[1]
-            )  # removes the currently active tag
+        with self.codeview.text.tag_batch() as batch:
+            batch.remove("found")
+            batch.remove("current_found")
 
         self.active_found_tag = None
         self.replace_and_find_button.config(state="disabled")
         self.replace_button.config(state="disabled")
 
     # finds and tags all occurences of the searched term
-    def _find_and_tag_all(self, tofind, force=False):
-        # TODO - to be improved so only whole words are matched - surrounded by whitespace, parentheses, brackets, colons, semicolons, points, plus, minus
-
+    def _find_and_tag_all(self, tofind, pattern, force=False):
         if (
             self._repeats_last_search(tofind) and not force
         ):  # nothing to do, all passive tags already set
             return
 
-        currentpos = 1.0
-        end = self.codeview.text.index("end")
-
-        # searches and tags until the end of codeview
-        while True:
-            currentpos = self.codeview.text.search(
-                tofind, currentpos, end, nocase=not self._is_search_case_sensitive()
-            )
-            if currentpos == "":
-                break
-
-            endpos = self.codeview.text.index("%s+%dc" % (currentpos, len(tofind)))
-            self.passive_found_tags.add((currentpos, endpos))
-            self.codeview.text.tag_add("found", currentpos, endpos)
-
-            currentpos = self.codeview.text.index("%s+1c" % currentpos)
+        source, line_offsets = self._get_source()
+        with self.codeview.text.tag_batch() as batch:
+            for start, end in find_matches(source, pattern):
+                batch.add(
+                    "found",
+                    offset_to_index(line_offsets, start),
+                    offset_to_index(line_offsets, end),
+                )
 
 
 def load_plugin() -> None:
@@ -3,6 +3,7 @@ import logging
 import tkinter as tk
 
 from thonny import get_workbench, jedi_utils
+from thonny.document_model import parser_lock
 from thonny.ui_utils import control_is_pressed
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,8 @@ def goto_definition(event):
         logger.warning("Could not get path", exc_info=e)
         path = None
 
-    defs = jedi_utils.get_definitions(source, line, column, path)
+    with parser_lock:
+        defs = jedi_utils.get_definitions(source, line, column, path)
     if len(defs) > 0:
         # TODO: handle multiple results like PyCharm
         module_path = str(defs[0].module_path)
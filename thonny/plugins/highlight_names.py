@@ -2,6 +2,7 @@ import logging
 import tkinter as tk
 
 from thonny import get_workbench, jedi_utils
+from thonny.document_model import get_document_model, parser_lock
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +14,17 @@ class BaseNameHighlighter:
         self.text = text
         self._update_scheduled = False
 
-    def get_positions_for(self, source, line, column):
+    def get_positions_for(self, model, line, column):
         raise NotImplementedError()
 
     def get_positions(self):
+        cursor = self._get_cursor_position()
+        if cursor is None:
+            return set()
+
+        return self.get_positions_for(get_document_model(self.text), *cursor)
+
+    def _get_cursor_position(self):
         index = self.text.index("insert")
 
         # ignore if cursor in open string
@@ -24,13 +32,10 @@ class BaseNameHighlighter:
             "open_string3", index
         ):
 
-            return set()
+            return None
 
-        source = self.text.get("1.0", "end")
         index_parts = index.split(".")
-        line, column = int(index_parts[0]), int(index_parts[1])
-
-        return self.get_positions_for(source, line, column)
+        return int(index_parts[0]), int(index_parts[1])
 
     def schedule_update(self):
         def perform_update():
@@ -44,17 +49,32 @@ class BaseNameHighlighter:
             self.text.after_idle(perform_update)
 
     def update(self):
-        self.text.tag_remove("matched_name", "1.0", "end")
+        if (
+            not get_workbench().get_option("view.name_highlighting")
+            or not self.text.is_python_text()
+        ):
+            self._show_positions(set())
+            return
+
+        cursor = self._get_cursor_position()
+        if cursor is None:
+            self._show_positions(set())
+            return
+
+        line, column = cursor
+        # Analysis is done in a background thread, stale results get dropped
+        get_document_model(self.text).analyze_in_background(
+            "name_highlighting",
+            lambda snapshot: self.get_positions_for(snapshot, line, column),
+            self._show_positions,
+        )
 
-        if get_workbench().get_option("view.name_highlighting") and self.text.is_python_text():
-            try:
-                positions = self.get_positions()
-                if len(positions) > 1:
-                    for pos in positions:
-                        start_index, end_index = pos[0], pos[1]
-                        self.text.tag_add("matched_name", start_index, end_index)
-            except Exception as e:
-                logger.exception("Problem when updating name highlighting", exc_info=e)
+    def _show_positions(self, positions):
+        with self.text.tag_batch() as batch:
+            batch.remove("matched_name")
+            if len(positions) > 1:
+                for start_index, end_index in positions:
+                    batch.add("matched_name", start_index, end_index)
 
 
 class VariablesHighlighter(BaseNameHighlighter):
@@ -265,8 +285,8 @@ class VariablesHighlighter(BaseNameHighlighter):
         usages = find_usages_in_node(scope)
         return usages
 
-    def get_positions_for(self, source, line, column):
-        module_node = jedi_utils.parse_source(source)
+    def get_positions_for(self, model, line, column):
+        module_node = model.get_tree()
         pos = (line, column)
         stmt = self._get_statement_for_position(module_node, pos)
 
@@ -300,12 +320,13 @@ class UsagesHighlighter(BaseNameHighlighter):
     NB!!!!!!!!!!!!! newer jedi versions use subprocess and are too slow to run
     for each keypress"""
 
-    def get_positions_for(self, source, line, column):
+    def get_positions_for(self, model, line, column):
         # https://github.com/davidhalter/jedi/issues/897
         from jedi import Script
 
-        script = Script(source + ")")
-        usages = script.get_references(line, column, include_builtins=False)
+        with parser_lock:
+            script = Script(model.get_source() + ")")
+            usages = script.get_references(line, column, include_builtins=False)
 
         result = {
             (
@@ -320,9 +341,9 @@ class UsagesHighlighter(BaseNameHighlighter):
 
 
 class CombinedHighlighter(VariablesHighlighter, UsagesHighlighter):
-    def get_positions_for(self, source, line, column):
-        usages = UsagesHighlighter.get_positions_for(self, source, line, column)
-        variables = VariablesHighlighter.get_positions_for(self, source, line, column)
+    def get_positions_for(self, model, line, column):
+        usages = UsagesHighlighter.get_positions_for(self, model, line, column)
+        variables = VariablesHighlighter.get_positions_for(self, model, line, column)
         return usages | variables
 
 
@@ -1,104 +1,134 @@
-import logging
 import tkinter as tk
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple  # @UnusedImport
+
+from thonny import get_workbench
+from thonny.decorations import ViewportDecorator
+from thonny.document_model import get_document_model, register_analysis
+
+
+def _find_local_name_positions(model):
+    from jedi import parser_utils
+    from parso.python import tree
+
+    locs = []
+
+    def process_scope(scope):
+        if isinstance(scope, tree.Function):
+            # process all children after name node,
+            # (otherwise name of global function will be marked as local def)
+            local_names = set()
+            global_names = set()
+            for child in scope.children[2:]:
+                process_node(child, local_names, global_names)
+        else:
+            if hasattr(scope, "subscopes"):
+                for child in scope.subscopes:
+                    process_scope(child)
+            elif hasattr(scope, "children"):
+                for child in scope.children:
+                    process_scope(child)
+
+    def process_node(node, local_names, global_names):
+        if isinstance(node, tree.GlobalStmt):
+            global_names.update([n.value for n in node.get_global_names()])
+
+        elif isinstance(node, tree.Name):
+            if node.value in global_names:
+                return
+
+            if node.is_definition():  # local def
+                locs.append(node)
+                local_names.add(node.value)
+            elif node.value in local_names:  # use of local
+                locs.append(node)
+
+        elif isinstance(node, tree.BaseNode):
+            # ref: jedi/parser/grammar*.txt
+            if node.type == "trailer" and node.children[0].value == ".":
+                # this is attribute
+                return
+
+            if isinstance(node, tree.Function):
+                global_names = set()  # outer global statement doesn't have effect anymore
+
+            for child in node.children:
+                process_node(child, local_names, global_names)
+
+    module = model.get_tree()
+    for child in module.children:
+        if isinstance(child, tree.BaseNode) and parser_utils.is_scope(child):
+            process_scope(child)
+
+    loc_pos = set(
+        (
+            "%d.%d" % (usage.start_pos[0], usage.start_pos[1]),
+            "%d.%d" % (usage.start_pos[0], usage.start_pos[1] + len(usage.value)),
+        )
+        for usage in locs
+    )
 
-from thonny import get_workbench, jedi_utils
+    return loc_pos
 
 
-class LocalsHighlighter:
-    def __init__(self, text):
-        self.text = text
+register_analysis("local_names", _find_local_name_positions)
 
-        self._update_scheduled = False
 
-    def get_positions(self):
-        from jedi import parser_utils
-        from parso.python import tree
-
-        locs = []
-
-        def process_scope(scope):
-            if isinstance(scope, tree.Function):
-                # process all children after name node,
-                # (otherwise name of global function will be marked as local def)
-                local_names = set()
-                global_names = set()
-                for child in scope.children[2:]:
-                    process_node(child, local_names, global_names)
-            else:
-                if hasattr(scope, "subscopes"):
-                    for child in scope.subscopes:
-                        process_scope(child)
-                elif hasattr(scope, "children"):
-                    for child in scope.children:
-                        process_scope(child)
-
-        def process_node(node, local_names, global_names):
-            if isinstance(node, tree.GlobalStmt):
-                global_names.update([n.value for n in node.get_global_names()])
-
-            elif isinstance(node, tree.Name):
-                if node.value in global_names:
-                    return
-
-                if node.is_definition():  # local def
-                    locs.append(node)
-                    local_names.add(node.value)
-                elif node.value in local_names:  # use of local
-                    locs.append(node)
-
-            elif isinstance(node, tree.BaseNode):
-                # ref: jedi/parser/grammar*.txt
-                if node.type == "trailer" and node.children[0].value == ".":
-                    # this is attribute
-                    return
-
-                if isinstance(node, tree.Function):
-                    global_names = set()  # outer global statement doesn't have effect anymore
-
-                for child in node.children:
-                    process_node(child, local_names, global_names)
-
-        source = self.text.get("1.0", "end")
-        module = jedi_utils.parse_source(source)
-        for child in module.children:
-            if isinstance(child, tree.BaseNode) and parser_utils.is_scope(child):
-                process_scope(child)
-
-        loc_pos = set(
-            (
-                "%d.%d" % (usage.start_pos[0], usage.start_pos[1]),
-                "%d.%d" % (usage.start_pos[0], usage.start_pos[1] + len(usage.value)),
-            )
-            for usage in locs
-        )
+class LocalsHighlighter(ViewportDecorator):
+    tags = ["local_name"]
+
+    def __init__(self, text):
+        super().__init__(text)
+        self._analysis_scheduled = False
+        # latest analysis result, sorted by line
+        self._positions = []  # type: List[Tuple[int, str, str]]
+        self._position_lines = []  # type: List[int]
+        self._positions_version = None
 
-        return loc_pos
+    def get_positions(self):
+        return get_document_model(self.text).get("local_names")
 
-    def _highlight(self, pos_info):
-        for pos in pos_info:
-            start_index, end_index = pos[0], pos[1]
-            self.text.tag_add("local_name", start_index, end_index)
+    def is_enabled(self):
+        return get_workbench().get_option("view.locals_highlighting") and self.text.is_python_text()
 
-    def schedule_update(self):
-        def perform_update():
+    def schedule_analysis(self):
+        def perform_analysis():
             try:
-                self.update()
+                self.analyze()
             finally:
-                self._update_scheduled = False
+                self._analysis_scheduled = False
 
-        if not self._update_scheduled:
-            self._update_scheduled = True
-            self.text.after_idle(perform_update)
+        if not self._analysis_scheduled:
+            self._analysis_scheduled = True
+            self.text.after_idle(perform_analysis)
 
-    def update(self):
-        self.text.tag_remove("local_name", "1.0", "end")
+    def analyze(self):
+        if self.is_enabled():
+            # Analysis is done in a background thread, stale results get dropped
+            get_document_model(self.text).analyze_in_background(
+                "local_names", lambda snapshot: snapshot.get("local_names"), self._set_positions
+            )
+        else:
+            self.update()
 
-        if get_workbench().get_option("view.locals_highlighting") and self.text.is_python_text():
-            try:
-                highlight_positions = self.get_positions()
-                self._highlight(highlight_positions)
-            except Exception:
-                logging.exception("Problem when updating local variable tags")
+    def _set_positions(self, pos_info):
+        self._positions = sorted(
+            (int(start_index.split(".")[0]), start_index, end_index)
+            for start_index, end_index in pos_info
+        )
+        self._position_lines = [pos[0] for pos in self._positions]
+        self._positions_version = get_document_model(self.text).get_version()
+        self.invalidate()
+        self.update()
+
+    def compute_ranges(self, model, first_line, last_line):
+        if self._positions_version != model.get_version():
+            # wait for the analysis
+            return None
+
+        start = bisect_left(self._position_lines, first_line)
+        end = bisect_right(self._position_lines, last_line)
+        return [("local_name", pos[1], pos[2]) for pos in self._positions[start:end]]
 
 
 def update_highlighting(event):
@@ -112,11 +142,18 @@ def update_highlighting(event):
     if not hasattr(text, "local_highlighter"):
         text.local_highlighter = LocalsHighlighter(text)
 
-    text.local_highlighter.schedule_update()
+    text.local_highlighter.schedule_analysis()
+
+
+def update_viewport(event):
+    highlighter = getattr(event.widget, "local_highlighter", None)
+    if highlighter is not None:
+        highlighter.schedule_update()
 
 
 def load_plugin() -> None:
     wb = get_workbench()
     wb.set_default("view.locals_highlighting", False)
     wb.bind_class("CodeViewText", "<<TextChange>>", update_highlighting, True)
+    wb.bind_class("CodeViewText", "<<VerticalScroll>>", update_viewport, True)
     wb.bind("<<UpdateAppearance>>", update_highlighting, True)
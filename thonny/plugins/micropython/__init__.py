@@ -22,6 +22,7 @@ from thonny.plugins.backend_config_page import (
 )
 from thonny.running import SubprocessProxy
 from thonny.ui_utils import (
+    ask_string,
     create_string_var,
     create_url_label,
 )
@@ -149,11 +150,17 @@ class BareMetalMicroPythonProxy(MicroPythonProxy):
             "api_stubs_path": self._get_api_stubs_path(),
             "write_block_size": self._get_write_block_size(),
             "write_block_delay": self._get_write_block_delay(),
+            "baudrate": get_workbench().get_option(self.backend_name + ".baudrate"),
+            "persistent_helper": get_workbench().get_option(
+                self.backend_name + ".persistent_helper"
+            ),
             "proxy_class": self.__class__.__name__,
         }
         if self._port == "webrepl":
             args["url"] = get_workbench().get_option(self.backend_name + ".webrepl_url")
             args["password"] = get_workbench().get_option(self.backend_name + ".webrepl_password")
+        else:
+            args["link_params"] = self._get_cached_link_params()
 
         args.update(self._get_time_args())
 
@@ -170,6 +177,36 @@ class BareMetalMicroPythonProxy(MicroPythonProxy):
     def _get_write_block_delay(self):
         return get_workbench().get_option(self.backend_name + ".write_block_delay")
 
+    def _get_device_key(self) -> Optional[str]:
+        """Identifies the device connected to current port for caching link parameters"""
+        try:
+            info = get_port_info(self._port)
+        except RuntimeError:
+            return None
+
+        if info.vid is None:
+            return None
+
+        return "%04X:%04X:%s" % (info.vid, info.pid, info.serial_number or "")
+
+    def _get_cached_link_params(self) -> Optional[dict]:
+        key = self._get_device_key()
+        if key is None:
+            return None
+
+        return get_workbench().get_option(self.backend_name + ".link_params").get(key, None)
+
+    def _store_link_params(self, link_params) -> None:
+        key = self._get_device_key()
+        if key is None:
+            return
+
+        # need to copy, because otherwise I may change the default value
+        all_params = get_workbench().get_option(self.backend_name + ".link_params").copy()
+        if all_params.get(key) != link_params:
+            all_params[key] = link_params
+            get_workbench().set_option(self.backend_name + ".link_params", all_params)
+
     def interrupt(self):
         # Don't interrupt local process, but direct it to device
         self._send_msg(ImmediateCommand("interrupt"))
@@ -317,6 +354,9 @@ class BareMetalMicroPythonProxy(MicroPythonProxy):
             self._have_stored_pidwid = True
             get_workbench().set_option(self.backend_name + ".used_vidpids", used_vidpids)
 
+            if msg.get("link_params"):
+                self._store_link_params(msg["link_params"])
+
         return msg
 
     @classmethod
@@ -373,7 +413,7 @@ class BareMetalMicroPythonProxy(MicroPythonProxy):
                 "direct",
                 "--quiet",
                 self._port,
-                "115200",
+                str(get_workbench().get_option(self.backend_name + ".baudrate") or 115200),
             ],
             cwd=get_workbench().get_local_cwd(),
             keep_open=False,
@@ -945,6 +985,12 @@ def add_micropython_backend(
         get_workbench().set_default(name + ".dtr", dtr)
         get_workbench().set_default(name + ".rts", rts)
         get_workbench().set_default(name + ".submit_mode", None)
+        # None means default (115200). Irrelevant for native USB (CDC) connections
+        get_workbench().set_default(name + ".baudrate", None)
+        # negotiated block sizes and delays per device (VID:PID:serial)
+        get_workbench().set_default(name + ".link_params", {})
+        # store helper code on the device instead of sending it after each soft reboot
+        get_workbench().set_default(name + ".persistent_helper", False)
 
         if sync_time is None:
             sync_time = True
@@ -958,7 +1004,83 @@ def add_micropython_backend(
     get_workbench().add_backend(name, proxy_class, description, config_page, sort_key=sort_key)
 
 
+def run_current_script_on_all_devices():
+    from thonny.editors import get_saved_current_script_filename, is_remote_path
+    from thonny.running import create_frontend_python_process
+    from thonny.workdlg import SubprocessDialog
+
+    filename = get_saved_current_script_filename()
+    if not filename:
+        return
+
+    if is_remote_path(filename):
+        messagebox.showerror(
+            tr("Error"),
+            tr("Only scripts stored on this computer can be run on several devices"),
+            master=get_workbench(),
+        )
+        return
+
+    from thonny.plugins.micropython.multi_device import is_micropython_port
+
+    # the script interrupts whatever runs on the devices, so the user must confirm the ports
+    proxy = get_runner().get_backend_proxy()
+    descriptions = {p.device: p.description for p in list_serial_ports()}
+    proposed_ports = [p.device for p in list_serial_ports() if is_micropython_port(p)]
+    if (
+        isinstance(proxy, BareMetalMicroPythonProxy)
+        and proxy._port in descriptions
+        and proxy._port not in proposed_ports
+    ):
+        proposed_ports.insert(0, proxy._port)
+
+    prompt = tr("Serial ports to run the script on (separated by spaces).") + "\n"
+    if descriptions:
+        prompt += (
+            "\n"
+            + tr("Available ports:")
+            + "\n"
+            + "\n".join("    %s (%s)" % item for item in sorted(descriptions.items()))
+        )
+    answer = ask_string(
+        tr("Run on all devices"),
+        prompt,
+        initial_value=" ".join(proposed_ports),
+        master=get_workbench(),
+    )
+    if not answer or not answer.split():
+        return
+    ports = answer.split()
+
+    if isinstance(proxy, BareMetalMicroPythonProxy) and proxy.is_connected():
+        # the port must be released for the manager
+        get_runner().send_command_and_wait(InlineCommand("prepare_disconnect"), "Disconnecting")
+        proxy.disconnect()
+
+    proc = create_frontend_python_process(
+        ["-m", "thonny.plugins.micropython.multi_device", "--ports", ",".join(ports)]
+        + ["run", filename]
+    )
+    dlg = SubprocessDialog(
+        get_workbench(),
+        proc,
+        tr("Run on all devices"),
+        long_description=tr("Running %s on %s") % (os.path.basename(filename), ", ".join(ports)),
+        autostart=True,
+    )
+    ui_utils.show_dialog(dlg)
+
+
 def load_plugin():
+    get_workbench().add_command(
+        "run_on_all_micropython_devices",
+        "tools",
+        tr("Run current script on all MicroPython devices"),
+        run_current_script_on_all_devices,
+        tester=lambda: get_workbench().get_editor_notebook().get_current_editor() is not None,
+        group=120,
+    )
+
     add_micropython_backend(
         "GenericMicroPython",
         GenericBareMetalMicroPythonProxy,
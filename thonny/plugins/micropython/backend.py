@@ -34,11 +34,13 @@ CP 5.0
 """
 
 import ast
+import base64
 import datetime
 import io
 import logging
 import os
 import re
+import struct
 import sys
 import textwrap
 import threading
@@ -101,6 +103,107 @@ STAT_MTIME_INDEX = 8
 PASTE_MODE_CMD = b"\x05"
 PASTE_MODE_LINE_PREFIX = b"=== "
 
+# Management values in compact encoding start with this (repr never does)
+COMPACT_VALUE_PREFIX = "@"
+# Smaller containers (unless containing larger ones) are sent as repr
+COMPACT_VALUE_MIN_ITEMS = 8
+
+# Helper methods for encoding management values in a msgpack-like format (base64 encoded).
+# Differences from msgpack: 0xC1 marks that next array is a tuple, ints are always signed.
+COMPACT_VALUE_HELPERS = dedent(
+    """
+    try:
+        from ubinascii import b2a_base64
+    except ImportError:
+        try:
+            from binascii import b2a_base64
+        except ImportError:
+            b2a_base64 = None
+    try:
+        import ustruct as struct
+    except ImportError:
+        import struct
+
+    @classmethod
+    def mgmt_repr(cls, obj):
+        if cls.b2a_base64 is not None and cls.is_large_value(obj):
+            try:
+                buf = bytearray()
+                cls.encode_compact(obj, buf)
+                return %(prefix)r + cls.b2a_base64(buf).decode().strip()
+            except Exception:
+                pass
+        return repr(obj)
+
+    @classmethod
+    def is_large_value(cls, obj):
+        if isinstance(obj, dict):
+            return len(obj) >= %(min_items)d
+        elif isinstance(obj, (list, tuple)):
+            if len(obj) >= %(min_items)d:
+                return True
+            for item in obj:
+                if cls.is_large_value(item):
+                    return True
+        return False
+
+    @classmethod
+    def encode_compact(cls, obj, buf):
+        if obj is None:
+            buf.append(0xC0)
+        elif obj is False:
+            buf.append(0xC2)
+        elif obj is True:
+            buf.append(0xC3)
+        elif isinstance(obj, int):
+            if 0 <= obj < 0x80:
+                buf.append(obj)
+            elif -0x20 <= obj < 0:
+                buf.append(obj & 0xFF)
+            elif -0x80000000 <= obj < 0x80000000:
+                buf.append(0xD2)
+                buf.extend(cls.struct.pack(">i", obj))
+            else:
+                buf.append(0xD3)
+                buf.extend(cls.struct.pack(">q", obj))
+        elif isinstance(obj, float):
+            buf.append(0xCB)
+            buf.extend(cls.struct.pack(">d", obj))
+        elif isinstance(obj, str):
+            data = obj.encode("utf-8")
+            cls.encode_compact_header(buf, len(data), 0xA0, 32, 0xDA)
+            buf.extend(data)
+        elif isinstance(obj, bytes):
+            cls.encode_compact_header(buf, len(obj), None, 0, 0xC5)
+            buf.extend(obj)
+        elif isinstance(obj, (list, tuple)):
+            if isinstance(obj, tuple):
+                buf.append(0xC1)
+            cls.encode_compact_header(buf, len(obj), 0x90, 16, 0xDC)
+            for item in obj:
+                cls.encode_compact(item, buf)
+        elif isinstance(obj, dict):
+            cls.encode_compact_header(buf, len(obj), 0x80, 16, 0xDE)
+            for key in obj:
+                cls.encode_compact(key, buf)
+                cls.encode_compact(obj[key], buf)
+        else:
+            raise TypeError("Can't encode " + str(type(obj)))
+
+    @classmethod
+    def encode_compact_header(cls, buf, length, fix_code, fix_limit, code16):
+        if length < fix_limit:
+            buf.append(fix_code | length)
+        elif length < 0x10000:
+            buf.append(code16)
+            buf.extend(cls.struct.pack(">H", length))
+        else:
+            buf.append(code16 + 1)
+            buf.extend(cls.struct.pack(">I", length))
+"""
+    % {"min_items": COMPACT_VALUE_MIN_ITEMS, "prefix": COMPACT_VALUE_PREFIX}
+)
+
 
 logger = logging.getLogger(__name__)
 
@@ -124,6 +227,10 @@ class MicroPythonBackend(MainBackend, ABC):
         self._builtin_modules = []
         self._api_stubs_path = args.get("api_stubs_path")
         self._builtins_info = self._fetch_builtins_info()
+        # for fetching only changed globals and directory listings
+        self._main_globals = {}
+        self._main_globals_version = None
+        self._dir_children_cache = {}
 
         MainBackend.__init__(self)
         try:
@@ -152,7 +259,7 @@ class MicroPythonBackend(MainBackend, ABC):
         self._report_time("bef preparing helpers")
         script = self._get_all_helpers()
         self._check_perform_just_in_case_gc()
-        self._execute_without_output(script)
+        self._prepare_helpers(script)
         self._report_time("prepared helpers")
 
         self._update_cwd()
@@ -194,6 +301,9 @@ class MicroPythonBackend(MainBackend, ABC):
     def _check_prepare(self):
         pass  # overridden in bare metal
 
+    def _prepare_helpers(self, script):
+        self._execute_without_output(script)
+
     def _get_all_helpers(self):
         # Can't import functions into class context:
         # https://github.com/micropython/micropython/issues/6198
@@ -217,9 +327,13 @@ class MicroPythonBackend(MainBackend, ABC):
                         cls.last_repl_values = cls.last_repl_values[-{num_values_to_keep}:]
                         print({start_marker!r}, cls.repr(obj), '@', id(obj), {end_marker!r}, sep='')
                 
+                @classmethod
+                def print_mgmt_value(cls, obj):
+                    print({mgmt_start!r}, cls.mgmt_repr(obj), {mgmt_end!r}, sep='', end='')
+                
                 @staticmethod
-                def print_mgmt_value(obj):
-                    print({mgmt_start!r}, repr(obj), {mgmt_end!r}, sep='', end='')
+                def mgmt_repr(obj):
+                    return repr(obj)
                     
                 @staticmethod
                 def repr(obj):
@@ -558,11 +672,16 @@ class MicroPythonBackend(MainBackend, ABC):
         suffix = out[end_token_pos + len(MGMT_VALUE_END) :]
 
         try:
-            value = ast.literal_eval(value_str)
+            if value_str.startswith(COMPACT_VALUE_PREFIX):
+                value = decode_compact_value(
+                    base64.b64decode(value_str[len(COMPACT_VALUE_PREFIX) :])
+                )
+            else:
+                value = ast.literal_eval(value_str)
             self._send_output(prefix, "stdout")
             self._send_output(suffix, "stdout")
             return value
-        except SyntaxError:
+        except (SyntaxError, ValueError, IndexError, struct.error):
             raise ManagementError(script, out, err)
 
     def _forward_unexpected_output(self, stream_name="stdout"):
@@ -626,7 +745,9 @@ class MicroPythonBackend(MainBackend, ABC):
         raise NotImplementedError()
 
     def _cmd_get_globals(self, cmd):
-        if cmd.module_name == "__main__":
+        if cmd.module_name == "__main__" and self._supports_incremental_globals():
+            globs = self._fetch_main_globals_incrementally()
+        elif cmd.module_name == "__main__":
             globs = self._evaluate(
                 "{name : (__thonny_helper.repr(value), id(value)) for (name, value) in globals().items() if not name.startswith('__')}"
             )
@@ -652,6 +773,31 @@ class MicroPythonBackend(MainBackend, ABC):
 
         return {"module_name": cmd.module_name, "globals": value_infos}
 
+    def _supports_incremental_globals(self):
+        """Whether the helper has get_globals_diff"""
+        return False
+
+    def _fetch_main_globals_incrementally(self):
+        """Asks only for globals changed since last query. The helper sends all globals
+        if its version counter doesn't match (eg. after soft reboot)"""
+        known_version = self._main_globals_version
+        self._main_globals_version = None
+        version, is_diff, changed, removed = self._evaluate(
+            "__thonny_helper.get_globals_diff(%r, globals())" % known_version
+        )
+
+        if is_diff:
+            globs = self._main_globals.copy()
+            for name in removed:
+                globs.pop(name, None)
+            globs.update(changed)
+        else:
+            globs = changed
+
+        self._main_globals = globs
+        self._main_globals_version = version
+        return globs
+
     def _cmd_get_fs_info(self, cmd):
         raise NotImplementedError()
 
@@ -943,8 +1089,14 @@ class MicroPythonBackend(MainBackend, ABC):
         self._mkdir(cmd.path)
 
     def _cmd_editor_autocomplete(self, cmd):
+        early_response = self._prepare_editor_command(cmd)
+        if early_response is not None:
+            return early_response
+
         # template for the response
-        result = dict(source=cmd.source, row=cmd.row, column=cmd.column)
+        result = dict(
+            doc_id=cmd.get("doc_id"), version=cmd.get("version"), row=cmd.row, column=cmd.column
+        )
 
         try:
             import jedi
@@ -1160,10 +1312,14 @@ class MicroPythonBackend(MainBackend, ABC):
     ) -> Optional[Dict[str, Dict]]:
         """The key of the result dict is simple name"""
         if self._supports_directories():
-            raw_data = self._evaluate(
+            # Device sends only the hash of the listing if it matches the one we already have
+            cache_key = (path, include_hidden)
+            known_hash, known_data = self._dir_children_cache.get(cache_key, (None, None))
+            response = self._evaluate(
                 dedent(
                     """
                 __thonny_result = {} 
+                __thonny_hash = 0
                 try:
                     __thonny_names = __thonny_helper.listdir(%r)
                 except OSError:
@@ -1175,13 +1331,26 @@ class MicroPythonBackend(MainBackend, ABC):
                                 __thonny_result[__thonny_name] = __thonny_helper.os.stat(%r + __thonny_name)
                             except OSError as e:
                                 __thonny_result[__thonny_name] = str(e)
-                    __thonny_helper.print_mgmt_value(__thonny_result)
+                            __thonny_hash ^= hash((__thonny_name, __thonny_result[__thonny_name]))
+                    if __thonny_hash == %r:
+                        __thonny_helper.print_mgmt_value(__thonny_hash)
+                    else:
+                        __thonny_helper.print_mgmt_value((__thonny_hash, __thonny_result))
+                del __thonny_result
+                del __thonny_hash
             """
                 )
-                % (path, include_hidden, path.rstrip("/") + "/")
+                % (path, include_hidden, path.rstrip("/") + "/", known_hash)
             )
-            if raw_data is None:
+            if response is None:
+                self._dir_children_cache.pop(cache_key, None)
                 return None
+            elif isinstance(response, int):
+                assert response == known_hash
+                raw_data = known_data
+            else:
+                self._dir_children_cache[cache_key] = response
+                _, raw_data = response
         elif path == "":
             # used to represent all files in micro:bit
             raw_data = self._evaluate(
@@ -1391,6 +1560,79 @@ def parse_api_information(file_path):
     return defs
 
 
+def decode_compact_value(data: bytes):
+    """Decodes a value encoded by __thonny_helper.encode_compact (see COMPACT_VALUE_HELPERS)"""
+    value, pos = _decode_compact_value_at(data, 0)
+    if pos != len(data):
+        raise ValueError("Extra data after compact value")
+    return value
+
+
+def _decode_compact_value_at(data: bytes, pos: int):
+    code = data[pos]
+    pos += 1
+
+    if code < 0x80:
+        return code, pos
+    elif code >= 0xE0:
+        return code - 0x100, pos
+    elif code == 0xC0:
+        return None, pos
+    elif code == 0xC2:
+        return False, pos
+    elif code == 0xC3:
+        return True, pos
+    elif code == 0xD2:
+        return struct.unpack_from(">i", data, pos)[0], pos + 4
+    elif code == 0xD3:
+        return struct.unpack_from(">q", data, pos)[0], pos + 8
+    elif code == 0xCB:
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    elif code == 0xC1:
+        items, pos = _decode_compact_value_at(data, pos)
+        if not isinstance(items, list):
+            raise ValueError("Expected array after tuple marker")
+        return tuple(items), pos
+
+    if 0xA0 <= code <= 0xBF:
+        kind, length = "str", code & 0x1F
+    elif 0x90 <= code <= 0x9F:
+        kind, length = "array", code & 0x0F
+    elif 0x80 <= code <= 0x8F:
+        kind, length = "map", code & 0x0F
+    else:
+        kinds = {0xDA: "str", 0xC5: "bin", 0xDC: "array", 0xDE: "map"}
+        if code in kinds:
+            kind = kinds[code]
+            (length,) = struct.unpack_from(">H", data, pos)
+            pos += 2
+        elif code - 1 in kinds:
+            kind = kinds[code - 1]
+            (length,) = struct.unpack_from(">I", data, pos)
+            pos += 4
+        else:
+            raise ValueError("Unknown compact value code 0x%02X" % code)
+
+    if kind in ("str", "bin"):
+        if pos + length > len(data):
+            raise ValueError("Truncated compact value")
+        chunk = bytes(data[pos : pos + length])
+        pos += length
+        return (chunk.decode("utf-8") if kind == "str" else chunk), pos
+    elif kind == "array":
+        result = []
+        for _ in range(length):
+            item, pos = _decode_compact_value_at(data, pos)
+            result.append(item)
+        return result, pos
+    else:
+        result = {}
+        for _ in range(length):
+            key, pos = _decode_compact_value_at(data, pos)
+            result[key], pos = _decode_compact_value_at(data, pos)
+        return result, pos
+
+
 def unix_dirname_basename(path):
     if path == "/":
         return ("/", "")
@@ -1,5 +1,6 @@
 import binascii
 import datetime
+import hashlib
 import logging
 import os
 import queue
@@ -27,6 +28,9 @@ from thonny.plugins.micropython.backend import (
     ReadOnlyFilesystemError,
     ends_overlap,
     Y2000_EPOCH_OFFSET,
+    MGMT_VALUE_START,
+    MGMT_VALUE_END,
+    COMPACT_VALUE_HELPERS,
     PASTE_MODE_CMD,
     PASTE_MODE_LINE_PREFIX,
     EOT,
@@ -47,6 +51,12 @@ RAW_PASTE_CONFIRMATION = b"R\x01"
 RAW_PASTE_CONTINUE = b"\x01"
 
 BAUDRATE = 115200
+
+# Name of the module for persistent helper (stored into device's working directory)
+PERSISTENT_HELPER_MODULE = "_thonny_helper"
+
+# Block sizes tried when probing how much the device accepts in one write
+PROBE_WRITE_BLOCK_SIZES = [512, 1024, 2048]
 ENCODING = "utf-8"
 
 # Commands
@@ -141,6 +151,22 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
                 self._write_block_delay = 0.5
             else:
                 self._write_block_delay = 0.01
+        self._file_operation_block_size = None
+
+        # Negotiation probes only raw mode, therefore the echo limit of paste mode
+        # keeps the configured (or default) size, see _submit_code_via_paste_mode
+        self._paste_echo_block_size = self._write_block_size
+
+        # Link parameters are negotiated (or taken from the cache of the front-end)
+        # only when block size and delay are not configured explicitly.
+        self._link_params = None
+        self._should_negotiate_link_params = (
+            args.get("write_block_size", None) is None
+            and args.get("write_block_delay", None) is None
+        )
+        if self._should_negotiate_link_params and args.get("link_params"):
+            self._apply_link_params(args["link_params"])
+            self._should_negotiate_link_params = False
 
         self._submit_mode = args.get("submit_mode", None)
         logger.debug(
@@ -161,12 +187,66 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
 
         self._prepare_after_soft_reboot(False)
 
+    def _prepare_helpers(self, script):
+        if not self._args.get("persistent_helper"):
+            super()._prepare_helpers(script)
+            return
+
+        version_hash = hashlib.sha1(script.encode(ENCODING)).hexdigest()[:16]
+        if self._import_persistent_helper(version_hash):
+            logger.info("Using persistent helper %s", version_hash)
+            return
+
+        super()._prepare_helpers(script)
+        try:
+            self._install_persistent_helper(script, version_hash)
+        except ManagementError:
+            # eg. read-only filesystem. Next time will be tried again
+            logger.warning("Could not install persistent helper", exc_info=True)
+
+    def _import_persistent_helper(self, version_hash):
+        """Imports __thonny_helper from the helper module on the device
+        if it is present and has the same version as the current source"""
+        return self._evaluate(
+            dedent(
+                """
+            try:
+                from {module} import __thonny_helper
+                if getattr(__thonny_helper, "version_hash", None) != {version_hash!r}:
+                    del __thonny_helper
+                    raise ImportError()
+                __thonny_helper.print_mgmt_value(True)
+            except Exception:
+                print({mgmt_start!r}, repr(False), {mgmt_end!r}, sep='', end='')
+        """
+            ).format(
+                module=PERSISTENT_HELPER_MODULE,
+                version_hash=version_hash,
+                mgmt_start=MGMT_VALUE_START.decode(ENCODING),
+                mgmt_end=MGMT_VALUE_END.decode(ENCODING),
+            )
+        )
+
+    def _install_persistent_helper(self, script, version_hash):
+        # Helper gets stored as source, because .mpy format depends on the firmware version.
+        # It still saves the time for transferring it after each soft reboot.
+        source = script + "\n__thonny_helper.version_hash = %r\n" % version_hash
+        self._execute_without_output(
+            "__thonny_fp = open(%r, 'w')" % (PERSISTENT_HELPER_MODULE + ".py")
+        )
+        block_size = 512
+        for i in range(0, len(source), block_size):
+            self._execute_without_output("__thonny_fp.write(%r)\n" % source[i : i + block_size])
+        self._execute_without_output("__thonny_fp.close()\ndel __thonny_fp")
+        logger.info("Installed persistent helper %s", version_hash)
+
     def _get_custom_helpers(self):
         if self._connected_to_microbit():
             return ""
 
-        return dedent(
-            """
+        return (
+            dedent(
+                """
             @classmethod
             def getcwd(cls):
                 if hasattr(cls, "getcwd"):
@@ -182,9 +262,38 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
             @classmethod
             def rmdir(cls, x):
                 return cls.os.rmdir(x)
+            
+            # for fetching only changed globals
+            globals_version = 0
+            globals_fingerprints = {}
+            
+            @classmethod
+            def get_globals_diff(cls, known_version, globs):
+                is_diff = known_version == cls.globals_version
+                if not is_diff:
+                    cls.globals_fingerprints = {}
+                changed = {}
+                fingerprints = {}
+                for name in globs:
+                    if not name.startswith("__"):
+                        value = globs[name]
+                        value_repr = cls.repr(value)
+                        fingerprint = (hash(value_repr), id(value))
+                        fingerprints[name] = fingerprint
+                        if cls.globals_fingerprints.get(name) != fingerprint:
+                            changed[name] = (value_repr, id(value))
+                removed = [name for name in cls.globals_fingerprints if name not in fingerprints]
+                cls.globals_fingerprints = fingerprints
+                cls.globals_version += 1
+                return (cls.globals_version, is_diff, changed, removed)
         """
+            )
+            + COMPACT_VALUE_HELPERS
         )
 
+    def _supports_incremental_globals(self):
+        return not self._connected_to_microbit()
+
     def _process_until_initial_prompt(self, clean):
         logger.debug("_process_until_initial_prompt, clean=%s", clean)
         if clean:
@@ -200,6 +309,9 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
         if self._submit_mode is None:
             self._choose_submit_mode()
 
+        if self._should_negotiate_link_params:
+            self._negotiate_link_params()
+
     def _choose_submit_mode(self):
         # at least sometimes, we end up at normal prompt, although we asked for raw prompt
         self._ensure_raw_mode()
@@ -216,6 +328,84 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
 
         discarding += self._connection.read_all()
 
+    def _negotiate_link_params(self):
+        link_type = self._connection.get_link_type()
+        logger.info("Negotiating link parameters for link type %s", link_type)
+        if link_type not in ["usb_cdc", "uart"]:
+            # WebREPL and unknown links keep the conservative defaults
+            return
+
+        if link_type == "usb_cdc":
+            # USB has its own flow control and the baudrate doesn't matter
+            write_block_delay = 0.0
+        else:
+            write_block_delay = self._write_block_delay
+
+        write_block_size = self._probe_write_block_size(write_block_delay)
+
+        if link_type == "usb_cdc" and write_block_size >= PROBE_WRITE_BLOCK_SIZES[-1]:
+            file_block_size = 4096
+        else:
+            file_block_size = 1024
+
+        self._apply_link_params(
+            {
+                "link_type": link_type,
+                "write_block_size": write_block_size,
+                "write_block_delay": write_block_delay,
+                "file_block_size": file_block_size,
+            }
+        )
+        self._report_time("negotiated link params")
+
+    def _probe_write_block_size(self, write_block_delay):
+        """Returns the largest probed block size which the device's raw REPL accepts
+        in one write without losing bytes (paste mode keeps its own echo limit)"""
+        original_params = (self._submit_mode, self._write_block_size, self._write_block_delay)
+        result = self._write_block_size
+        # bytes of the script surrounding the payload + EOT
+        overhead = len("print(len(''))") + 1
+
+        try:
+            for size in PROBE_WRITE_BLOCK_SIZES:
+                payload_length = size - overhead
+                script = "print(len(%r))" % ("x" * payload_length)
+                self._submit_mode = RAW_SUBMIT_MODE
+                self._write_block_size = size
+                self._write_block_delay = write_block_delay
+                try:
+                    out, err = self._execute(script, capture_output=True)
+                except (AssertionError, TimeoutError):
+                    logger.info("Block size %s failed with an error", size, exc_info=True)
+                    self._interrupt_to_raw_prompt()
+                    break
+
+                if err or out.strip() != str(payload_length):
+                    logger.info("Block size %s failed, got %r, %r", size, out, err)
+                    break
+
+                result = size
+        finally:
+            self._submit_mode, self._write_block_size, self._write_block_delay = original_params
+
+        logger.info("Probed write block size: %s", result)
+        return result
+
+    def _apply_link_params(self, params):
+        logger.debug("Applying link params %r", params)
+        self._link_params = params
+        self._write_block_size = params["write_block_size"]
+        self._write_block_delay = params["write_block_delay"]
+        self._file_operation_block_size = params["file_block_size"]
+
+    def _send_ready_message(self):
+        logger.info("Connect-to-ready time: %.3f s", time.time() - self._startup_time)
+        self.send_message(
+            ToplevelResponse(
+                cwd=self._cwd, welcome_text=self._welcome_text, link_params=self._link_params
+            )
+        )
+
     def _fetch_welcome_text(self) -> str:
         self._write(NORMAL_MODE_CMD)
         out, err = self._capture_output_until_active_prompt()
@@ -540,7 +730,7 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
         The echo of a written block must be read before next block is written.
         Safe USB block size is 64 bytes (may be larger for some devices),
         but we need to account for b"=== " added by the paste mode in the echo, so each block is sized such that
-        its echo doesn't exceed self._write_block_size (some devices may have problem with outputs bigger than that).
+        its echo doesn't exceed self._paste_echo_block_size (some devices may have problem with outputs bigger than that).
         (OK, most likely the reading thread will eliminate the problem with output buffer, but just in case...)
         """
         assert script
@@ -566,14 +756,14 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
 
         # Send script
         while script_bytes:
-            block = script_bytes[: self._write_block_size]
-            script_bytes = script_bytes[self._write_block_size :]
+            block = script_bytes[: self._paste_echo_block_size]
+            script_bytes = script_bytes[self._paste_echo_block_size :]
 
             # find proper block boundary
             while True:
                 expected_echo = block.replace(b"\r\n", b"\r\n" + PASTE_MODE_LINE_PREFIX)
                 if (
-                    len(expected_echo) > self._write_block_size
+                    len(expected_echo) > self._paste_echo_block_size
                     or block.endswith(b"\r")
                     or len(block) > 2
                     and starts_with_continuation_byte(script_bytes)
@@ -1521,6 +1711,8 @@ class BareMetalMicroPythonBackend(MicroPythonBackend, UploadDownloadMixin):
         # bytes literal
         if self._connected_to_microbit():
             return 512
+        elif self._file_operation_block_size is not None:
+            return self._file_operation_block_size
         else:
             return 1024
 
@@ -1557,7 +1749,7 @@ if __name__ == "__main__":
             )
 
             connection = SerialConnection(
-                args["port"], BAUDRATE, dtr=args.get("dtr"), rts=args.get("rts")
+                args["port"], args.get("baudrate") or BAUDRATE, dtr=args.get("dtr"), rts=args.get("rts")
             )
             # connection = DifficultSerialConnection(args["port"], BAUDRATE)
 
@@ -170,6 +170,12 @@ class MicroPythonConnection:
     def reset_output_buffer(self):
         pass
 
+    def get_link_type(self):
+        """Returns "usb_cdc", "uart", "webrepl" or None (unknown).
+
+        Used for choosing the block sizes and delays of the communication."""
+        return None
+
     def set_unicode_guard(self, value):
         self.unicode_guard = value
 
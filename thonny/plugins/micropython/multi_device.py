@@ -0,0 +1,312 @@
+"""
+Runs same task (script, upload or directory sync) on several bare metal MicroPython devices
+at once, eg. for bench tests or provisioning boards in a classroom.
+
+Meant to be used without Thonny's front-end or back-end:
+
+    python -m thonny.plugins.micropython.multi_device --ports auto run script.py
+    python -m thonny.plugins.micropython.multi_device --ports COM3,COM4 upload main.py /main.py
+    python -m thonny.plugins.micropython.multi_device --ports auto sync project_dir /
+"""
+import argparse
+import logging
+import os.path
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from thonny.common import Record
+from thonny.plugins.micropython.backend import EOT
+from thonny.plugins.micropython.bare_metal_backend import (
+    BAUDRATE,
+    ENCODING,
+    FIRST_RAW_PROMPT,
+    INTERRUPT_CMD,
+    NORMAL_MODE_CMD,
+    OK,
+    RAW_MODE_CMD,
+    RAW_PROMPT,
+    W600_FIRST_RAW_PROMPT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Generic MicroPython board, see http://pid.codes/org/MicroPython/
+MICROPYTHON_USB_VIDS_PIDS = {(0x1209, 0xADDA)}
+
+WRITE_BLOCK_SIZE = 255
+WRITE_BLOCK_DELAY = 0.01
+FILE_BLOCK_SIZE = 512
+
+# user scripts may run much longer than management commands
+SCRIPT_TIMEOUT = 60 * 60
+
+
+class DeviceError(RuntimeError):
+    pass
+
+
+class DeviceResult(Record):
+    """Outcome of a task on one device. Has attributes port, ok, value, error and duration"""
+
+
+class DeviceSession:
+    """Minimal raw REPL client over a MicroPythonConnection.
+
+    Unlike BareMetalMicroPythonBackend it doesn't talk to Thonny's front-end and
+    doesn't need the helper, which keeps the sessions independent of each other."""
+
+    def __init__(self, port, connection, timeout=10):
+        self.port = port
+        self._connection = connection
+        self._timeout = timeout
+
+    def enter_raw_repl(self) -> None:
+        self._connection.write(b"\r" + INTERRUPT_CMD + INTERRUPT_CMD)
+        time.sleep(0.1)
+        self._connection.read_all()
+        self._connection.write(RAW_MODE_CMD)
+        self._connection.read_until(
+            re.escape(FIRST_RAW_PROMPT) + b"|" + re.escape(W600_FIRST_RAW_PROMPT),
+            timeout=self._timeout,
+        )
+
+    def exit_raw_repl(self) -> None:
+        self._connection.write(NORMAL_MODE_CMD)
+
+    def execute(self, script: str, timeout: Optional[float] = None) -> Tuple[str, str]:
+        """Executes the script in raw mode and returns its stdout and stderr"""
+        if timeout is None:
+            timeout = self._timeout
+
+        data = script.encode(ENCODING) + EOT
+        while data:
+            self._connection.write(data[:WRITE_BLOCK_SIZE])
+            data = data[WRITE_BLOCK_SIZE:]
+            if data:
+                time.sleep(WRITE_BLOCK_DELAY)
+
+        confirmation = self._connection.read(2, timeout=timeout)
+        if confirmation != OK:
+            raise DeviceError("Could not read command confirmation, got %r" % confirmation)
+
+        out = self._connection.read_until(EOT, timeout=timeout)[:-1]
+        err = self._connection.read_until(EOT, timeout=timeout)[:-1]
+        self._connection.read_until(RAW_PROMPT, timeout=timeout)
+        return (
+            out.decode(ENCODING, errors="replace").replace("\r\n", "\n"),
+            err.decode(ENCODING, errors="replace").replace("\r\n", "\n"),
+        )
+
+    def execute_without_output(self, script: str) -> None:
+        out, err = self.execute(script)
+        if out or err:
+            raise DeviceError("Unexpected output from %r:\n%s%s" % (script, out, err))
+
+    def write_file(self, local_path: str, remote_path: str) -> int:
+        self.execute_without_output("__thonny_fp = open(%r, 'wb')" % remote_path)
+        size = 0
+        with open(local_path, "rb") as fp:
+            while True:
+                block = fp.read(FILE_BLOCK_SIZE)
+                if not block:
+                    break
+                self.execute_without_output("__thonny_fp.write(%r)" % block)
+                size += len(block)
+        self.execute_without_output("__thonny_fp.close()\ndel __thonny_fp")
+        return size
+
+    def makedirs(self, remote_path: str) -> None:
+        parts = [part for part in remote_path.split("/") if part]
+        for i in range(len(parts)):
+            path = "/" + "/".join(parts[: i + 1])
+            self.execute_without_output(
+                "try:\n    import os\n    os.mkdir(%r)\nexcept OSError:\n    pass" % path
+            )
+
+    def close(self) -> None:
+        try:
+            self.exit_raw_repl()
+        finally:
+            self._connection.close()
+
+
+class MultiDeviceManager:
+    """Keeps a session to each given port (each connection has its own reader thread)
+    and runs tasks on all of them in parallel"""
+
+    def __init__(
+        self,
+        ports: List[str],
+        baudrate: int = BAUDRATE,
+        connection_factory: Optional[Callable] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self._ports = ports
+        self._baudrate = baudrate
+        self._connection_factory = connection_factory or self._create_serial_connection
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(len(ports), 1))
+        self.sessions = {}  # type: Dict[str, DeviceSession]
+
+    def _create_serial_connection(self, port):
+        from thonny.plugins.micropython.serial_connection import SerialConnection
+
+        return SerialConnection(port, self._baudrate)
+
+    def open(self) -> Dict[str, DeviceResult]:
+        def open_session(port):
+            session = DeviceSession(port, self._connection_factory(port))
+            try:
+                session.enter_raw_repl()
+            except Exception:
+                session.close()
+                raise
+            self.sessions[port] = session
+
+        return self._run_for_ports(self._ports, open_session)
+
+    def run_on_all(self, task: Callable[..., object], *args) -> Dict[str, DeviceResult]:
+        """Calls task(session, *args) for each open session in parallel"""
+        return self._run_for_ports(
+            list(self.sessions), lambda port: task(self.sessions[port], *args)
+        )
+
+    def _run_for_ports(self, ports, func) -> Dict[str, DeviceResult]:
+        def timed(port):
+            start_time = time.time()
+            try:
+                value = func(port)
+                return DeviceResult(
+                    port=port, ok=True, value=value, error=None, duration=time.time() - start_time
+                )
+            except Exception as e:
+                logger.info("Task failed on %s", port, exc_info=True)
+                return DeviceResult(
+                    port=port, ok=False, value=None, error=str(e), duration=time.time() - start_time
+                )
+
+        futures = {port: self._executor.submit(timed, port) for port in ports}
+        return {port: futures[port].result() for port in ports}
+
+    def close(self) -> None:
+        for session in self.sessions.values():
+            try:
+                session.close()
+            except Exception:
+                logger.exception("Could not close %s", session.port)
+        self.sessions = {}
+        self._executor.shutdown()
+
+
+def run_script(session: DeviceSession, source: str, timeout: float = SCRIPT_TIMEOUT) -> str:
+    out, err = session.execute(source, timeout=timeout)
+    if err:
+        raise DeviceError(err.strip())
+    return out
+
+
+def upload_file(session: DeviceSession, local_path: str, remote_path: str) -> int:
+    return session.write_file(local_path, remote_path)
+
+
+def sync_dir(session: DeviceSession, local_dir: str, remote_dir: str) -> int:
+    """Uploads all files under local_dir. Returns the number of bytes written"""
+    total = 0
+    remote_dir = remote_dir.rstrip("/")
+    for dirpath, dirnames, filenames in os.walk(local_dir):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        rel_dir = os.path.relpath(dirpath, local_dir).replace(os.sep, "/")
+        target_dir = remote_dir if rel_dir == "." else remote_dir + "/" + rel_dir
+        if target_dir:
+            session.makedirs(target_dir)
+        for name in filenames:
+            total += session.write_file(os.path.join(dirpath, name), target_dir + "/" + name)
+    return total
+
+
+def is_micropython_port(port_info) -> bool:
+    """Tells whether a port (as given by serial.tools.list_ports) surely belongs to a
+    MicroPython device. Generic USB-serial adapters are not accepted, as the device
+    behind them may be something else (tasks interrupt whatever runs on the device)."""
+    return (
+        getattr(port_info, "manufacturer", None) == "MicroPython"
+        or (port_info.vid, port_info.pid) in MICROPYTHON_USB_VIDS_PIDS
+    )
+
+
+def detect_ports() -> List[str]:
+    from serial.tools.list_ports import comports
+
+    return [p.device for p in comports() if is_micropython_port(p)]
+
+
+def format_results(results: Dict[str, DeviceResult]) -> str:
+    lines = []
+    for port, result in results.items():
+        if result.ok:
+            status = "OK"
+            details = "" if result.value is None else str(result.value).strip()
+        else:
+            status = "FAILED"
+            details = result.error
+        lines.append("%s: %s (%.2f s)" % (port, status, result.duration))
+        if details:
+            lines.append("    " + details.replace("\n", "\n    "))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m thonny.plugins.micropython.multi_device",
+        description="Run a task on several MicroPython devices in parallel",
+    )
+    parser.add_argument(
+        "--ports",
+        default="auto",
+        help="comma-separated serial ports or 'auto' (only ports identified as MicroPython devices)",
+    )
+    parser.add_argument("--baudrate", type=int, default=BAUDRATE)
+    subparsers = parser.add_subparsers(dest="task")
+    subparsers.required = True
+    run_parser = subparsers.add_parser("run", help="execute a local script on the devices")
+    run_parser.add_argument("script")
+    upload_parser = subparsers.add_parser("upload", help="copy a file to the devices")
+    upload_parser.add_argument("source")
+    upload_parser.add_argument("target")
+    sync_parser = subparsers.add_parser("sync", help="copy a directory tree to the devices")
+    sync_parser.add_argument("source")
+    sync_parser.add_argument("target")
+    args = parser.parse_args(argv)
+
+    ports = detect_ports() if args.ports == "auto" else args.ports.split(",")
+    if not ports:
+        print("No devices found", file=sys.stderr)
+        return 1
+
+    manager = MultiDeviceManager(ports, args.baudrate)
+    try:
+        open_results = manager.open()
+        failed = {port: res for port, res in open_results.items() if not res.ok}
+        if failed:
+            print("Could not connect:\n" + format_results(failed), file=sys.stderr)
+
+        if args.task == "run":
+            with open(args.script, encoding="utf-8") as fp:
+                source = fp.read()
+            results = manager.run_on_all(run_script, source)
+        elif args.task == "upload":
+            results = manager.run_on_all(upload_file, args.source, args.target)
+        else:
+            results = manager.run_on_all(sync_dir, args.source, args.target)
+
+        print(format_results(results))
+        return 0 if not failed and all(res.ok for res in results.values()) else 1
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -11,6 +11,11 @@ from thonny.plugins.micropython.connection import MicroPythonConnection
 
 logger = logging.getLogger(__name__)
 
+# Vendors of common USB-UART bridge chips (FTDI, Silicon Labs, WCH, Prolific).
+# Devices behind these bridges are limited by the baudrate and have no flow control,
+# other USB devices are assumed to provide native USB-CDC connection.
+UART_BRIDGE_VIDS = {0x0403, 0x10C4, 0x1A86, 0x067B}
+
 
 class SerialConnection(MicroPythonConnection):
     def __init__(self, port, baudrate, dtr=None, rts=None, skip_reader=False):
@@ -34,6 +39,7 @@ class SerialConnection(MicroPythonConnection):
                 logger.debug("Setting RTS to %s", rts)
                 self._serial.rts = rts
 
+            self._port = port
             self._serial.port = port
             logger.debug("Opening serial port %s", port)
             self._serial.open()
@@ -70,6 +76,18 @@ class SerialConnection(MicroPythonConnection):
             self._reading_thread = threading.Thread(target=self._listen_serial, daemon=True)
             self._reading_thread.start()
 
+    def get_link_type(self):
+        from serial.tools.list_ports import comports
+
+        for info in comports():
+            if info.device == self._port:
+                if info.vid is None or info.vid in UART_BRIDGE_VIDS:
+                    return "uart"
+                else:
+                    return "usb_cdc"
+
+        return None
+
     def write(self, data):
         size = self._serial.write(data)
         # print(data.decode(), end="")
@@ -46,6 +46,9 @@ class WebReplConnection(MicroPythonConnection):
         if res != "OK":
             raise res
 
+    def get_link_type(self):
+        return "webrepl"
+
     def _wrap_ws_main(self):
         import asyncio
 
@@ -5,6 +5,8 @@ from thonny import get_runner
 from thonny.assistance import ProgramAnalyzer, add_program_analyzer
 from thonny.common import is_same_path
 
+# site directory -> (its mtime, names of the modules in it)
+_site_module_names = {}
 known_stdlib_modules = {
     # Compiled from https://docs.python.org/3.7/py-modindex.html
     "__future__",
@@ -268,29 +270,37 @@ class ProgramNamingAnalyzer(ProgramAnalyzer):
         from thonny.plugins.cpython import CPythonProxy
 
         if not isinstance(proxy, CPythonProxy):
-            return []
+            return set()
 
         try:
             sys_path = proxy.get_sys_path()
         except Exception:
             logging.exception("Can't get sys path from proxy")
-            return []
+            return set()
 
         module_names = set()
         for item in sys_path:
             if os.path.isdir(item) and ("site-packages" in item or "dist-packages" in item):
                 module_names.update(self._get_module_names(item))
-                for name in os.listdir(item):
-                    if "-" not in name:
-                        module_names.add(name.replace(".py", ""))
 
         return module_names
 
     def _get_module_names(self, dir_path):
+        # installing or removing a package changes the mtime of the directory
+        try:
+            mtime = os.stat(dir_path).st_mtime
+        except OSError:
+            return set()
+
+        cached = _site_module_names.get(dir_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
         result = set()
         for name in os.listdir(dir_path):
             if "-" not in name:
                 result.add(name.replace(".py", ""))
+        _site_module_names[dir_path] = (mtime, result)
         return result
 
 
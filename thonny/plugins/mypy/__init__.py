@@ -1,36 +1,35 @@
 import logging
 import os.path
 import re
-import subprocess
 import sys
 from typing import Iterable
 
-from thonny import get_runner, get_workbench, ui_utils
-from thonny.assistance import SubprocessProgramAnalyzer, add_program_analyzer
-from thonny.running import get_interpreter_for_subprocess
+from thonny import get_runner, get_workbench
+from thonny.assistance import ServerProgramAnalyzer, add_program_analyzer
 
 logger = logging.getLogger(__name__)
 
 
-class MyPyAnalyzer(SubprocessProgramAnalyzer):
+class MyPyAnalyzer(ServerProgramAnalyzer):
     def is_enabled(self):
         return get_workbench().get_option("assistance.use_mypy")
 
-    def start_analysis(self, main_file_path, imported_file_paths: Iterable[str]) -> None:
+    def get_tool_name(self):
+        return "mypy"
 
+    def start_analysis(self, main_file_path, imported_file_paths: Iterable[str]) -> None:
         self.interesting_files = [main_file_path] + list(imported_file_paths)
+        super().start_analysis(main_file_path, self.interesting_files[1:])
 
+    def get_tool_args(self, main_file_path, imported_file_paths):
+        # the files get appended by the analysis server
         args = [
-            get_interpreter_for_subprocess(),
-            "-m",
-            "mypy",
             "--ignore-missing-imports",
             "--check-untyped-defs",
             "--warn-redundant-casts",
             "--warn-unused-ignores",
             "--show-column-numbers",
-            main_file_path,
-        ] + list(imported_file_paths)
+        ]
 
         # TODO: ignore "... need type annotation" messages
 
@@ -42,40 +41,34 @@ class MyPyAnalyzer(SubprocessProgramAnalyzer):
             ver = (0, 470)  # minimum required version
 
         if ver >= (0, 520):
-            args.insert(3, "--no-implicit-optional")
+            args.insert(0, "--no-implicit-optional")
 
         if ver >= (0, 590):
-            args.insert(3, "--python-executable")
-            args.insert(4, get_runner().get_local_executable())
+            args.insert(0, "--python-executable")
+            args.insert(1, get_runner().get_local_executable())
 
         if ver >= (0, 730):
-            args.insert(3, "--warn-unreachable")
-            args.insert(3, "--allow-redefinition")
-            args.insert(3, "--strict-equality")
-            args.insert(3, "--no-color-output")
-            args.insert(3, "--no-error-summary")
+            args.insert(0, "--warn-unreachable")
+            args.insert(0, "--allow-redefinition")
+            args.insert(0, "--strict-equality")
+            args.insert(0, "--no-color-output")
+            args.insert(0, "--no-error-summary")
+
+        return args
 
-        env = os.environ.copy()
+    def get_server_env(self):
+        env = super().get_server_env()
         env["MYPYPATH"] = os.path.join(os.path.dirname(__file__), "typeshed_extras")
+        return env
 
-        self._proc = ui_utils.popen_with_ui_thread_callback(
-            args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            env=env,
-            on_completion=self._parse_and_output_warnings,
-            # Specify a cwd which is not ancestor of user files.
-            # This gives absolute filenames in the output.
-            # Note that mypy doesn't accept when cwd is sys.prefix
-            # or dirname(sys.executable)
-            cwd=os.path.dirname(__file__),
-        )
-
-    def _parse_and_output_warnings(self, pylint_proc, out_lines, err_lines):
-        if err_lines:
-            logger.warning("MyPy: " + "".join(err_lines))
+    def get_server_cwd(self):
+        # Specify a cwd which is not ancestor of user files.
+        # This gives absolute filenames in the output.
+        # Note that mypy doesn't accept when cwd is sys.prefix
+        # or dirname(sys.executable)
+        return os.path.dirname(__file__)
 
+    def parse_output_lines(self, out_lines):
         warnings = []
         for line in out_lines:
             m = re.match(r"(.*?):(\d+)(:(\d+))?:(.*?):(.*)", line.strip())
@@ -106,7 +99,7 @@ class MyPyAnalyzer(SubprocessProgramAnalyzer):
             else:
                 logging.error("Can't parse MyPy line: " + line.strip())
 
-        self.completion_handler(self, warnings)
+        return warnings
 
 
 def load_plugin():
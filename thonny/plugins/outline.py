@@ -3,10 +3,38 @@ import tkinter as tk
 from tkinter import ttk
 
 from thonny import get_workbench
+from thonny.document_model import get_document_model, register_analysis
 from thonny.languages import tr
 from thonny.ui_utils import SafeScrollbar
 
 
+def _parse_outline(model):
+    source = model.get_source()
+    # all nodes in format (parent, node_indent, node_children, name, type, linenumber)
+    root_node = (None, 0, [], None, None, None)  # name, type and linenumber not needed for root
+    active_node = root_node
+
+    lineno = 0
+    for line in source.split("\n"):
+        lineno += 1
+        m = re.match(r"[ ]*[\w]{1}", line)
+        if m:
+            indent = len(m.group(0))
+            while indent <= active_node[1]:
+                active_node = active_node[0]
+
+            t = re.match(r"[ ]*(?P<type>(def|class){1})[ ]+(?P<name>[\w]+)", line)
+            if t:
+                current = (active_node, indent, [], t.group("name"), t.group("type"), lineno)
+                active_node[2].append(current)
+                active_node = current
+
+    return root_node
+
+
+register_analysis("outline", _parse_outline)
+
+
 class OutlineView(ttk.Frame):
     def __init__(self, master):
         ttk.Frame.__init__(self, master)
@@ -70,32 +98,10 @@ class OutlineView(ttk.Frame):
         if editor is None:
             return
 
-        root = self._parse_source(editor.get_code_view().get_content())
+        root = get_document_model(editor.get_text_widget()).get("outline")
         for child in root[2]:
             self._add_item_to_tree("", child)
 
-    def _parse_source(self, source):
-        # all nodes in format (parent, node_indent, node_children, name, type, linenumber)
-        root_node = (None, 0, [], None, None, None)  # name, type and linenumber not needed for root
-        active_node = root_node
-
-        lineno = 0
-        for line in source.split("\n"):
-            lineno += 1
-            m = re.match(r"[ ]*[\w]{1}", line)
-            if m:
-                indent = len(m.group(0))
-                while indent <= active_node[1]:
-                    active_node = active_node[0]
-
-                t = re.match(r"[ ]*(?P<type>(def|class){1})[ ]+(?P<name>[\w]+)", line)
-                if t:
-                    current = (active_node, indent, [], t.group("name"), t.group("type"), lineno)
-                    active_node[2].append(current)
-                    active_node = current
-
-        return root_node
-
     # adds a single item to the tree, recursively calls itself to add any child nodes
     def _add_item_to_tree(self, parent, item):
         # create the text to be played for this item
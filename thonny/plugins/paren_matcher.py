@@ -96,6 +96,7 @@ class ParenMatcher:
 
     def _highlight(self, start_index, end_index):
         stack = []
+        batch = self.text.tag_batch()
 
         cursor_row, cursor_col = map(int, self.text.index("insert").split("."))
 
@@ -105,13 +106,13 @@ class ParenMatcher:
             elif not stack:
                 # stack is empty, ie. found a closer without opener
                 close_index = "%d.%d" % (t.start[0], t.end[1])
-                self.text.tag_add("unclosed_expression", start_index, close_index)
+                batch.add("unclosed_expression", start_index, close_index)
                 break
             elif stack[-1].string != _OPENERS[t.string]:
                 # incorrect closure
                 opener = stack[-1]
                 open_index = "%d.%d" % opener.start
-                self.text.tag_add("unclosed_expression", open_index, end_index)
+                batch.add("unclosed_expression", open_index, end_index)
                 break
             else:
                 # found a pair
@@ -125,8 +126,8 @@ class ParenMatcher:
                     or cursor_row == closer.start[0]
                     and cursor_col == closer.end[1]
                 ):
-                    self.text.tag_add("surrounding_parens", "%d.%d" % closer.start)
-                    self.text.tag_add("surrounding_parens", "%d.%d" % opener.start)
+                    batch.add("surrounding_parens", "%d.%d" % closer.start)
+                    batch.add("surrounding_parens", "%d.%d" % opener.start)
 
                 stack.pop()
 
@@ -134,7 +135,9 @@ class ParenMatcher:
             # something was left without closure
             opener = stack[-1]
             open_index = "%d.%d" % opener.start
-            self.text.tag_add("unclosed_expression", open_index, end_index)
+            batch.add("unclosed_expression", open_index, end_index)
+
+        batch.flush()
 
     def _get_paren_tokens(self, start_index, end_index):
         import tokenize
@@ -198,8 +201,9 @@ def update_highlighting_full(event):
 
 
 def clear_highlighting(text):
-    text.tag_remove("surrounding_parens", "0.1", "end")
-    text.tag_remove("unclosed_expression", "0.1", "end")
+    with text.tag_batch() as batch:
+        batch.remove("surrounding_parens", "0.1", "end")
+        batch.remove("unclosed_expression", "0.1", "end")
 
 
 _last_move_time = 0
@@ -1,20 +1,21 @@
 import ast
 import logging
-import subprocess
 
-from thonny import get_workbench, ui_utils
-from thonny.assistance import SubprocessProgramAnalyzer, add_program_analyzer
+from thonny import get_workbench
+from thonny.assistance import ServerProgramAnalyzer, add_program_analyzer
 from thonny.plugins.pylint.messages import checks_by_id
-from thonny.running import get_interpreter_for_subprocess
 
 logger = logging.getLogger(__name__)
 
 
-class PylintAnalyzer(SubprocessProgramAnalyzer):
+class PylintAnalyzer(ServerProgramAnalyzer):
     def is_enabled(self):
         return get_workbench().get_option("assistance.use_pylint")
 
-    def start_analysis(self, main_file_path, imported_file_paths):
+    def get_tool_name(self):
+        return "pylint"
+
+    def get_tool_args(self, main_file_path, imported_file_paths):
         relevant_symbols = {
             checks_by_id[key]["msg_sym"]
             for key in checks_by_id
@@ -33,6 +34,7 @@ class PylintAnalyzer(SubprocessProgramAnalyzer):
 
         ignored_modules = {"turtle"}  # has dynamically generated attributes
 
+        # the files get analyzed one by one by the analysis server
         options = [
             # "--rcfile=None", # TODO: make it ignore any rcfiles that can be somewhere
             "--persistent=n",
@@ -44,6 +46,7 @@ class PylintAnalyzer(SubprocessProgramAnalyzer):
             "--max-line-length=120",
             "--output-format=text",
             "--reports=n",
+            "--score=n",
             "--msg-template={{'filename':{abspath!r}, 'lineno':{line}, 'col_offset':{column}, 'symbol':{symbol!r}, 'msg':{msg!r}, 'msg_id':{msg_id!r}, 'category' : {C!r} }}",
         ]
 
@@ -57,29 +60,9 @@ class PylintAnalyzer(SubprocessProgramAnalyzer):
             options.append("--allow-global-unused-variables=no")
         """
 
-        self._proc = ui_utils.popen_with_ui_thread_callback(
-            [get_interpreter_for_subprocess(), "-m", "pylint"]
-            + options
-            + [main_file_path]
-            + list(imported_file_paths),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            on_completion=self._parse_and_output_warnings,
-        )
-
-    def _parse_and_output_warnings(self, pylint_proc, out_lines, err_lines):
-        # print("COMPL", out, err)
-        # get rid of non-error
-        err = (
-            "".join(err_lines)
-            .replace("No config file found, using default configuration", "")
-            .strip()
-        )
-
-        if err:
-            logger.error("Pylint: " + err)
+        return options
 
+    def parse_output_lines(self, out_lines):
         warnings = []
         for line in out_lines:
             if line.startswith("{"):
@@ -121,7 +104,7 @@ class PylintAnalyzer(SubprocessProgramAnalyzer):
                     # atts["more_info_url"] = "http://pylint-messages.wikidot.com/messages:%s" % atts["msg_id"].lower()
                     warnings.append(atts)
 
-        self.completion_handler(self, warnings)
+        return warnings
 
 
 def load_plugin():
@@ -1,15 +1,20 @@
 import ast
 import os.path
 import tkinter as tk
-from datetime import datetime
 from tkinter import ttk
 
 from thonny import THONNY_USER_DIR, codeview, get_workbench, ui_utils
 from thonny.base_file_browser import BaseLocalFileBrowser
 from thonny.languages import tr
 from thonny.plugins.coloring import SyntaxColorer
+from thonny.replay import EventLogIndex, is_shell_event
 from thonny.ui_utils import CommonDialog, lookup_style_option
 
+# Number of log rows present in the tree at once (the window moves when scrolling)
+PAGE_SIZE = 300
+# After how many replayed events the state of the editors and shell gets stored
+KEYFRAME_INTERVAL = 500
+
 
 class ReplayWindow(CommonDialog):
     def __init__(self, master):
@@ -87,63 +92,119 @@ class ControlFrame(ttk.Frame):
 
 
 class LogFrame(ui_utils.TreeFrame):
+    """Shows a window of PAGE_SIZE events of the log, which moves when the tree is scrolled
+    (the scrollbar represents the whole log)"""
+
     def __init__(self, master, editor_book, shell, details_frame):
         ui_utils.TreeFrame.__init__(self, master, ("desc", "pause"))
 
         self.tree.heading("desc", text="Event", anchor=tk.W)
         self.tree.heading("pause", text="Pause (sec)", anchor=tk.W)
+        self.tree["yscrollcommand"] = self._on_tree_scroll
+        self.vert_scrollbar["command"] = self._on_scrollbar_command
 
         self.configure(border=1, relief=tk.GROOVE)
 
         self.editor_notebook = editor_book
         self.shell = shell
         self.details_frame = details_frame
-        self.all_events = []
+        self.index = None
         self.last_event_index = -1
         self.loading = False
+        self._first_row = 0
+        self._row_count = 0
+        self._window_update_scheduled = False
+        # number of replayed events -> state of the editors and shell after these
+        self._keyframes = {}
 
     def load_log(self, filename):
         self._clear_tree()
         self.details_frame._clear_tree()
-        self.all_events = []
-        self.last_event_index = -1
+        if self.index is not None:
+            self.index.close()
+        self.index = EventLogIndex(filename)
+        self._keyframes = {}
+        self.reset()
+        self._fill_rows(0)
+
+    def _fill_rows(self, first_row):
         self.loading = True
-        self.editor_notebook.reset()
-        self.shell.reset()
-
-        import json
-
-        with open(filename, encoding="UTF-8") as f:
-            events = json.load(f)
-            last_event_time = None
-            for event in events:
-                node_id = self.tree.insert("", "end")
-                self.tree.set(node_id, "desc", event["sequence"])
-                if len(event["time"]) == 19:
-                    # 0 fraction may have been skipped
-                    event["time"] += ".0"
-                event_time = datetime.strptime(event["time"], "%Y-%m-%dT%H:%M:%S.%f")
+        focused = self.tree.focus()
+        selected = self.tree.selection()
+        try:
+            self._clear_tree()
+            self._first_row = max(0, min(first_row, len(self.index) - PAGE_SIZE))
+            last_row = min(self._first_row + PAGE_SIZE, len(self.index))
+            self._row_count = last_row - self._first_row
+            last_event_time = self.index.get_time(self._first_row - 1) if self._first_row else None
+            for i in range(self._first_row, last_row):
+                event_time = self.index.get_time(i)
                 if last_event_time:
-                    delta = event_time - last_event_time
-                    pause = delta.seconds
+                    pause = (event_time - last_event_time).seconds
                 else:
                     pause = 0
-                self.tree.set(node_id, "pause", str(pause if pause else ""))
-                self.all_events.append(event)
-
+                self.tree.insert(
+                    "",
+                    "end",
+                    iid=str(i),
+                    values=(self.index.get_event(i)["sequence"], str(pause if pause else "")),
+                )
                 last_event_time = event_time
 
-        self.loading = False
+            # keep the selection when moving the window
+            selected = [iid for iid in selected if self.tree.exists(iid)]
+            if selected:
+                self.tree.selection_set(selected)
+            if focused and self.tree.exists(focused):
+                self.tree.focus(focused)
+        finally:
+            self.loading = False
+
+    def _on_tree_scroll(self, first, last):
+        first, last = float(first), float(last)
+        if not self._row_count:
+            self.vert_scrollbar.set(first, last)
+            return
+
+        total = len(self.index)
+        self.vert_scrollbar.set(
+            (self._first_row + first * self._row_count) / total,
+            (self._first_row + last * self._row_count) / total,
+        )
+
+        if (
+            first <= 0
+            and self._first_row > 0
+            or last >= 1
+            and self._first_row + self._row_count < total
+        ) and not self._window_update_scheduled:
+            self._window_update_scheduled = True
+            self.after_idle(self._move_window)
+
+    def _move_window(self):
+        self._window_update_scheduled = False
+        top_row = self._first_row + int(self.tree.yview()[0] * self._row_count)
+        self._show_row(top_row)
+
+    def _show_row(self, row):
+        """Moves the window so that given row is in the middle of it and scrolls the row to top"""
+        self._fill_rows(row - PAGE_SIZE // 2)
+        if self._row_count:
+            self.tree.yview_moveto((row - self._first_row) / self._row_count)
+
+    def _on_scrollbar_command(self, *args):
+        if args[0] == "moveto" and self._row_count:
+            row = min(int(float(args[1]) * len(self.index)), len(self.index) - 1)
+            self._show_row(max(row, 0))
+        else:
+            self.tree.yview(*args)
 
     def replay_event(self, event):
         "this should be called with events in correct order"
         # print("log replay", event)
 
         if "text_widget_id" in event:
-            if (
-                event.get("text_widget_context", None) == "shell"
-                or event.get("text_widget_class") == "ShellText"
-            ):
+            if is_shell_event(event):
                 self.shell.replay_event(event)
             else:
                 self.editor_notebook.replay_event(event)
@@ -159,23 +220,47 @@ class LogFrame(ui_utils.TreeFrame):
             return
         iid = self.tree.focus()
         if iid != "":
-            self.select_event(self.tree.index(iid))
+            self.select_event(int(iid))
 
     def select_event(self, event_index):
-        event = self.all_events[event_index]
+        event = self.index.get_event(event_index)
         self.details_frame.load_event(event)
 
         # here event means logged event
-        if event_index > self.last_event_index:
-            # replay all events between last replayed event up to and including this event
-            while self.last_event_index < event_index:
-                self.replay_event(self.all_events[self.last_event_index + 1])
-                self.last_event_index += 1
-
-        elif event_index < self.last_event_index:
-            # Undo by reseting and replaying again
+        replayed_count = self.last_event_index + 1
+        target_count = event_index + 1
+        keyframe_count = max(
+            (count for count in self._keyframes if count <= target_count), default=0
+        )
+        if replayed_count > target_count or keyframe_count > replayed_count:
+            # start from the nearest stored state
+            self._restore_keyframe(keyframe_count)
+
+        # replay all events between last replayed event up to and including this event
+        while self.last_event_index < event_index:
+            self.replay_event(self.index.get_event(self.last_event_index + 1))
+            self.last_event_index += 1
+            replayed_count = self.last_event_index + 1
+            if replayed_count % KEYFRAME_INTERVAL == 0 and replayed_count not in self._keyframes:
+                self._keyframes[replayed_count] = (
+                    self.editor_notebook.get_snapshot(),
+                    self.shell.get_snapshot(),
+                )
+
+    def _restore_keyframe(self, replayed_count):
+        if replayed_count == 0:
             self.reset()
-            self.select_event(event_index)
+            return
+
+        editors_snapshot, shell_snapshot = self._keyframes[replayed_count]
+        self.editor_notebook.restore_snapshot(editors_snapshot)
+        self.shell.restore_snapshot(shell_snapshot)
+        self.last_event_index = replayed_count - 1
+
+    def destroy(self):
+        if self.index is not None:
+            self.index.close()
+        super().destroy()
 
 
 class EventDetailsFrame(ui_utils.TreeFrame):
@@ -260,6 +345,23 @@ class ReplayerEditor(ttk.Frame):
     def reset(self):
         self.code_view.text.delete("1.0", "end")
 
+    def get_snapshot(self):
+        text = self.code_view.text
+        tag_ranges = {}
+        for tag in text.tag_names():
+            ranges = text.tag_ranges(tag)
+            if tag != "sel" and ranges:
+                tag_ranges[tag] = [str(index) for index in ranges]
+        return text.get("1.0", "end-1c"), tag_ranges
+
+    def restore_snapshot(self, snapshot):
+        content, tag_ranges = snapshot
+        text = self.code_view.text
+        text.delete("1.0", "end")
+        text.insert("1.0", content)
+        for tag, ranges in tag_ranges.items():
+            text.tag_add(tag, *ranges)
+
 
 class ReplayerEditorProper(ReplayerEditor):
     def __init__(self, master):
@@ -316,6 +418,27 @@ class ReplayerEditorNotebook(ttk.Notebook):
 
         self._editors_by_text_widget_id = {}
 
+    def get_snapshot(self):
+        editors = []
+        selected_id = None
+        for text_widget_id, editor in self._editors_by_text_widget_id.items():
+            editors.append((text_widget_id, self.tab(editor, "text"), editor.get_snapshot()))
+            if self.select() == str(editor):
+                selected_id = text_widget_id
+
+        return editors, selected_id
+
+    def restore_snapshot(self, snapshot):
+        editors, selected_id = snapshot
+        self.reset()
+        for text_widget_id, title, editor_snapshot in editors:
+            editor = self.get_editor_by_text_widget_id(text_widget_id)
+            self.tab(editor, text=title)
+            editor.restore_snapshot(editor_snapshot)
+
+        if selected_id is not None:
+            self.select(self._editors_by_text_widget_id[selected_id])
+
 
 class ShellFrame(ReplayerEditor):
     def __init__(self, master):
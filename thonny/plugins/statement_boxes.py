@@ -8,8 +8,9 @@ import os.path
 from tkinter import font
 
 import thonny
-from thonny import get_workbench, jedi_utils
+from thonny import get_workbench
 from thonny.codeview import get_syntax_options_for_tag
+from thonny.decorations import ViewportDecorator
 
 
 def create_bitmap_file(width, height, predicate, name):
@@ -62,7 +63,6 @@ def configure_text(text):
     spacing3 = 3
     text_font = text["font"]
     text.configure(spacing1=spacing1, spacing3=spacing3)
-    text.master._gutter.configure(spacing1=spacing1, spacing3=spacing3)
     if isinstance(text_font, str):
         text_font = font.nametofont(text_font)
 
@@ -137,91 +137,99 @@ def print_tree(node, level=0):
             print_tree(child, level + 1)
 
 
-def clear_tags(text):
-    for pos in ["ver", "hor"]:
-        for top in [True, False]:
-            for bottom in [True, False]:
-                text.tag_remove("%s_%s_%s" % (pos, top, bottom), "1.0", "end")
+class StatementBoxDecorator(ViewportDecorator):
+    tags = [
+        "%s_%s_%s" % (pos, top, bottom)
+        for pos in ["ver", "hor"]
+        for top in [True, False]
+        for bottom in [True, False]
+    ]
+
+    def compute_ranges(self, model, range_start_line, range_end_line):
+        tree = model.get_tree()
+        ranges = []
+
+        # nodes above the range are skipped
+        last_line = range_start_line - 1
+        last_col = 0
+
+        def tag_tree(node):
+            nonlocal last_line, last_col
+            from parso.python import tree as python_tree
+
+            if node.end_pos[0] < range_start_line or node.start_pos[0] > range_end_line:
+                # out of materialized range
+                return
+
+            if node.type == "simple_stmt" or isinstance(
+                node, (python_tree.Flow, python_tree.Scope)
+            ):
+
+                start_line, start_col = node.start_pos
+                end_line, end_col = node.end_pos
+
+                # Before dealing with this node,
+                # handle the case, where last vertical tag was meant for
+                # same column, but there were empty or comment lines between
+                if start_col == last_col:
+                    for i in range(last_line + 1, start_line):
+                        # NB! tag not visible when logically empty line
+                        # doesn't have indent prefix
+                        ranges.append(
+                            (
+                                "ver_False_False",
+                                "%d.%d" % (i, last_col - 1),
+                                "%d.%d" % (i, last_col),
+                            )
+                        )
+
+                # usually end_col is 0
+                # exceptions: several statements on the same line (semicoloned statements)
+                # also unclosed parens in if-header
+                for lineno in range(start_line, end_line if end_col == 0 else end_line + 1):
+
+                    top = lineno == start_line and lineno > 1
+                    bottom = False  # start_line == end_line-1
+
+                    # horizontal line (only for first or last line)
+                    if top or bottom:
+                        ranges.append(
+                            (
+                                "hor_%s_%s" % (top, bottom),
+                                "%d.%d" % (lineno, start_col),
+                                "%d.%d" % (lineno + 1 if end_col == 0 else lineno, 0),
+                            )
+                        )
+
+                    # vertical line (only for indented statements)
+                    # Note that I'm using start col for all lines
+                    # (statement's indent shouldn't decrease in continuation lines)
+                    if start_col > 0:
+                        ranges.append(
+                            (
+                                "ver_%s_%s" % (top, bottom),
+                                "%d.%d" % (lineno, start_col - 1),
+                                "%d.%d" % (lineno, start_col),
+                            )
+                        )
+
+                        last_line = lineno
+                        last_col = start_col
+
+            # Recurse
+            if node.type != "simple_stmt" and hasattr(node, "children"):
+                for child in node.children:
+                    tag_tree(child)
+
+        tag_tree(tree)
+        return ranges
 
 
 def add_tags(text):
-    source = text.get("1.0", "end")
-    clear_tags(text)
-    tree = jedi_utils.parse_source(source)
-
-    print_tree(tree)
-    last_line = 0
-    last_col = 0
-
-    def tag_tree(node):
-        nonlocal last_line, last_col
-        from parso.python import tree as python_tree
-
-        if node.type == "simple_stmt" or isinstance(node, (python_tree.Flow, python_tree.Scope)):
-
-            start_line, start_col = node.start_pos
-            end_line, end_col = node.end_pos
-
-            # Before dealing with this node,
-            # handle the case, where last vertical tag was meant for
-            # same column, but there were empty or comment lines between
-            if start_col == last_col:
-                for i in range(last_line + 1, start_line):
-                    # NB! tag not visible when logically empty line
-                    # doesn't have indent prefix
-                    text.tag_add(
-                        "ver_False_False", "%d.%d" % (i, last_col - 1), "%d.%d" % (i, last_col)
-                    )
-                    print("ver_False_False", "%d.%d" % (i, last_col - 1), "%d.%d" % (i, last_col))
-
-            print(node)
-
-            # usually end_col is 0
-            # exceptions: several statements on the same line (semicoloned statements)
-            # also unclosed parens in if-header
-            for lineno in range(start_line, end_line if end_col == 0 else end_line + 1):
-
-                top = lineno == start_line and lineno > 1
-                bottom = False  # start_line == end_line-1
-
-                # horizontal line (only for first or last line)
-                if top or bottom:
-                    text.tag_add(
-                        "hor_%s_%s" % (top, bottom),
-                        "%d.%d" % (lineno, start_col),
-                        "%d.%d" % (lineno + 1 if end_col == 0 else lineno, 0),
-                    )
-
-                    print(
-                        "hor_%s_%s" % (top, bottom),
-                        "%d.%d" % (lineno, start_col),
-                        "%d.%d" % (lineno + 1, 0),
-                    )
-
-                # vertical line (only for indented statements)
-                # Note that I'm using start col for all lines
-                # (statement's indent shouldn't decrease in continuation lines)
-                if start_col > 0:
-                    text.tag_add(
-                        "ver_%s_%s" % (top, bottom),
-                        "%d.%d" % (lineno, start_col - 1),
-                        "%d.%d" % (lineno, start_col),
-                    )
-                    print(
-                        "ver_%s_%s" % (top, bottom),
-                        "%d.%d" % (lineno, start_col - 1),
-                        "%d.%d" % (lineno, start_col),
-                    )
-
-                    last_line = lineno
-                    last_col = start_col
-
-        # Recurse
-        if node.type != "simple_stmt" and hasattr(node, "children"):
-            for child in node.children:
-                tag_tree(child)
-
-    tag_tree(tree)
+    if not hasattr(text, "statement_box_decorator"):
+        text.statement_box_decorator = StatementBoxDecorator(text)
+
+    text.statement_box_decorator.update()
 
 
 def handle_editor_event(event):
@@ -259,3 +267,4 @@ def _load_plugin() -> None:
     wb.bind("Save", handle_editor_event, True)
     wb.bind("Open", handle_editor_event, True)
     wb.bind_class("CodeViewText", "<<TextChange>>", handle_events, True)
+    wb.bind_class("CodeViewText", "<<VerticalScroll>>", handle_events, True)
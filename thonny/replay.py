@@ -0,0 +1,461 @@
+"""
+Reading and analyzing usage logs written by thonny.plugins.event_logging.
+
+Current logs contain one JSON object per line (possibly gzipped), older versions of
+Thonny wrote a JSON list at the end of the session. EventLogIndex gives random access
+to the events of a log without parsing all of them (used by the replayer).
+
+LogReplayer applies the edits of a log to plain text documents (no Tk needed), which
+allows analyzing many logs from command line:
+
+    python -m thonny.replay --output summary.csv --contents final_files user_logs
+"""
+import argparse
+import csv
+import gzip
+import io
+import itertools
+import json
+import logging
+import os.path
+import sys
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple  # @UnusedImport
+
+logger = logging.getLogger(__name__)
+
+# Number of parsed events kept by EventLogIndex
+EVENT_CACHE_SIZE = 2000
+# Longer pauses between events are not counted as time on task (seconds)
+MAX_ACTIVE_PAUSE = 300
+RUN_MAGICS = {"%Run", "%Debug", "%FastDebug", "%NiceDebug"}
+LOG_SUFFIXES = (".jsonl", ".jsonl.gz", ".txt")
+SUMMARY_COLUMNS = [
+    "log",
+    "start_time",
+    "end_time",
+    "event_count",
+    "time_on_task",
+    "edit_count",
+    "inserted_chars",
+    "deleted_chars",
+    "run_count",
+    "debug_count",
+    "shell_command_count",
+    "save_count",
+    "files",
+]
+
+
+def read_log_events(filename: str) -> Iterator[Dict[str, Any]]:
+    """Reads events from a log file (gzipped, current or older JSON list format)"""
+    if filename.endswith(".gz"):
+        fp = gzip.open(filename, mode="rt", encoding="UTF-8")
+    else:
+        fp = open(filename, encoding="UTF-8")
+
+    with fp:
+        first_line = fp.readline()
+        if first_line.lstrip().startswith("["):
+            # written by older Thonny at the end of the session
+            yield from json.loads(first_line + fp.read())
+            return
+
+        for line in itertools.chain([first_line], fp):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # last line may be incomplete after a crash
+                logger.warning("Skipping invalid event log line in %s", filename)
+
+
+def parse_event_time(event: Dict[str, Any]) -> datetime:
+    time_str = event["time"]
+    if len(time_str) == 19:
+        # 0 fraction may have been skipped
+        time_str += ".0"
+    return datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S.%f")
+
+
+class EventLogIndex:
+    """Random access to the events of a log file.
+
+    For line-based logs only the offsets of the lines are kept in memory, events get
+    parsed when requested."""
+
+    def __init__(self, filename: str):
+        self._events = None  # type: Optional[List[Dict[str, Any]]]
+        self._offsets = array("Q")
+        self._cache = OrderedDict()  # type: OrderedDict
+
+        if filename.endswith(".gz"):
+            with gzip.open(filename, "rb") as gz_fp:
+                self._fp = io.BytesIO(gz_fp.read())  # type: Any
+        else:
+            self._fp = open(filename, "rb")
+
+        if self._fp.read(1024).lstrip().startswith(b"["):
+            self._fp.seek(0)
+            self._events = json.loads(self._fp.read().decode("UTF-8"))
+            self.close()
+        else:
+            self._fp.seek(0)
+            self._index_lines()
+
+    def _index_lines(self):
+        pos = 0
+        for line in self._fp:
+            if line.strip():
+                if line.endswith(b"\n") or self._is_complete(line):
+                    self._offsets.append(pos)
+                else:
+                    logger.warning("Skipping incomplete last line of event log")
+            pos += len(line)
+
+    def _is_complete(self, line):
+        try:
+            json.loads(line.decode("UTF-8"))
+            return True
+        except ValueError:
+            return False
+
+    def __len__(self) -> int:
+        if self._events is not None:
+            return len(self._events)
+        return len(self._offsets)
+
+    def get_event(self, index: int) -> Dict[str, Any]:
+        if self._events is not None:
+            return self._events[index]
+
+        event = self._cache.get(index)
+        if event is None:
+            self._fp.seek(self._offsets[index])
+            event = json.loads(self._fp.readline().decode("UTF-8"))
+            self._cache[index] = event
+            if len(self._cache) > EVENT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(index)
+
+        return event
+
+    def get_time(self, index: int) -> datetime:
+        return parse_event_time(self.get_event(index))
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+def is_shell_event(event: Dict[str, Any]) -> bool:
+    return (
+        event.get("text_widget_context", None) == "shell"
+        or event.get("text_widget_class") == "ShellText"
+    )
+
+
+class TextDocument:
+    """Content of a text widget, changed with concrete Tk indices ("line.column")
+    the way Tk text would change"""
+
+    def __init__(self):
+        self._lines = [""]
+
+    def get_text(self) -> str:
+        return "\n".join(self._lines)
+
+    def _parse_index(self, index: str) -> Tuple[int, int]:
+        line_str, col_str = index.split(".")
+        line, col = int(line_str), int(col_str)
+        if line < 1:
+            return 0, 0
+        if line > len(self._lines):
+            # Tk keeps the final newline
+            return len(self._lines) - 1, len(self._lines[-1])
+        return line - 1, max(0, min(col, len(self._lines[line - 1])))
+
+    def insert(self, index: str, chars: str) -> None:
+        line, col = self._parse_index(index)
+        old = self._lines[line]
+        self._lines[line : line + 1] = (old[:col] + chars + old[col:]).split("\n")
+
+    def delete(self, index1: str, index2: Optional[str] = None) -> int:
+        """Returns the number of deleted characters"""
+        line1, col1 = self._parse_index(index1)
+        if index2 is None:
+            if col1 < len(self._lines[line1]):
+                line2, col2 = line1, col1 + 1
+            elif line1 + 1 < len(self._lines):
+                line2, col2 = line1 + 1, 0
+            else:
+                return 0
+        else:
+            line2, col2 = self._parse_index(index2)
+
+        if (line2, col2) <= (line1, col1):
+            return 0
+
+        old_length = sum(map(len, self._lines[line1 : line2 + 1])) + line2 - line1
+        self._lines[line1 : line2 + 1] = [self._lines[line1][:col1] + self._lines[line2][col2:]]
+        return old_length - len(self._lines[line1])
+
+
+class LogReplayer:
+    """Applies the events of a log to documents of editors and shell"""
+
+    def __init__(self):
+        self.documents = OrderedDict()  # type: OrderedDict[Any, TextDocument]
+        self.filenames = {}  # type: Dict[Any, str]
+        self.shell = TextDocument()
+
+    def replay_event(self, event: Dict[str, Any]) -> int:
+        """Returns the number of deleted characters"""
+        if "text_widget_id" not in event:
+            return 0
+
+        if is_shell_event(event):
+            doc = self.shell
+        else:
+            text_widget_id = event["text_widget_id"]
+            if text_widget_id not in self.documents:
+                self.documents[text_widget_id] = TextDocument()
+            doc = self.documents[text_widget_id]
+            if event.get("filename"):
+                self.filenames[text_widget_id] = event["filename"]
+
+        if event["sequence"] == "TextInsert":
+            doc.insert(event["index"], event["text"])
+        elif event["sequence"] == "TextDelete":
+            index2 = event.get("index2")
+            return doc.delete(event["index1"], index2 if index2 and index2 != "None" else None)
+
+        return 0
+
+    def get_editor_contents(self) -> List[Tuple[str, str]]:
+        """Returns (title, content) for each editor"""
+        result = []
+        used_titles = set()
+        for i, (text_widget_id, doc) in enumerate(self.documents.items()):
+            filename = self.filenames.get(text_widget_id)
+            title = os.path.basename(filename) if filename else "untitled_%d.py" % (i + 1)
+            if title in used_titles:
+                # eg. files with same name from different directories
+                stem, ext = os.path.splitext(title)
+                title = "%s_%d%s" % (stem, i + 1, ext)
+            used_titles.add(title)
+            result.append((title, doc.get_text()))
+        return result
+
+
+def get_log_names(paths: List[str]) -> List[str]:
+    """Returns distinct names for the logs (paths relative to the common directory of
+    the logs, without the log suffix), used as directories of their editor contents.
+
+    Logs of a class started at the same time get same file names, but are usually
+    stored in different directories."""
+    if not paths:
+        return []
+
+    common_dir = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    names = []
+    for path in paths:
+        name = os.path.relpath(os.path.abspath(path), common_dir)
+        for suffix in LOG_SUFFIXES:
+            if name.endswith(suffix):
+                name = name[: -len(suffix)]
+                break
+        names.append(name)
+
+    if len(set(names)) < len(names):
+        # eg. both .jsonl and .jsonl.gz of same log
+        names = [os.path.relpath(os.path.abspath(path), common_dir) for path in paths]
+
+    return names
+
+
+def analyze_log(
+    path: str,
+    contents_dir: Optional[str] = None,
+    contents_at_runs: bool = False,
+    log_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Replays given log and returns its summary (keys are SUMMARY_COLUMNS).
+
+    If contents_dir is given, final contents of the editors (and optionally the
+    contents at each run) get written under contents_dir/<log name>/ (by default
+    log name is the file name of the log without suffixes, see get_log_names)."""
+    replayer = LogReplayer()
+    summary = {name: 0 for name in SUMMARY_COLUMNS}  # type: Dict[str, Any]
+    summary.update(log=path, start_time=None, end_time=None, time_on_task=0.0)
+    if log_name is None:
+        log_name = get_log_names([path])[0]
+    last_time = None
+
+    for event in read_log_events(path):
+        deleted_chars = replayer.replay_event(event)
+        summary["event_count"] += 1
+
+        event_time = parse_event_time(event)
+        if last_time is None:
+            summary["start_time"] = event["time"]
+        else:
+            pause = (event_time - last_time).total_seconds()
+            summary["time_on_task"] += min(pause, MAX_ACTIVE_PAUSE)
+        summary["end_time"] = event["time"]
+        last_time = event_time
+
+        sequence = event["sequence"]
+        if sequence in ("TextInsert", "TextDelete"):
+            if not is_shell_event(event):
+                summary["edit_count"] += 1
+                summary["inserted_chars"] += len(event.get("text", ""))
+                summary["deleted_chars"] += deleted_chars
+        elif sequence == "MagicCommand":
+            magic = event.get("cmd_line", "").split(" ", 1)[0]
+            if magic not in RUN_MAGICS:
+                continue
+            if magic == "%Run":
+                summary["run_count"] += 1
+            else:
+                summary["debug_count"] += 1
+            if contents_dir and contents_at_runs:
+                run_number = summary["run_count"] + summary["debug_count"]
+                _write_contents(
+                    replayer, os.path.join(contents_dir, log_name, "run_%03d" % run_number)
+                )
+        elif sequence == "ShellCommand":
+            summary["shell_command_count"] += 1
+        elif sequence in ("Save", "SaveAs"):
+            summary["save_count"] += 1
+
+    summary["time_on_task"] = round(summary["time_on_task"], 1)
+    summary["files"] = " ".join(sorted({os.path.basename(f) for f in replayer.filenames.values()}))
+    if contents_dir:
+        _write_contents(replayer, os.path.join(contents_dir, log_name, "final"))
+
+    return summary
+
+
+def _write_contents(replayer: LogReplayer, target_dir: str) -> None:
+    os.makedirs(target_dir, exist_ok=True)
+    for title, content in replayer.get_editor_contents():
+        with open(os.path.join(target_dir, title), "w", encoding="UTF-8") as fp:
+            fp.write(content)
+
+
+def collect_logs(paths: List[str]) -> List[str]:
+    """Expands directories to the log files they contain"""
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                result.extend(
+                    os.path.join(dirpath, name)
+                    for name in sorted(filenames)
+                    if name.endswith(LOG_SUFFIXES)
+                )
+        else:
+            result.append(path)
+    return result
+
+
+def analyze_logs(
+    paths: List[str],
+    contents_dir: Optional[str] = None,
+    contents_at_runs: bool = False,
+    jobs: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Analyzes given logs in a pool of processes (unless jobs is 1),
+    skips the logs which can't be read"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    summaries = []
+    log_names = get_log_names(paths)
+    if jobs == 1 or len(paths) < 2:
+        for path, log_name in zip(paths, log_names):
+            try:
+                summaries.append(analyze_log(path, contents_dir, contents_at_runs, log_name))
+            except Exception as e:
+                logger.error("Could not analyze %s: %s", path, e)
+        return summaries
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(analyze_log, path, contents_dir, contents_at_runs, log_name)
+            for path, log_name in zip(paths, log_names)
+        ]
+        for path, future in zip(paths, futures):
+            try:
+                summaries.append(future.result())
+            except Exception as e:
+                logger.error("Could not analyze %s: %s", path, e)
+
+    return summaries
+
+
+def write_summaries_csv(summaries: List[Dict[str, Any]], fp) -> None:
+    writer = csv.DictWriter(fp, fieldnames=SUMMARY_COLUMNS, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(summaries)
+
+
+def write_summaries_parquet(summaries: List[Dict[str, Any]], filename: str) -> None:
+    # optional dependency, needed only for this format
+    import pyarrow
+    import pyarrow.parquet
+
+    columns = {name: [summary[name] for summary in summaries] for name in SUMMARY_COLUMNS}
+    pyarrow.parquet.write_table(pyarrow.table(columns), filename)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m thonny.replay",
+        description="Replays Thonny usage logs and summarizes them (one row per log)",
+    )
+    parser.add_argument("logs", nargs="+", help="log files or directories containing logs")
+    parser.add_argument("-o", "--output", help="summary file (CSV goes to stdout by default)")
+    parser.add_argument("-f", "--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("-c", "--contents", help="directory for reconstructed editor contents")
+    parser.add_argument(
+        "--at-runs",
+        action="store_true",
+        help="write editor contents also at each Run/Debug (requires --contents)",
+    )
+    parser.add_argument("-j", "--jobs", type=int, help="number of worker processes")
+    options = parser.parse_args(args)
+
+    if options.at_runs and not options.contents:
+        parser.error("--at-runs requires --contents")
+    if options.format == "parquet":
+        if not options.output:
+            parser.error("Parquet format requires --output")
+        try:
+            import pyarrow.parquet  # @UnusedImport
+        except ImportError:
+            parser.error("Parquet format requires pyarrow (pip install pyarrow)")
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    paths = collect_logs(options.logs)
+    summaries = analyze_logs(paths, options.contents, options.at_runs, options.jobs)
+
+    if options.format == "parquet":
+        write_summaries_parquet(summaries, options.output)
+    elif options.output:
+        with open(options.output, "w", encoding="UTF-8", newline="") as fp:
+            write_summaries_csv(summaries, fp)
+    else:
+        write_summaries_csv(summaries, sys.stdout)
+
+    return 0 if len(summaries) == len(paths) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
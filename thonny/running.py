@@ -26,7 +26,7 @@ from logging import debug
 from threading import Thread
 from time import sleep
 from tkinter import messagebox, ttk
-from typing import Any, List, Optional, Set, Union, Callable  # @UnusedImport; @UnusedImport
+from typing import Any, List, Optional, Set, Tuple, Union, Callable  # @UnusedImport; @UnusedImport
 
 import thonny
 from thonny import THONNY_USER_DIR, common, get_runner, get_shell, get_workbench
@@ -76,6 +76,9 @@ EXPECTED_TERMINATION_CODE = 123
 
 INTERRUPT_SEQUENCE = "<Control-c>"
 
+# How long (ms) to wait after starting a back-end process before preparing the next one
+WARM_PROCESS_DELAY = 1000
+
 ANSI_CODE_TERMINATOR = re.compile("[@-~]")
 
 # other components may turn it on in order to avoid grouping output lines into one event
@@ -83,6 +86,10 @@ io_animation_required = False
 
 _console_allocated = False
 
+# Idle, initialized back-end process (with the launch parameters it was created with),
+# which will replace current process on next restart
+_warm_process = None  # type: Optional[Tuple[Any, subprocess.Popen]]
+
 
 class Runner:
     def __init__(self) -> None:
@@ -94,6 +101,8 @@ class Runner:
         self._publishing_events = False
         self._polling_after_id = None
         self._postponed_commands = []  # type: List[CommandToBackend]
+        # eg. installed packages may need different sys.path
+        get_workbench().bind("RemoteFilesChanged", self._discard_warm_processes, True)
 
     def _remove_obsolete_jedi_copies(self) -> None:
         # Thonny 2.1 used to copy jedi in order to make it available
@@ -624,6 +633,9 @@ class Runner:
 
         get_workbench().event_generate("BackendTerminated")
 
+    def _discard_warm_processes(self, event=None) -> None:
+        discard_warm_processes()
+
     def get_local_executable(self) -> Optional[str]:
         if self._proxy is None:
             return None
@@ -837,6 +849,10 @@ class BackendProxy:
 
 
 class SubprocessProxy(BackendProxy):
+    # Whether next back-end process can be started before it is needed.
+    # Shouldn't be used when the process grabs a resource (eg. a serial port) on start.
+    uses_warm_processes = False
+
     def __init__(self, clean: bool, executable: Optional[str] = None) -> None:
         super().__init__(clean)
 
@@ -916,8 +932,8 @@ class SubprocessProxy(BackendProxy):
         if sys.version_info >= (3, 6):
             extra_params["encoding"] = "utf-8"
 
-        self._proc = subprocess.Popen(
-            cmd_line,
+        popen_args = dict(
+            args=cmd_line,
             bufsize=0,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
@@ -929,11 +945,46 @@ class SubprocessProxy(BackendProxy):
             **extra_params
         )
 
+        self._proc = None
+        if self.uses_warm_processes:
+            # a process started with different parameters (eg. after changing the interpreter,
+            # working directory or environment) is not usable
+            launch_key = (tuple(cmd_line), popen_args["cwd"], tuple(sorted(env.items())))
+            self._proc = _take_warm_process(launch_key)
+            self._schedule_warm_process(launch_key, popen_args)
+
+        if self._proc is None:
+            self._proc = subprocess.Popen(**popen_args)
+
         # setup asynchronous output listeners
         self._terminated_readers = 0
         Thread(target=self._listen_stdout, args=(self._proc.stdout,), daemon=True).start()
         Thread(target=self._listen_stderr, args=(self._proc.stderr,), daemon=True).start()
 
+    def _schedule_warm_process(self, launch_key, popen_args):
+        """Prepares a process for replacing current process on next restart"""
+
+        def prepare():
+            global _warm_process
+            if self._proc is None or get_runner().get_backend_proxy() is not self:
+                # proxy has been replaced meanwhile
+                return
+
+            if (
+                _warm_process is not None
+                and _warm_process[0] == launch_key
+                and _warm_process[1].poll() is None
+            ):
+                return
+
+            discard_warm_processes()
+            try:
+                _warm_process = (launch_key, subprocess.Popen(**popen_args))
+            except OSError:
+                logger.exception("Could not prepare back-end process")
+
+        get_workbench().after(WARM_PROCESS_DELAY, prepare)
+
     def _get_launch_cwd(self):
         return self.get_cwd() if self.uses_local_filesystem() else None
 
@@ -1157,6 +1208,27 @@ class SubprocessProxy(BackendProxy):
             return msg
 
 
+def _take_warm_process(launch_key) -> Optional[subprocess.Popen]:
+    global _warm_process
+    if _warm_process is None:
+        return None
+
+    key, proc = _warm_process
+    _warm_process = None
+    if key == launch_key and proc.poll() is None:
+        return proc
+
+    proc.kill()
+    return None
+
+
+def discard_warm_processes() -> None:
+    global _warm_process
+    if _warm_process is not None:
+        _warm_process[1].kill()
+        _warm_process = None
+
+
 def _ends_with_incomplete_ansi_code(data):
     pos = data.rfind("\033")
     if pos == -1:
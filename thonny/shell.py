@@ -320,6 +320,12 @@ class BaseShellText(EnhancedTextWithLogging, SyntaxText):
         self._ansi_strikethrough = False
         self._io_cursor_offset = 0
         self._squeeze_buttons = set()
+        # needed for each output chunk, therefore kept locally
+        self._squeeze_threshold = get_workbench().get_option("shell.squeeze_threshold")
+        get_workbench().add_option_listener(
+            "shell.squeeze_threshold", self._on_squeeze_threshold_changed
+        )
+        self.bind("<Destroy>", self._forget_option_listeners, True)
 
         self.update_tty_mode()
 
@@ -487,7 +493,16 @@ class BaseShellText(EnhancedTextWithLogging, SyntaxText):
             self._update_visible_io(msg.io_symbol_count)
 
     def _get_squeeze_threshold(self):
-        return get_workbench().get_option("shell.squeeze_threshold")
+        return self._squeeze_threshold
+
+    def _on_squeeze_threshold_changed(self, value):
+        self._squeeze_threshold = value
+
+    def _forget_option_listeners(self, event):
+        if event.widget is self:
+            get_workbench().remove_option_listener(
+                "shell.squeeze_threshold", self._on_squeeze_threshold_changed
+            )
 
     def _append_to_io_queue(self, data, stream_name):
         if self.tty_mode:
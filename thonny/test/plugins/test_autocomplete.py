@@ -0,0 +1,18 @@
+from thonny.plugins.autocomplete import get_imported_modules
+
+
+def test_get_imported_modules():
+    source = "\n".join(
+        [
+            "import os, sys.path as p",
+            "from numpy.linalg import norm",
+            "from . import sibling",
+            "",
+            "def f():",
+            "    import pandas as pd",
+            "# import commented",
+            "x = 1  # import trailing",
+            "import os",
+        ]
+    )
+    assert get_imported_modules(source) == ["os", "sys", "numpy", "pandas"]
@@ -0,0 +1,21 @@
+from thonny.plugins.coloring import lex_line
+
+
+def test_lex_line_tracks_open_string3():
+    segments, state = lex_line('x = """abc', None)
+    assert segments == [(4, None)]
+    assert state == ('"""', 4)
+
+    segments, state = lex_line("abc\"\"\" + f'''x", ('"""', 4))
+    assert segments == [(0, 6), (9, None)]
+    assert state == ("'''", 9)
+
+    segments, state = lex_line("still in string", ("'''", 9))
+    assert segments == [(0, None)]
+    assert state == ("'''", None)
+
+
+def test_lex_line_ignores_delimiters_in_comments_and_strings():
+    assert lex_line('# """ not a string', None) == ([], None)
+    assert lex_line("s = '\"\"\"' + 1", None) == ([], None)
+    assert lex_line('s = "\\"""', None) == ([], None)
@@ -0,0 +1,43 @@
+import json
+import os.path
+
+from thonny.plugins import event_logging
+from thonny.plugins.event_logging import EventLogWriter
+from thonny.replay import read_log_events
+
+
+def test_writer_rotates_and_reader_reads_all_formats(tmp_path, monkeypatch):
+    log_dir = str(tmp_path)
+    monkeypatch.setattr(event_logging, "_get_log_dir", lambda: log_dir)
+    monkeypatch.setattr(event_logging, "MAX_LOG_FILE_SIZE", 1000)
+
+    writer = EventLogWriter()
+    writer.start()
+    events = [
+        {"sequence": "TextInsert", "time": "2020-01-01T10:00:00.%d" % i, "text": "x" * 50}
+        for i in range(100)
+    ]
+    for data in events:
+        writer.submit(data)
+    writer.close()
+
+    names = sorted(os.listdir(log_dir))
+    assert any(name.endswith(".jsonl.gz") for name in names)
+    # last file is left uncompressed
+    assert len([name for name in names if name.endswith(".jsonl")]) == 1
+
+    read_events = []
+    for name in names:
+        read_events.extend(read_log_events(os.path.join(log_dir, name)))
+    assert sorted(read_events, key=lambda e: e["time"]) == sorted(events, key=lambda e: e["time"])
+
+    # old format and incomplete last line
+    old_log = os.path.join(log_dir, "old.txt")
+    with open(old_log, "w", encoding="UTF-8") as fp:
+        json.dump(events[:2], fp, indent="    ")
+    assert list(read_log_events(old_log)) == events[:2]
+
+    crashed_log = os.path.join(log_dir, "crashed.jsonl")
+    with open(crashed_log, "w", encoding="UTF-8") as fp:
+        fp.write(json.dumps(events[0]) + "\n" + json.dumps(events[1])[:10])
+    assert list(read_log_events(crashed_log)) == events[:1]
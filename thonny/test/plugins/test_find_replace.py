@@ -0,0 +1,110 @@
+from thonny.plugins.find_replace import (
+    apply_replacements,
+    compile_search_pattern,
+    coalesce_replacements,
+    compute_replace_all,
+    find_matches,
+    get_line_offsets,
+    index_to_offset,
+    offset_to_index,
+    replace_in_text,
+)
+
+
+class FakeText:
+    """Plain string with Text's editing API, counts the edits (each of which
+    means a TextDelete or TextInsert event in an editor)"""
+
+    def __init__(self, content, breakpoint_lines=()):
+        self.content = content
+        self.breakpoint_lines = breakpoint_lines
+        self.edit_count = 0
+
+    def _offset(self, index):
+        return index_to_offset(get_line_offsets(self.content), index)
+
+    def tag_ranges(self, tag):
+        result = []
+        for line in self.breakpoint_lines:
+            result += ["%d.0" % line, "%d.%d" % (line, len(self.content.split("\n")[line - 1]))]
+        return result
+
+    def delete(self, index1, index2):
+        self.edit_count += 1
+        self.content = self.content[: self._offset(index1)] + self.content[self._offset(index2) :]
+
+    def insert(self, index, chars):
+        self.edit_count += 1
+        offset = self._offset(index)
+        self.content = self.content[:offset] + chars + self.content[offset:]
+
+    def edit_separator(self):
+        pass
+
+
+def test_replace_all_gives_change_per_match():
+    source = "a = 1\nb = a + a\nc = 3\n"
+    pattern = compile_search_pattern("A", case_sensitive=False, regex=False)
+    replacements = compute_replace_all(source, pattern, "x.y", regex=False)
+    assert [(start, end) for start, end, _ in replacements] == [(0, 1), (10, 11), (14, 15)]
+    assert apply_replacements(source, replacements) == "x.y = 1\nb = x.y + x.y\nc = 3\n"
+
+    pattern = compile_search_pattern("a", case_sensitive=True, regex=False)
+    assert compute_replace_all("A = 1", pattern, "b", regex=False) == []
+
+
+def test_replace_all_skips_empty_matches_like_find():
+    source = "x = 1\n\ny = 2\n"
+    pattern = compile_search_pattern(r"\d*$", case_sensitive=True, regex=True)
+    replacements = compute_replace_all(source, pattern, "#", regex=True)
+    assert len(replacements) == len(find_matches(source, pattern)) == 2
+    assert apply_replacements(source, replacements) == "x = #\n\ny = #\n"
+
+
+def test_regex_find_and_replace():
+    source = "foo(1)\nbar(22)\n(x)"
+    pattern = compile_search_pattern(r"^(\w+)\((\d+)\)", case_sensitive=True, regex=True)
+    assert find_matches(source, pattern) == [(0, 6), (7, 14)]
+
+    replacements = compute_replace_all(source, pattern, r"\2 -> \1", regex=True)
+    assert len(replacements) == 2
+    assert apply_replacements(source, replacements) == "1 -> foo\n22 -> bar\n(x)"
+
+    # literal mode doesn't interpret the special characters
+    pattern = compile_search_pattern("(x)", case_sensitive=True, regex=False)
+    assert find_matches(source, pattern) == [(15, 18)]
+
+
+def test_offsets_and_indices():
+    source = "ab\n\ncde"
+    line_offsets = get_line_offsets(source)
+    for offset, index in [(0, "1.0"), (2, "1.2"), (3, "2.0"), (4, "3.0"), (7, "3.3")]:
+        assert offset_to_index(line_offsets, offset) == index
+        assert index_to_offset(line_offsets, index) == offset
+
+
+def test_replace_all_makes_few_edits():
+    source = "".join("x = %d\n" % i for i in range(10000))
+    pattern = compile_search_pattern("x", case_sensitive=True, regex=False)
+    replacements = compute_replace_all(source, pattern, "y", regex=False)
+    expected = source.replace("x", "y")
+
+    text = FakeText(source)
+    replace_in_text(text, source, replacements)
+    assert text.content == expected
+    assert text.edit_count == 2
+
+    # text on breakpoint lines between the matches is not touched
+    source = "x = 1\nprint(1)\nx = 2\nprint(2)\nx = 3\n"
+    replacements = compute_replace_all(source, pattern, "y", regex=False)
+    text = FakeText(source, breakpoint_lines=[2])
+    replace_in_text(text, source, replacements)
+    assert text.content == source.replace("x", "y")
+    assert text.edit_count == 4
+    assert coalesce_replacements(source, replacements, [(6, 14)]) == [
+        (0, 1, "y"),
+        (15, 31, "y = 2\nprint(2)\ny"),
+    ]
+
+    # no-op replacements are dropped
+    assert coalesce_replacements(source, [(0, 1, "x")]) == []
@@ -0,0 +1,55 @@
+import textwrap
+
+from thonny.plugins.micropython.backend import (
+    COMPACT_VALUE_HELPERS,
+    COMPACT_VALUE_PREFIX,
+    decode_compact_value,
+)
+
+
+def _create_helper():
+    namespace = {}
+    exec("class Helper:\n" + textwrap.indent(COMPACT_VALUE_HELPERS, "    "), namespace)
+    return namespace["Helper"]
+
+
+def _roundtrip(value):
+    import base64
+
+    encoded = _create_helper().mgmt_repr(value)
+    if not encoded.startswith(COMPACT_VALUE_PREFIX):
+        return encoded
+
+    return decode_compact_value(base64.b64decode(encoded[len(COMPACT_VALUE_PREFIX) :]))
+
+
+def test_stat_map():
+    value = {
+        "file%d.py" % i: (32768, 0, 0, 0, 0, 0, i * 1000, 0, 1609459200 + i, 0) for i in range(20)
+    }
+    value["bad"] = "error text"
+    assert _roundtrip(value) == value
+
+
+def test_scalars_and_nesting():
+    value = [
+        None,
+        True,
+        False,
+        -1,
+        -33,
+        127,
+        128,
+        2 ** 40,
+        -(2 ** 40),
+        1.5,
+        "õun" * 20,
+        b"\x00\xff" * 40000,
+        ("x", ["y", {"z": ()}]),
+    ]
+    assert _roundtrip(value) == value
+
+
+def test_small_and_unsupported_values_use_repr():
+    assert _roundtrip((1, 2)) == repr((1, 2))
+    assert _roundtrip([object()] * 10).startswith("[<object")
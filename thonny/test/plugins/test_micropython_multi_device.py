@@ -0,0 +1,128 @@
+import contextlib
+import io
+import os
+import sys
+import threading
+import traceback
+
+import pytest
+
+from thonny.plugins.micropython.multi_device import (
+    FIRST_RAW_PROMPT,
+    MultiDeviceManager,
+    is_micropython_port,
+    run_script,
+    upload_file,
+)
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="fake devices are based on pty"
+)
+
+
+class FakeDevice(threading.Thread):
+    """Emulates raw REPL of a MicroPython device on the master side of a pty"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        import tty
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.files = {}
+        self._namespace = {"open": self._open}
+
+    def _open(self, path, mode="r"):
+        device = self
+
+        class FakeFile(io.BytesIO):
+            def close(self):
+                device.files[path] = self.getvalue()
+                super().close()
+
+        return FakeFile()
+
+    def _execute(self, script):
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                exec(script.decode("utf-8"), self._namespace)
+            except Exception:
+                err.write(traceback.format_exc())
+        return out.getvalue().encode("utf-8"), err.getvalue().encode("utf-8")
+
+    def run(self):
+        buffer = b""
+        raw = False
+        while True:
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                break
+            if not data:
+                break
+            buffer += data
+            while True:
+                if not raw:
+                    if b"\x01" not in buffer:
+                        buffer = b""
+                        break
+                    buffer = buffer[buffer.index(b"\x01") + 1 :]
+                    raw = True
+                    os.write(self._master, FIRST_RAW_PROMPT)
+                elif buffer.startswith(b"\x02"):
+                    buffer = buffer[1:]
+                    raw = False
+                elif b"\x04" in buffer:
+                    script, buffer = buffer.split(b"\x04", maxsplit=1)
+                    out, err = self._execute(script)
+                    os.write(self._master, b"OK" + out + b"\x04" + err + b"\x04>")
+                else:
+                    break
+
+
+@pytest.fixture
+def devices():
+    result = [FakeDevice() for _ in range(3)]
+    for device in result:
+        device.start()
+    return result
+
+
+def test_run_and_upload_on_all_devices(devices, tmp_path):
+    manager = MultiDeviceManager([device.port for device in devices])
+    try:
+        open_results = manager.open()
+        assert all(result.ok for result in open_results.values())
+
+        results = manager.run_on_all(run_script, "print(6 * 7)")
+        assert [results[device.port].value for device in devices] == ["42\n"] * 3
+        assert all(result.duration >= 0 for result in results.values())
+
+        results = manager.run_on_all(run_script, "1 / 0")
+        assert not any(result.ok for result in results.values())
+        assert "ZeroDivisionError" in results[devices[0].port].error
+
+        local_path = tmp_path / "main.py"
+        content = bytes(range(256)) * 5
+        local_path.write_bytes(content)
+        results = manager.run_on_all(upload_file, str(local_path), "/main.py")
+        assert all(result.value == len(content) for result in results.values())
+        assert all(device.files["/main.py"] == content for device in devices)
+    finally:
+        manager.close()
+
+
+def test_auto_detection_skips_generic_serial_adapters():
+    from types import SimpleNamespace
+
+    def port(vid, pid, manufacturer, description):
+        return SimpleNamespace(vid=vid, pid=pid, manufacturer=manufacturer, description=description)
+
+    assert is_micropython_port(port(0x2E8A, 0x0005, "MicroPython", "Board in FS mode"))
+    assert is_micropython_port(port(0x1209, 0xADDA, None, "USB Serial Device"))
+    assert not is_micropython_port(port(0x1A86, 0x7523, None, "USB-SERIAL CH340"))
+    assert not is_micropython_port(port(0x2341, 0x0043, "Arduino", "Arduino Uno (USB)"))
+    assert not is_micropython_port(port(0x10C4, 0xEA60, "Silicon Labs", "CP2102 USB to UART"))
@@ -0,0 +1,68 @@
+import io
+import json
+import os.path
+
+from thonny.analysis_server import AnalysisServer, compute_cache_keys
+from thonny.import_graph import ImportGraph
+
+
+class FakeRunner:
+    def __init__(self):
+        self.analyzed_paths = []
+
+    def analyze(self, args, paths):
+        for path in paths:
+            self.analyzed_paths.append(path)
+            yield path, [path + ": checked with " + " ".join(args)]
+
+    def close(self):
+        pass
+
+
+def _write(path, content):
+    with open(path, "w", encoding="UTF-8") as fp:
+        fp.write(content)
+
+
+def test_only_changed_files_get_analyzed(tmp_path):
+    main_path = os.path.join(str(tmp_path), "prog.py")
+    helper_path = os.path.join(str(tmp_path), "helper.py")
+    other_path = os.path.join(str(tmp_path), "other.py")
+    _write(main_path, "import helper\nprint(helper.x)\n")
+    _write(helper_path, "x = 1\n")
+    _write(other_path, "y = 2\n")
+    paths = [main_path, helper_path, other_path]
+
+    runner = FakeRunner()
+    out = io.StringIO()
+    server = AnalysisServer(runner, out)
+
+    server._handle_request({"id": 1, "args": ["-a"], "paths": paths})
+    assert runner.analyzed_paths == paths
+
+    # importer gets analyzed again when imported file changes
+    runner.analyzed_paths.clear()
+    _write(helper_path, "x = 2\n")
+    server._handle_request({"id": 2, "args": ["-a"], "paths": paths})
+    assert runner.analyzed_paths == [main_path, helper_path]
+
+    # different options don't use cached results
+    runner.analyzed_paths.clear()
+    server._handle_request({"id": 3, "args": ["-b"], "paths": paths})
+    assert runner.analyzed_paths == paths
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r for r in responses if r["id"] == 2] == [
+        {"id": 2, "path": other_path, "lines": [other_path + ": checked with -a"]},
+        {"id": 2, "path": main_path, "lines": [main_path + ": checked with -a"]},
+        {"id": 2, "path": helper_path, "lines": [helper_path + ": checked with -a"]},
+        {"id": 2, "done": True},
+    ]
+
+
+def test_cache_keys_of_missing_files(tmp_path):
+    path = os.path.join(str(tmp_path), "prog.py")
+    _write(path, "x = (")
+    keys = compute_cache_keys([], [path, path + "x"], ImportGraph())
+    assert keys[path] is not None
+    assert keys[path + "x"] is None
@@ -0,0 +1,149 @@
+import os.path
+
+from thonny.base_file_browser import (
+    MTIME_GRANULARITY,
+    BaseLocalFileBrowser,
+    BaseRemoteFileBrowser,
+)
+
+
+class FakeTree:
+    """Keeps the nodes like ttk.Treeview and records the modifying calls"""
+
+    def __init__(self, root_path):
+        self._nodes = {"": {"values": {"path": root_path}, "children": (), "options": {}}}
+        self._counter = 0
+        self.writes = []
+
+    def insert(self, parent, index, **options):
+        self._counter += 1
+        node_id = "I%03d" % self._counter
+        self._nodes[node_id] = {"values": {}, "children": (), "options": dict(options)}
+        self._nodes[parent]["children"] += (node_id,)
+        self.writes.append(("insert", node_id))
+        return node_id
+
+    def set(self, node_id, column, value=None):
+        if value is None:
+            return self._nodes[node_id]["values"].get(column, "")
+        self._nodes[node_id]["values"][column] = value
+        self.writes.append(("set", node_id, column))
+
+    def item(self, node_id, option=None, **options):
+        if option is not None:
+            return self._nodes[node_id]["options"].get(option, "")
+        self._nodes[node_id]["options"].update(options)
+        self.writes.append(("item", node_id))
+
+    def get_children(self, node_id):
+        return self._nodes[node_id]["children"]
+
+    def set_children(self, node_id, *children):
+        self._nodes[node_id]["children"] = children
+        self.writes.append(("set_children", node_id))
+
+    def delete(self, *node_ids):
+        for node_id in node_ids:
+            del self._nodes[node_id]
+
+
+def _create_browser(cls, tree=None):
+    # only the parts not needing Tk
+    browser = object.__new__(cls)
+    browser.show_expand_buttons = True
+    browser._cached_child_data = {}
+    browser._rendered_child_data = {}
+    browser._listing_times = {}
+    browser._watcher = None
+    browser.dir_separator = "/"
+    browser.tree = tree
+    browser.folder_icon = browser.python_file_icon = "icon"
+    return browser
+
+
+def test_parent_and_name_with_remote_separator():
+    browser = _create_browser(BaseRemoteFileBrowser)
+    assert browser.get_parent_and_name("/lib/util.py") == ("/lib", "util.py")
+    assert browser.get_parent_and_name("/main.py") == ("/", "main.py")
+    assert browser.get_parent_and_name("main.py") == ("", "main.py")
+
+    browser.cache_dirs_child_data(
+        {"/": {"lib": {"size": None}, "main.py": {"size": 3}}, "/lib": {"util.py": {"size": 5}}}
+    )
+    assert browser._cached_child_data["/"]["lib"] == {"size": None, "label": "lib", "isdir": True}
+    assert browser.file_exists_in_cache("/main.py")
+    assert browser.file_exists_in_cache("/lib/util.py")
+    assert not browser.file_exists_in_cache("/lib/main.py")
+    assert not browser.file_exists_in_cache("/other/util.py")
+
+
+def test_parent_and_name_with_local_separator(tmp_path):
+    browser = _create_browser(BaseLocalFileBrowser)
+    parent = str(tmp_path)
+    path = os.path.join(parent, "prog.py")
+    assert browser.get_parent_and_name(path) == (parent, "prog.py")
+
+    browser.cache_dirs_child_data({parent: {"prog.py": {"size": 1}}})
+    assert browser.file_exists_in_cache(path)
+    assert not browser.file_exists_in_cache(os.path.join(parent, "other.py"))
+
+
+def test_local_changed_paths_are_detected_by_mtime(tmp_path):
+    browser = _create_browser(BaseLocalFileBrowser)
+    stable_dir = str(tmp_path / "stable")
+    recent_dir = str(tmp_path / "recent")
+    modified_dir = str(tmp_path / "modified")
+    missing_dir = str(tmp_path / "missing")
+    for path in [stable_dir, recent_dir, modified_dir]:
+        os.mkdir(path)
+        os.utime(path, (1000, 1000))
+
+    browser._listing_times = {
+        stable_dir: (1000, 1000 + MTIME_GRANULARITY),
+        # listed during the same mtime tick as the last modification
+        recent_dir: (1000, 1000 + MTIME_GRANULARITY / 2),
+        modified_dir: (900, 1000 + MTIME_GRANULARITY),
+        missing_dir: (1000, 1000 + MTIME_GRANULARITY),
+    }
+    not_listed_dir = str(tmp_path)
+
+    paths = ["", stable_dir, recent_dir, modified_dir, missing_dir, not_listed_dir]
+    assert browser.get_changed_paths(paths) == {
+        recent_dir,
+        modified_dir,
+        missing_dir,
+        not_listed_dir,
+    }
+
+
+def test_rendering_rewrites_only_changed_nodes():
+    tree = FakeTree("/")
+    browser = _create_browser(BaseRemoteFileBrowser, tree)
+
+    def render(data):
+        tree.writes.clear()
+        browser.cache_dirs_child_data({"/": data})
+        browser.render_children_from_cache()
+        return tree.writes
+
+    assert render({"a.py": {"size": 1}, "b.py": {"size": 2}, "lib": {"size": None}})
+    lib_id, a_id, b_id = tree.get_children("")
+    assert [tree.set(node_id, "path") for node_id in (lib_id, a_id, b_id)] == [
+        "/lib",
+        "/a.py",
+        "/b.py",
+    ]
+
+    # new listing with same content
+    assert render({"a.py": {"size": 1}, "b.py": {"size": 2}, "lib": {"size": None}}) == []
+
+    writes = render({"a.py": {"size": 1}, "b.py": {"size": 3}, "lib": {"size": None}})
+    assert writes and {write[1] for write in writes} == {b_id}
+    assert tree.set(b_id, "size") == 3
+
+    # removed and added children change the list of children
+    writes = render({"a.py": {"size": 1}, "b.py": {"size": 3}, "c.py": {"size": 3}})
+    assert tree.get_children("")[:2] == (a_id, b_id)
+    c_id = tree.get_children("")[2]
+    assert c_id not in (lib_id, a_id, b_id)
+    assert {write[1] for write in writes} == {"", c_id}
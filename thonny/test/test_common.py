@@ -1,6 +1,6 @@
 import os
 
-from thonny.common import path_startswith
+from thonny.common import apply_text_edit, compute_text_edit, path_startswith
 
 
 def test_path_startswith():
@@ -31,3 +31,15 @@ def test_path_startswith():
         assert path_startswith("c:\\foo\\bar.txt/kala\\pala", "C:\\")
 
         assert not path_startswith("C:\\kalapala\\pala", "C:\\kala")
+
+
+def test_compute_text_edit():
+    old = "def f():\n    return 1\n"
+    new = "def f():\n    return 42\n"
+    edit = compute_text_edit(old, new)
+    assert edit == (len("def f():\n    return "), len("def f():\n    return 1"), "42")
+    assert apply_text_edit(old, edit) == new
+
+    assert compute_text_edit("aaa", "aaaa") == (3, 3, "a")
+    assert compute_text_edit("abc", "abc") == (3, 3, "")
+    assert apply_text_edit("", compute_text_edit("", "xyz")) == "xyz"
@@ -0,0 +1,40 @@
+import os.path
+
+from thonny.config import ConfigurationManager
+
+
+def test_cached_options_follow_changes(tmp_path):
+    filename = os.path.join(str(tmp_path), "configuration.ini")
+    with open(filename, "w", encoding="UTF-8") as fp:
+        fp.write("[view]\nfont_size = 12\nfont_family = 13\n\n[general]\nlanguage = 'et'\n")
+
+    conf = ConfigurationManager(filename)
+    conf.set_default("view.font_size", 10)
+    conf.set_default("view.font_family", "Courier")
+    conf.set_default("general.language", "en")
+
+    assert conf.get_option("view.font_size") == 12
+    # type of the default decides whether the value gets parsed
+    assert conf.get_option("view.font_family") == "13"
+    assert conf.get_option("language") == conf.get_option("general.language") == "'et'"
+    assert conf.get_option("view.missing", 5) == 5
+
+    changes = []
+    conf.add_option_listener("view.font_size", changes.append)
+    conf.set_option("view.font_size", 14)
+    conf.set_option("view.font_size", 14)
+    conf.set_option("general.language", "fi")
+    assert conf.get_option("view.font_size") == 14
+    assert conf.get_option("language") == "fi"
+    assert changes == [14]
+
+    conf.remove_option_listener("view.font_size", changes.append)
+    conf.set_option("view.font_size", 16)
+    assert changes == [14]
+
+
+def test_mutable_values_are_not_shared(tmp_path):
+    conf = ConfigurationManager(os.path.join(str(tmp_path), "configuration.ini"))
+    conf.set_option("general.recent_files", ["a.py"])
+    conf.get_option("general.recent_files").append("b.py")
+    assert conf.get_option("general.recent_files") == ["a.py"]
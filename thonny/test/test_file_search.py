@@ -0,0 +1,56 @@
+import os
+import re
+
+from thonny.file_search import FileSearch, TrigramIndex, normalize_newlines, restore_newlines
+
+
+def _search(root, index, literal, pattern):
+    search = FileSearch(str(root), pattern, literal, index, use_processes=False)
+    search.start()
+    hits = {}
+    while True:
+        item = search.queue.get(timeout=10)
+        if item[0] == "hits":
+            hits[os.path.basename(item[1])] = item[2]
+        elif item[0] == "done":
+            return hits, item[1]
+
+
+def test_search_uses_index_for_unchanged_files(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "a.py").write_text("x = 1\nprint('Hello')\n")
+    (root / "b.py").write_text("y = 2\n")
+    (root / "notes.bin").write_text("Hello")
+    index = TrigramIndex(str(tmp_path / "index.pickle"))
+    pattern = re.compile("hello", re.IGNORECASE)
+
+    hits, summary = _search(root, index, "hello", pattern)
+    assert hits == {"a.py": [(2, 7, 12, "print('Hello')")]}
+    assert summary["indexed_files"] == 2
+
+    # index is persisted and the file without the trigrams doesn't get scanned
+    index = TrigramIndex(str(tmp_path / "index.pickle"))
+    hits, summary = _search(root, index, "hello", pattern)
+    assert list(hits) == ["a.py"]
+    assert summary["scanned_files"] == 1
+    assert summary["indexed_files"] == 0
+
+    # changed file gets re-indexed
+    (root / "b.py").write_text("y = 2\nhello = 3\n")
+    hits, summary = _search(root, index, "hello", pattern)
+    assert sorted(hits) == ["a.py", "b.py"]
+    assert summary["indexed_files"] == 1
+
+
+def test_replacements_keep_windows_line_endings():
+    original = "foo \r\nbar\r\nfoo\n"
+    source = normalize_newlines(original)
+    pattern = re.compile(r"foo *$", re.MULTILINE)
+    replacements = [(m.start(), m.end(), "x\ny") for m in pattern.finditer(source)]
+    assert len(replacements) == 2
+
+    result = original
+    for start, end, fragment in reversed(restore_newlines(original, replacements)):
+        result = result[:start] + fragment + result[end:]
+    assert result == "x\r\ny\r\nbar\r\nx\r\ny\n"
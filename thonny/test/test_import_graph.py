@@ -0,0 +1,63 @@
+import os.path
+import time
+
+from thonny.import_graph import ImportGraph
+
+
+def _write(root, relative_path, content):
+    path = os.path.join(root, *relative_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="UTF-8") as fp:
+        fp.write(content)
+    return path
+
+
+def test_dependencies_are_found_recursively(tmp_path):
+    root = str(tmp_path)
+    main = _write(root, "prog.py", "import os\nimport pkg.sub\nfrom helper import *\n")
+    helper = _write(root, "helper.py", "x = 1\n")
+    pkg_init = _write(root, "pkg/__init__.py", "from . import util\n")
+    sub = _write(root, "pkg/sub.py", "from .inner import deep\n")
+    util = _write(root, "pkg/util.py", "from ..helper import x\n")
+    inner_init = _write(root, "pkg/inner/__init__.py", "")
+    deep = _write(root, "pkg/inner/deep.py", "import prog\n")
+    _write(root, "unused.py", "")
+
+    graph = ImportGraph()
+    assert graph.get_imported_files(main, root) == {helper, pkg_init, sub}
+    assert graph.get_dependencies(main) == {helper, pkg_init, sub, util, inner_init, deep}
+
+    # changes are noticed
+    _write(root, "helper.py", "import unused\n")
+    assert os.path.join(root, "unused.py") in graph.get_dependencies(main)
+
+
+def test_unchanged_content_is_not_parsed_again(tmp_path):
+    path = _write(str(tmp_path), "prog.py", "import helper\n")
+    graph = ImportGraph()
+    digest = graph.get_digest(path)
+    imports = graph._entries[path][3]
+
+    os.utime(path, (1, 1))
+    assert graph.get_digest(path) == digest
+    assert graph._entries[path][3] is imports
+
+    os.remove(path)
+    assert graph.get_digest(path) is None
+    assert graph.get_dependencies(path) == set()
+
+
+def test_recently_modified_file_is_hashed_again(tmp_path):
+    path = _write(str(tmp_path), "prog.py", "import a\n")
+    mtime = time.time()
+    os.utime(path, (mtime, mtime))
+    graph = ImportGraph()
+    digest = graph.get_digest(path)
+
+    # same size and (coarse) mtime
+    _write(str(tmp_path), "prog.py", "import b\n")
+    os.utime(path, (mtime, mtime))
+    assert graph.get_digest(path) != digest
+    assert graph.get_imported_files(path, str(tmp_path)) == set()
+    _write(str(tmp_path), "b.py", "")
+    assert graph.get_imported_files(path, str(tmp_path)) == {os.path.join(str(tmp_path), "b.py")}
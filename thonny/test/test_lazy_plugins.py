@@ -0,0 +1,16 @@
+import importlib
+import inspect
+
+from thonny.plugins import LAZY_PLUGINS
+
+
+def test_manifest_matches_plugins():
+    for module_name, manifest in LAZY_PLUGINS.items():
+        m = importlib.import_module(module_name)
+        source = inspect.getsource(m.load_plugin)
+        for view_spec in manifest.get("views", []):
+            assert inspect.isclass(getattr(m, view_spec["view_id"]))
+            assert view_spec["view_id"] in source
+        for command_spec in manifest.get("commands", []):
+            assert '"%s"' % command_spec["command_id"] in source
+            assert '"%s"' % command_spec["command_label"] in source
@@ -0,0 +1,132 @@
+import gzip
+import json
+import os.path
+
+from thonny.replay import (
+    EventLogIndex,
+    TextDocument,
+    analyze_log,
+    analyze_logs,
+    main,
+    read_log_events,
+)
+
+EVENTS = [
+    {"sequence": "TextInsert", "time": "2020-01-01T10:00:%02d.5" % i, "index": "1.%d" % i}
+    for i in range(50)
+]
+
+
+def test_index_supports_all_formats(tmp_path):
+    lines = "".join(json.dumps(event) + "\n" for event in EVENTS)
+    paths = {
+        "plain": os.path.join(str(tmp_path), "log.jsonl"),
+        "gzipped": os.path.join(str(tmp_path), "log.jsonl.gz"),
+        "old": os.path.join(str(tmp_path), "log.txt"),
+        "crashed": os.path.join(str(tmp_path), "crashed.jsonl"),
+    }
+    with open(paths["plain"], "w", encoding="UTF-8") as fp:
+        fp.write(lines)
+    with gzip.open(paths["gzipped"], "wt", encoding="UTF-8") as fp:
+        fp.write(lines)
+    with open(paths["old"], "w", encoding="UTF-8") as fp:
+        json.dump(EVENTS, fp, indent="    ")
+    with open(paths["crashed"], "w", encoding="UTF-8") as fp:
+        fp.write(lines + json.dumps(EVENTS[0])[:10])
+
+    for path in paths.values():
+        assert list(read_log_events(path)) == EVENTS
+
+        index = EventLogIndex(path)
+        assert len(index) == len(EVENTS)
+        for i in [49, 0, 17, 17, 48]:
+            assert index.get_event(i) == EVENTS[i]
+        assert (index.get_time(3) - index.get_time(1)).seconds == 2
+        index.close()
+
+
+def test_text_document_follows_tk_semantics():
+    doc = TextDocument()
+    doc.insert("1.0", "print(1)\nx = 2")
+    doc.insert("5.0", "\n")  # beyond end goes to the end
+    doc.insert("2.5", "22")
+    assert doc.get_text() == "print(1)\nx = 222\n"
+
+    assert doc.delete("1.8") == 1  # joins lines
+    assert doc.get_text() == "print(1)x = 222\n"
+    assert doc.delete("1.5", "1.99") == 10
+    assert doc.get_text() == "print\n"
+    assert doc.delete("2.0") == 0  # final newline stays
+
+
+def _event(second, sequence, **kw):
+    kw.update(sequence=sequence, time="2020-01-01T10:%02d:%02d.0" % divmod(second, 60))
+    return kw
+
+
+def test_analyze_log(tmp_path):
+    events = [
+        _event(0, "Open", text_widget_id=1, filename="/home/a/prog.py"),
+        _event(1, "TextInsert", text_widget_id=1, index="1.0", text="x = 1\n"),
+        _event(2, "TextInsert", text_widget_id=2, index="1.0", text="y"),
+        _event(3, "TextDelete", text_widget_id=1, index1="1.4", index2="None"),
+        _event(4, "MagicCommand", cmd_line="%Run prog.py"),
+        _event(
+            5, "TextInsert", text_widget_id=3, text_widget_context="shell", index="2.0", text="1"
+        ),
+        _event(6, "ShellCommand", command_text="1"),
+        # long pause is not counted
+        _event(1000, "TextInsert", text_widget_id=1, index="1.4", text="2"),
+        _event(1001, "Save", text_widget_id=1, filename="/home/a/prog.py"),
+        _event(1002, "MagicCommand", cmd_line="%Debug prog.py"),
+    ]
+    log_path = os.path.join(str(tmp_path), "2020_01_01_10_00_00.jsonl")
+    with open(log_path, "w", encoding="UTF-8") as fp:
+        fp.write("".join(json.dumps(event) + "\n" for event in events))
+
+    contents_dir = os.path.join(str(tmp_path), "contents")
+    summary = analyze_log(log_path, contents_dir, contents_at_runs=True)
+    assert summary["event_count"] == 10
+    assert summary["time_on_task"] == 6 + 300 + 2
+    assert summary["edit_count"] == 4
+    assert (summary["inserted_chars"], summary["deleted_chars"]) == (8, 1)
+    assert (summary["run_count"], summary["debug_count"]) == (1, 1)
+    assert (summary["shell_command_count"], summary["save_count"]) == (1, 1)
+    assert summary["files"] == "prog.py"
+
+    log_contents_dir = os.path.join(contents_dir, "2020_01_01_10_00_00")
+    with open(os.path.join(log_contents_dir, "run_001", "prog.py"), encoding="UTF-8") as fp:
+        assert fp.read() == "x = \n"
+    with open(os.path.join(log_contents_dir, "final", "prog.py"), encoding="UTF-8") as fp:
+        assert fp.read() == "x = 2\n"
+    with open(os.path.join(log_contents_dir, "final", "untitled_2.py"), encoding="UTF-8") as fp:
+        assert fp.read() == "y"
+
+    summary_path = os.path.join(str(tmp_path), "summary.csv")
+    assert main(["--jobs", "1", "--output", summary_path, str(tmp_path)]) == 0
+    with open(summary_path, encoding="UTF-8") as fp:
+        assert fp.read().splitlines()[1].startswith(log_path + ",")
+
+
+def test_contents_of_same_named_logs_are_kept_apart(tmp_path):
+    paths = []
+    for student in ["alice", "bob"]:
+        events = [
+            _event(0, "Open", text_widget_id=1, filename="/home/a/prog.py"),
+            _event(1, "Open", text_widget_id=2, filename="/home/b/prog.py"),
+            _event(2, "TextInsert", text_widget_id=1, index="1.0", text=student),
+            _event(3, "TextInsert", text_widget_id=2, index="1.0", text="other"),
+        ]
+        os.makedirs(os.path.join(str(tmp_path), "logs", student))
+        path = os.path.join(str(tmp_path), "logs", student, "2020_01_01_10_00_00.jsonl")
+        with open(path, "w", encoding="UTF-8") as fp:
+            fp.write("".join(json.dumps(event) + "\n" for event in events))
+        paths.append(path)
+
+    contents_dir = os.path.join(str(tmp_path), "contents")
+    assert len(analyze_logs(paths, contents_dir, jobs=1)) == 2
+    for student in ["alice", "bob"]:
+        final_dir = os.path.join(contents_dir, student, "2020_01_01_10_00_00", "final")
+        assert sorted(os.listdir(final_dir)) == ["prog.py", "prog_2.py"]
+        with open(os.path.join(final_dir, "prog.py"), encoding="UTF-8") as fp:
+            assert fp.read() == student
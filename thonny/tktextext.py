@@ -8,6 +8,7 @@ from logging import exception
 from tkinter import TclError
 from tkinter import font as tkfont
 from tkinter import ttk
+from typing import Dict, List, Optional  # @UnusedImport
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,8 @@ class TweakableText(tk.Text):
 
         self._read_only = read_only
         self._suppress_events = False
+        # increased on each modification, allows caching data derived from the content
+        self._content_version = 0
 
         self._original_widget_name = self._w + "_orig"
         self.tk.call("rename", self._w, self._original_widget_name)
@@ -158,17 +161,76 @@ class TweakableText(tk.Text):
         else:
             return None, None
 
+    def get_content_version(self):
+        return self._content_version
+
+    def tag_batch(self) -> "TagBatch":
+        """Returns a collector of tag changes, which sends the changes to Tk
+        in one call per tag and operation. Meant to be used in a with-block."""
+        return TagBatch(self)
+
     def direct_insert(self, index, chars, tags=None, **kw):
         self._original_insert(index, chars, tags, **kw)
+        self._content_version += 1
         if not self._suppress_events:
             self.event_generate("<<TextChange>>")
 
     def direct_delete(self, index1, index2=None, **kw):
         self._original_delete(index1, index2, **kw)
+        self._content_version += 1
         if not self._suppress_events:
             self.event_generate("<<TextChange>>")
 
 
+class TagBatch:
+    """Collects tag additions and removals for a text widget and applies each tag's
+    ranges with a single multi-range "tag add" or "tag remove" call.
+
+    Indices should be absolute ("line.col"), so that Tk doesn't need to evaluate
+    expressions. All removals are applied before additions."""
+
+    def __init__(self, text: tk.Text):
+        self._text = text
+        # TweakableText's own command would only forward these calls
+        self._widget_name = getattr(text, "_original_widget_name", text._w)
+        self._additions = {}  # type: Dict[str, List[str]]
+        self._removals = {}  # type: Dict[str, List[str]]
+
+    def add(self, tag: str, start: str, end: Optional[str] = None) -> None:
+        if end is None:
+            end = _next_char_index(start)
+        indices = self._additions.setdefault(tag, [])
+        indices.append(start)
+        indices.append(end)
+
+    def remove(self, tag: str, start: str = "1.0", end: str = "end") -> None:
+        indices = self._removals.setdefault(tag, [])
+        indices.append(start)
+        indices.append(end)
+
+    def flush(self) -> None:
+        for operation, ranges in [("remove", self._removals), ("add", self._additions)]:
+            for tag, indices in ranges.items():
+                if indices:
+                    self._text.tk.call(self._widget_name, "tag", operation, tag, *indices)
+            ranges.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+
+
+def _next_char_index(index):
+    line, _, col = index.partition(".")
+    if line.isdigit() and col.isdigit():
+        return "%s.%d" % (line, int(col) + 1)
+    else:
+        return index + "+1c"
+
+
 class EnhancedText(TweakableText):
     """Text widget with extra navigation and editing aids.
     Provides more comfortable deletion, indentation and deindentation,
@@ -876,37 +938,32 @@ class EnhancedTextFrame(TextFrame):
 
         self._recommended_line_length = line_length_margin
 
-        self._gutter = tk.Text(
+        # Only visible line numbers are drawn, at the positions reported by the text
+        self._gutter = tk.Canvas(
             self,
-            width=5,
-            padx=0,
-            pady=5,
+            width=1,
+            height=1,
             highlightthickness=0,
             bd=0,
             takefocus=False,
-            font=self.text["font"],
-            background="#e0e0e0",
-            foreground=gutter_foreground,
-            selectbackground=gutter_background,
-            selectforeground=gutter_foreground,
+            background=gutter_background,
             cursor="arrow",
-            state="disabled",
-            undo=False,
-            wrap="none",
         )
-
-        if "height" in text_options:
-            self._gutter.configure(height=text_options["height"])
+        self._gutter_foreground = gutter_foreground
+        self._gutter_font = self.text["font"]
+        # font and foreground for tags of gutter line pieces
+        self._gutter_tag_options = {}  # type: Dict[str, Dict[str, str]]
+        self._gutter_update_scheduled = False
+        self._gutter_line_count = None
+        self._gutter_active_line = None
+        self._gutter_selection_start = None
 
         self._gutter_is_gridded = False
         self._gutter.bind("<Double-Button-1>", self.on_gutter_double_click, True)
         self._gutter.bind("<ButtonRelease-1>", self.on_gutter_click, True)
         self._gutter.bind("<Button-1>", self.on_gutter_click, True)
         self._gutter.bind("<Button1-Motion>", self.on_gutter_motion, True)
-        self._gutter["yscrollcommand"] = self._gutter_scroll
-
-        # need tags for justifying and rmargin
-        self._gutter.tag_configure("content", justify="right", rmargin=3)
+        self.text.bind("<Configure>", self._schedule_gutter_update, True)
 
         # gutter will be gridded later
         assert first_line_number is not None
@@ -939,95 +996,101 @@ class EnhancedTextFrame(TextFrame):
         else:
             return
 
-        """
-        # insert first line number (NB! Without trailing linebreak. See update_gutter)
-        self._gutter.config(state="normal")
-        self._gutter.delete("1.0", "end")
-        for content, tags in self.compute_gutter_line(self._first_line_number):
-            self._gutter.insert("end", content, ("content",) + tags)
-        self._gutter.config(state="disabled")
-        """
-        self.update_gutter(True)
+        self.update_gutter()
 
     def set_line_length_margin(self, value):
         self._recommended_line_length = value
         self.update_margin_line()
 
-    def _gutter_scroll(self, *args):
-        if not hasattr(self, "_vbar"):
-            return
-
-        try:
-            self._vbar.set(*args)
-            self.text.yview(tk.MOVETO, args[0])
-        except TclError:
-            pass
+    def gutter_tag_configure(self, tag, **options):
+        """Sets font and/or foreground for gutter line pieces with given tag"""
+        tag_options = self._gutter_tag_options.setdefault(tag, {})
+        if "font" in options:
+            tag_options["font"] = options["font"]
+        if "foreground" in options:
+            tag_options["fill"] = options["foreground"]
+        self._schedule_gutter_update()
+
+    def configure_gutter(self, **options):
+        if "background" in options:
+            self._gutter.configure(background=options["background"])
+        if "foreground" in options:
+            self._gutter_foreground = options["foreground"]
+        if "font" in options:
+            self._gutter_font = options["font"]
+        self._schedule_gutter_update()
 
     def _text_changed(self, event):
-        self.update_gutter()
+        line_count = self._get_text_line_count()
+        if line_count != self._gutter_line_count:
+            self._gutter_line_count = line_count
+            self._schedule_gutter_update()
 
     def _cursor_moved(self, event):
-        self._update_gutter_active_line()
+        if self._get_insert_line() != self._gutter_active_line:
+            self._schedule_gutter_update()
 
-    def update_gutter(self, clean=False):
-        if clean:
-            self._gutter.config(state="normal")
-            self._gutter.delete("1.0", "end")
-            # need to add first item separately, because Text can't report 0 rows
-            for content, tags in self.compute_gutter_line(self._first_line_number):
-                self._gutter.insert("end-1c", content, tags + ("content",))
-
-            self._gutter.config(state="disabled")
-
-        text_line_count = int(self.text.index("end").split(".")[0])
-        gutter_line_count = int(self._gutter.index("end").split(".")[0])
-
-        if text_line_count != gutter_line_count:
-            self._gutter.config(state="normal")
-
-            # NB! Text acts weird with last symbol
-            # (don't really understand whether it automatically keeps a newline there or not)
-            # Following seems to ensure both Text-s have same height
-            if text_line_count > gutter_line_count:
-                delta = text_line_count - gutter_line_count
-                start = gutter_line_count + self._first_line_number - 1
-
-                if not clean and text_line_count > 10 and gutter_line_count < 3:
-                    # probably initial load, do bulk insert
-                    parts = []
-                    for i in range(start, start + delta):
-                        parts.append("\n")
-                        for content, tags in self.compute_gutter_line(i, plain=True):
-                            parts.append(content)
-
-                    self._gutter.insert("end-1c", "".join(parts), ("content",) + tags)
-                else:
-                    for i in range(start, start + delta):
-                        self._gutter.insert("end-1c", "\n", ("content",))
-                        for content, tags in self.compute_gutter_line(i):
-                            self._gutter.insert("end-1c", content, ("content",) + tags)
-            else:
-                self._gutter.delete(line2index(text_line_count) + "-1c", "end-1c")
+    def _get_text_line_count(self):
+        return int(self.text.index("end-1c").split(".")[0])
 
-            self._gutter.config(state="disabled")
+    def _get_insert_line(self):
+        return int(self.text.index("insert").split(".")[0])
 
-        # synchronize gutter scroll position with text
-        # https://mail.python.org/pipermail/tkinter-discuss/2010-March/002197.html
-        first, _ = self.text.yview()
-        self._gutter.yview_moveto(first)
-        self._update_gutter_active_line()
+    def _schedule_gutter_update(self, event=None):
+        if not self._gutter_update_scheduled and self._gutter_is_gridded:
+            self._gutter_update_scheduled = True
+            self.after_idle(self.update_gutter)
 
-        if text_line_count > 9998:
-            self._gutter.configure(width=7)
-        elif text_line_count > 998:
-            self._gutter.configure(width=6)
-
-    def _update_gutter_active_line(self):
-        self._gutter.tag_remove("active", "1.0", "end")
-        insert = self.text.index("insert")
-        self._gutter.tag_add("active", insert + " linestart", insert + " lineend")
+    def update_gutter(self, clean=False):
+        """Redraws line numbers for visible lines.
+        (clean is not needed anymore, as the gutter is always redrawn completely)"""
+        self._gutter_update_scheduled = False
+        if not self._gutter_is_gridded:
+            return
 
-    def compute_gutter_line(self, lineno, plain=False):
+        try:
+            self._gutter.delete("all")
+            line_count = self._get_text_line_count()
+            self._gutter_line_count = line_count
+            self._gutter_active_line = self._get_insert_line()
+
+            last_number = line_count + self._first_line_number - 1
+            # room for the digits and the breakpoint marker
+            width = self._measure_gutter_text("0" * (max(len(str(last_number)), 3) + 1)) + 8
+            if int(self._gutter.cget("width")) != width:
+                self._gutter.configure(width=width)
+            descent = int(self.tk.call("font", "metrics", self._gutter_font, "-descent"))
+
+            first_visible = int(self.text.index("@0,0").split(".")[0])
+            last_visible = int(self.text.index("@0,%d" % self.text.winfo_height()).split(".")[0])
+            for line in range(first_visible, last_visible + 1):
+                info = self.text.dlineinfo("%d.0" % line)
+                if info is None:
+                    continue
+                _, y, _, _, baseline = info
+                self._draw_gutter_line(line, y + baseline + descent, width - 3)
+        except TclError:
+            logger.exception("Could not update gutter")
+
+    def _measure_gutter_text(self, s):
+        return int(self.tk.call("font", "measure", self._gutter_font, s))
+
+    def _draw_gutter_line(self, line, bottom_y, right_x):
+        extra_tags = ("active",) if line == self._gutter_active_line else ()
+        pieces = list(self.compute_gutter_line(line + self._first_line_number - 1))
+        # pieces are drawn from right to left
+        x = right_x
+        for i, (content, tags) in enumerate(reversed(pieces)):
+            options = {"font": self._gutter_font, "fill": self._gutter_foreground}
+            for tag in tags + extra_tags:
+                options.update(self._gutter_tag_options.get(tag, {}))
+
+            item = self._gutter.create_text(x, bottom_y, text=content, anchor="se", **options)
+            if i < len(pieces) - 1:
+                x = self._gutter.bbox(item)[0]
+
+    def compute_gutter_line(self, lineno):
+        """Yields pieces (content and tags) for the gutter of the line with given number"""
         yield str(lineno), ()
 
     def update_margin_line(self):
@@ -1062,11 +1125,14 @@ class EnhancedTextFrame(TextFrame):
 
             self._margin_line.place(y=-10, x=x)
 
+    def _get_gutter_event_line(self, event):
+        return int(self.text.index("@0,%d" % event.y).split(".")[0])
+
     def on_gutter_click(self, event=None):
         try:
-            linepos = self._gutter.index("@%s,%s" % (event.x, event.y)).split(".")[0]
+            linepos = self._get_gutter_event_line(event)
             self.text.mark_set("insert", "%s.0" % linepos)
-            self._gutter.mark_set("gutter_selection_start", "%s.0" % linepos)
+            self._gutter_selection_start = linepos
             if (
                 event.type == "4"
             ):  # In Python 3.6 you can use tk.EventType.ButtonPress instead of "4"
@@ -1076,18 +1142,17 @@ class EnhancedTextFrame(TextFrame):
 
     def on_gutter_double_click(self, event=None):
         try:
-            self._gutter.mark_unset("gutter_selection_start")
+            self._gutter_selection_start = None
             self.text.tag_remove("sel", "1.0", "end")
-            self._gutter.tag_remove("sel", "1.0", "end")
         except tk.TclError:
             exception("on_gutter_click")
 
     def on_gutter_motion(self, event=None):
         try:
-            if "gutter_selection_start" not in self._gutter.mark_names():
+            if self._gutter_selection_start is None:
                 return
-            linepos = int(self._gutter.index("@%s,%s" % (event.x, event.y)).split(".")[0])
-            gutter_selection_start = int(self._gutter.index("gutter_selection_start").split(".")[0])
+            linepos = self._get_gutter_event_line(event)
+            gutter_selection_start = self._gutter_selection_start
             self.text.select_lines(
                 min(gutter_selection_start, linepos), max(gutter_selection_start - 1, linepos - 1)
             )
@@ -1101,7 +1166,7 @@ class EnhancedTextFrame(TextFrame):
             return
 
         super()._vertical_scrollbar_update(*args)
-        self._gutter.yview(tk.MOVETO, args[0])
+        self._schedule_gutter_update()
 
     def _horizontal_scrollbar_update(self, *args):
         super()._horizontal_scrollbar_update(*args)
@@ -1109,7 +1174,7 @@ class EnhancedTextFrame(TextFrame):
 
     def _vertical_scroll(self, *args):
         super()._vertical_scroll(*args)
-        self._gutter.yview(*args)
+        self._schedule_gutter_update()
 
     def _horizontal_scroll(self, *args):
         super()._horizontal_scroll(*args)
@@ -1125,12 +1190,12 @@ class EnhancedTextFrame(TextFrame):
         style = ttk.Style()
         background = style.lookup("GUTTER", "background")
         if background:
-            self._gutter.configure(background=background, selectbackground=background)
+            self.configure_gutter(background=background)
             self._margin_line.configure(background=background)
 
         foreground = style.lookup("GUTTER", "foreground")
         if foreground:
-            self._gutter.configure(foreground=foreground, selectforeground=foreground)
+            self.configure_gutter(foreground=foreground)
 
 
 def get_text_font(text):
@@ -12,6 +12,7 @@ import re
 import shutil
 import socket
 import sys
+import time
 import tkinter as tk
 import tkinter.font as tk_font
 import traceback
@@ -45,7 +46,7 @@ from thonny.misc_utils import (
 )
 from thonny.plugins.microbit import MicrobitFlashingDialog
 from thonny.plugins.micropython.uf2dialog import Uf2FlashingDialog
-from thonny.running import BackendProxy, Runner
+from thonny.running import BackendProxy, Runner, discard_warm_processes
 from thonny.shell import ShellView
 from thonny.ui_utils import (
     AutomaticNotebook,
@@ -64,6 +65,9 @@ logger = logging.getLogger(__name__)
 
 SERVER_SUCCESS = "OK"
 SIMPLE_MODE_VIEWS = ["ShellView"]
+# Frequent events which can't change the state of toolbar buttons
+# (editor's modified state is followed via <<Modified>>)
+TOOLBAR_NEUTRAL_EVENTS = {"TextInsert", "TextDelete", "ProgramOutput"}
 
 MenuItem = collections.namedtuple("MenuItem", ["group", "position_in_group", "tester"])
 BackendSpec = collections.namedtuple(
@@ -115,6 +119,11 @@ class Workbench(tk.Tk):
 
     def __init__(self) -> None:
         thonny._workbench = self
+        self._start_time = time.perf_counter()
+        self._profile_startup = "--profile-startup" in sys.argv
+        # module name -> [import duration, load_plugin duration]
+        self._plugin_timings = {}  # type: Dict[str, List[float]]
+        self._loaded_lazy_plugins = set()  # type: Set[str]
         self.ready = False
         self._closing = False
         self._destroyed = False
@@ -129,7 +138,13 @@ class Workbench(tk.Tk):
         tk.Tk.__init__(self, className="Thonny")
         tk.Tk.report_callback_exception = self._on_tk_exception  # type: ignore
         ui_utils.add_messagebox_parent_checker()
-        self._event_handlers = {}  # type: Dict[str, Set[Callable]]
+        # Handlers are kept sorted by str (for deterministic order). The lists are replaced
+        # (not modified) on bind and unbind, so that dispatching can iterate over them
+        # without copying
+        self._event_handlers = {}  # type: Dict[str, List[Callable]]
+        # sequence -> [count, total duration in seconds]
+        self._event_stats = {}  # type: Dict[str, List]
+        self._toolbar_update_scheduled = False
         self._images = (
             set()
         )  # type: Set[tk.PhotoImage] # keep images here to avoid Python garbage collecting them,
@@ -142,6 +157,8 @@ class Workbench(tk.Tk):
         self._current_theme_name = "clam"  # will be overwritten later
         self._backends = {}  # type: Dict[str, BackendSpec]
         self._commands = []  # type: List[Dict[str, Any]]
+        # placeholders of the commands of lazy plug-ins (see thonny.plugins.LAZY_PLUGINS)
+        self._lazy_commands = {}  # type: Dict[str, Dict[str, Any]]
         self._toolbar_buttons = {}
         self._view_records = {}  # type: Dict[str, Dict[str, Any]]
         self.content_inspector_classes = []  # type: List[Type]
@@ -203,6 +220,8 @@ class Workbench(tk.Tk):
 
         self._publish_commands()
         self.initializing = False
+        if self._profile_startup:
+            self._print_startup_profile()
         self.event_generate("<<WorkbenchInitialized>>")
         self._make_sanity_checks()
         if self._is_server():
@@ -380,15 +399,19 @@ class Workbench(tk.Tk):
             self._load_plugins_from_path(thonnycontrib.__path__, "thonnycontrib.")
 
     def _load_plugins_from_path(self, path: List[str], prefix: str) -> None:
+        from thonny.plugins import LAZY_PLUGINS
+
         load_function_name = "load_plugin"
 
         modules = []
         for _, module_name, _ in sorted(pkgutil.iter_modules(path, prefix), key=lambda x: x[2]):
             if module_name in OBSOLETE_PLUGINS:
                 logging.debug("Skipping plug-in %s", module_name)
+            elif module_name in LAZY_PLUGINS:
+                self._register_lazy_plugin(module_name, LAZY_PLUGINS[module_name])
             else:
                 try:
-                    m = importlib.import_module(module_name)
+                    m = self._import_plugin(module_name)
                     if hasattr(m, load_function_name):
                         modules.append(m)
                 except Exception:
@@ -398,7 +421,122 @@ class Workbench(tk.Tk):
             return getattr(m, "load_order_key", m.__name__)
 
         for m in sorted(modules, key=module_sort_key):
-            getattr(m, load_function_name)()
+            self._call_load_plugin(m)
+
+    def _import_plugin(self, module_name: str):
+        start_time = time.perf_counter()
+        m = importlib.import_module(module_name)
+        self._plugin_timings[module_name] = [time.perf_counter() - start_time, 0.0]
+        return m
+
+    def _call_load_plugin(self, m) -> None:
+        start_time = time.perf_counter()
+        m.load_plugin()
+        self._plugin_timings[m.__name__][1] = time.perf_counter() - start_time
+
+    def _register_lazy_plugin(self, module_name: str, manifest: Dict[str, List]) -> None:
+        for view_spec in manifest.get("views", []):
+            self._add_lazy_view(module_name, **view_spec)
+        for command_spec in manifest.get("commands", []):
+            self._add_lazy_command(module_name, **command_spec)
+
+    def _load_lazy_plugin(self, module_name: str) -> None:
+        if module_name in self._loaded_lazy_plugins:
+            return
+
+        self._loaded_lazy_plugins.add(module_name)
+        try:
+            self._call_load_plugin(self._import_plugin(module_name))
+        except Exception:
+            self.report_exception("Failed loading plugin '" + module_name + "'")
+            return
+
+        if self._profile_startup:
+            print(
+                "Lazily loaded %s: import %.3f s, load_plugin %.3f s"
+                % ((module_name,) + tuple(self._plugin_timings[module_name]))
+            )
+
+    def _add_lazy_view(
+        self,
+        module_name: str,
+        view_id: str,
+        label: str,
+        default_location: str,
+        default_position_key: Optional[str] = None,
+    ) -> None:
+        def create_view(master):
+            self._load_lazy_plugin(module_name)
+            cls = self._view_records[view_id]["class"]
+            if cls is create_view:
+                raise RuntimeError("Plug-in %s didn't add view %s" % (module_name, view_id))
+            return cls(master)
+
+        create_view.__name__ = view_id
+        self.add_view(
+            create_view, tr(label), default_location, default_position_key=default_position_key
+        )
+        self._view_records[view_id]["lazy_module"] = module_name
+
+    def _add_lazy_command(
+        self,
+        module_name: str,
+        command_id: str,
+        menu_name: str,
+        command_label: str,
+        default_sequence: Union[str, Tuple[str, str], None] = None,
+        group: int = 99,
+    ) -> None:
+        # Until the plug-in is loaded, the command is assumed to be available
+        def tester():
+            actual_tester = self._lazy_commands[command_id]["tester"]
+            return actual_tester is tester or actual_tester is None or actual_tester()
+
+        def handler():
+            self._load_lazy_plugin(module_name)
+            actual_handler = self._lazy_commands[command_id]["handler"]
+            if actual_handler is handler:
+                raise RuntimeError("Plug-in %s didn't add command %s" % (module_name, command_id))
+            if tester():
+                actual_handler()
+            else:
+                self.bell()
+
+        if isinstance(default_sequence, tuple):
+            default_sequence = select_sequence(*default_sequence)
+
+        self.add_command(
+            command_id,
+            menu_name,
+            tr(command_label),
+            handler,
+            tester,
+            default_sequence=default_sequence,
+            group=group,
+        )
+        self._lazy_commands[command_id] = self._commands[-1]
+
+    def _print_startup_profile(self) -> None:
+        from thonny.plugins import LAZY_PLUGINS
+
+        print("Startup profile (seconds):")
+        print("%-45s %8s %12s" % ("plug-in", "import", "load_plugin"))
+        for module_name, (import_time, load_time) in sorted(
+            self._plugin_timings.items(), key=lambda item: -sum(item[1])
+        ):
+            print("%-45s %8.3f %12.3f" % (module_name, import_time, load_time))
+
+        print(
+            "%-45s %8.3f %12.3f"
+            % (
+                "total",
+                sum(timing[0] for timing in self._plugin_timings.values()),
+                sum(timing[1] for timing in self._plugin_timings.values()),
+            )
+        )
+        deferred = set(LAZY_PLUGINS) - self._loaded_lazy_plugins
+        print("Deferred plug-ins: " + ", ".join(sorted(deferred)))
+        print("Workbench initialization: %.3f" % (time.perf_counter() - self._start_time))
 
     def _init_fonts(self) -> None:
         # set up editor and shell fonts
@@ -925,6 +1063,11 @@ class Workbench(tk.Tk):
             None
         """
 
+        if command_id in self._lazy_commands:
+            # lazy plug-in got loaded, its placeholder starts forwarding to the actual command
+            self._lazy_commands[command_id].update(handler=handler, tester=tester)
+            return
+
         # Temporary solution for plug-ins made for versions before 3.2
         if menu_name == "device":
             menu_name = "tools"
@@ -1122,6 +1265,13 @@ class Workbench(tk.Tk):
         Returns: None
         """
         view_id = cls.__name__
+        record = self._view_records.get(view_id)
+        if record is not None and "lazy_module" in record:
+            # lazy plug-in got loaded, its views can now be created
+            record["class"] = cls
+            record["label"] = label
+            return
+
         if default_position_key == None:
             default_position_key = label
 
@@ -1507,6 +1657,13 @@ class Workbench(tk.Tk):
     def get_variable(self, name: str) -> tk.Variable:
         return self._configuration_manager.get_variable(name)
 
+    def add_option_listener(self, name: str, callback: Callable[[Any], None]) -> None:
+        """Makes callback get called with the new value whenever the option changes"""
+        self._configuration_manager.add_option_listener(name, callback)
+
+    def remove_option_listener(self, name: str, callback: Callable[[Any], None]) -> None:
+        self._configuration_manager.remove_option_listener(name, callback)
+
     def get_menu(self, name: str, label: Optional[str] = None) -> tk.Menu:
         """Gives the menu with given name. Creates if not created yet.
 
@@ -1692,23 +1849,32 @@ class Workbench(tk.Tk):
             assert event is None
             tk.Tk.event_generate(self, sequence, **kwargs)
         else:
-            if sequence in self._event_handlers:
+            handlers = self._event_handlers.get(sequence)
+            if handlers:
                 if event is None:
                     event = WorkbenchEvent(sequence, **kwargs)
                 else:
                     event.update(kwargs)
 
-                # make a copy of handlers, so that event handler can remove itself
-                # from the registry during iteration
-                # (or new handlers can be added)
-                for handler in sorted(self._event_handlers[sequence].copy(), key=str):
+                start_time = time.perf_counter()
+                for handler in handlers:
                     try:
                         handler(event)
                     except Exception:
                         self.report_exception("Problem when handling '" + sequence + "'")
 
+                stats = self._event_stats.get(sequence)
+                if stats is None:
+                    self._event_stats[sequence] = [1, time.perf_counter() - start_time]
+                else:
+                    stats[0] += 1
+                    stats[1] += time.perf_counter() - start_time
+
+            if sequence in TOOLBAR_NEUTRAL_EVENTS:
+                return
+
         if not self._closing:
-            self._update_toolbar()
+            self.schedule_toolbar_update()
 
     def bind(self, sequence: str, func: Callable, add: bool = None) -> None:  # type: ignore
         """Uses custom event handling when sequence doesn't start with <.
@@ -1725,10 +1891,9 @@ class Workbench(tk.Tk):
         if sequence.startswith("<"):
             tk.Tk.bind(self, sequence, func, add)
         else:
-            if sequence not in self._event_handlers or not add:
-                self._event_handlers[sequence] = set()
-
-            self._event_handlers[sequence].add(func)
+            handlers = self._event_handlers.get(sequence, []) if add else []
+            if func not in handlers:
+                self._event_handlers[sequence] = sorted(handlers + [func], key=str)
 
     def unbind(self, sequence: str, func=None) -> None:
         # pylint: disable=arguments-differ
@@ -1736,10 +1901,20 @@ class Workbench(tk.Tk):
             tk.Tk.unbind(self, sequence, funcid=func)
         else:
             try:
-                self._event_handlers[sequence].remove(func)
+                handlers = self._event_handlers[sequence]
+                handlers.index(func)
+                self._event_handlers[sequence] = [h for h in handlers if h != func]
             except Exception:
                 logger.exception("Can't remove binding for '%s' and '%s'", sequence, func)
 
+    def get_event_stats(self) -> Dict[str, Tuple[int, float]]:
+        """Returns the number of dispatched workbench events and the total time spent
+        in their handlers (in seconds) by event sequence"""
+        return {sequence: (stats[0], stats[1]) for sequence, stats in self._event_stats.items()}
+
+    def reset_event_stats(self) -> None:
+        self._event_stats.clear()
+
     def in_heap_mode(self) -> bool:
         # TODO: add a separate command for enabling the heap mode
         # untie the mode from HeapView
@@ -1976,6 +2151,19 @@ class Workbench(tk.Tk):
     def get_toolbar_button(self, command_id):
         return self._toolbar_buttons[command_id]
 
+    def schedule_toolbar_update(self) -> None:
+        """Updates the state of toolbar buttons when Tk becomes idle
+        (several requests get served by one update)"""
+        if self._toolbar_update_scheduled:
+            return
+
+        def update():
+            self._toolbar_update_scheduled = False
+            self._update_toolbar()
+
+        self._toolbar_update_scheduled = True
+        self.after_idle(update)
+
     def _update_toolbar(self) -> None:
         if self._destroyed or not hasattr(self, "_toolbar"):
             return
@@ -2324,6 +2512,7 @@ class Workbench(tk.Tk):
                 runner = get_runner()
                 if runner != None:
                     runner.destroy_backend()
+                discard_warm_processes()
 
     def _on_configure(self, event) -> None:
         # called when window is moved or resized